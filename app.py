@@ -1,14 +1,48 @@
-import os
 import streamlit as st
-from utils.whisper.whisper_service import transcribe, translate
-from utils.state_helpers import reset_session_state
+from utils.whisper import model_cache
+from utils.whisper.backends import BACKENDS, DEFAULT_BACKEND
+from utils.whisper.model_cache import DEFAULT_MODEL
+from utils.whisper.model_selection import ADAPTIVE_MODELS, AUTO, DRAFT_MODEL, LATENCY_BUDGET_SECONDS
+from utils.state_helpers import (
+    reset_session_state, get_session_id, track_session, end_run, fragment_run, enforce_budget,
+    start_session_janitor
+)
+from utils.compact_transcript import compact
+from utils import jobs, upload_store, media_server
 from components import (
-    media_player, live_transcript, editable_transcript, translation_panel
+    media_player, live_transcript, live_dictation, editable_transcript, translation_panel,
+    library_search, diagnostics
 )
 
-UPLOAD_DIR = "assets/temp_uploads/"
+@st.cache_resource
+def _warmup_models():
+    # Runs once per process; Streamlit reruns reuse the cached thread handle
+    return model_cache.warmup()
+
+
+@st.cache_resource
+def _start_upload_janitor():
+    return upload_store.start_janitor()
+
+
+@st.cache_resource
+def _start_session_janitor():
+    return start_session_janitor()
+
+
+@st.cache_resource
+def _start_metrics_endpoint():
+    # /metrics is served by the media server, so start it even before a player needs it
+    return media_server.METRICS_ENDPOINT and media_server.ensure_started()
+
 
 st.set_page_config(layout="wide")
+_warmup_models()
+_start_upload_janitor()
+_start_metrics_endpoint()
+_start_session_janitor()
+# Reload anything spilled to disk while this session was idle
+track_session()
 st.title("Whisper Transcription & Translation App")
 
 # SIDEBAR STYLE SETTINGS
@@ -26,6 +60,29 @@ font_family = st.sidebar.selectbox(
     ]
 )
 
+st.sidebar.subheader("Inference")
+backend = st.sidebar.selectbox(
+    "Engine",
+    list(BACKENDS),
+    index=list(BACKENDS).index(DEFAULT_BACKEND),
+    help="faster-whisper runs int8 CTranslate2 models; onnx uses ONNX Runtime."
+)
+model_choices = [AUTO] + list(dict.fromkeys(ADAPTIVE_MODELS + [DEFAULT_MODEL]))
+model_name = st.sidebar.selectbox(
+    "Model",
+    model_choices,
+    index=model_choices.index(DEFAULT_MODEL),
+    help="auto picks the most accurate model expected to finish within "
+         f"{LATENCY_BUDGET_SECONDS:.0f} s, given the file length and the current queue."
+)
+two_pass = st.sidebar.checkbox(
+    f"Draft with {DRAFT_MODEL}, then refine",
+    help="Transcribe mode: shows a fast draft right away and replaces it "
+         "window by window as the selected model finishes."
+)
+
+library_search.render()
+
 # MODE SELECTION
 
 mode = st.selectbox("Select mode:", ["Transcribe", "Translate"])
@@ -33,7 +90,8 @@ mode = st.selectbox("Select mode:", ["Transcribe", "Translate"])
 if "mode_selected" not in st.session_state:
     st.session_state["mode_selected"] = mode
 elif st.session_state["mode_selected"] != mode:
-    reset_session_state(keys=["transcript", "translation", "media_path"])
+    reset_session_state(keys=["transcript", "translation", "media_path", "job_id", "pinned_transcript", "seek_to", "vad_report"])
+    editable_transcript.clear_edits()
     st.session_state["mode_selected"] = mode
 
 # LAYOUT
@@ -52,21 +110,24 @@ with col_media:
     audio_bytes = st.audio_input("Record your voice")
 
     if audio_bytes:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        audio_path = os.path.join(UPLOAD_DIR, "recorded_audio.wav")
-
-
-        if hasattr(audio_bytes, "getbuffer"):   # UploadedFile object
-            raw_bytes = audio_bytes.getbuffer()
-        else:                                   
-            raw_bytes = audio_bytes
-
-        with open(audio_path, "wb") as f:
-            f.write(raw_bytes)
+        audio_path, _ = upload_store.store(
+            audio_bytes,
+            "recorded_audio.wav",
+            session_id=get_session_id(),
+            token=getattr(audio_bytes, "file_id", None)
+        )
 
         st.session_state["media_path"] = audio_path
         st.success("Audio recording saved!")
 
+    st.divider()
+
+    # --- LIVE DICTATION ---
+    live_dictation.render(
+        font_family=font_family,
+        font_size=font_size,
+        line_height=line_height
+    )
 
     st.divider()
 
@@ -77,40 +138,105 @@ with col_media:
         key="uploader"
     )
 
-    if uploaded_file is None and audio_bytes is None:
-        reset_session_state(["media_path", "transcript", "translation"])
+    # Dictation and library results are not tied to the upload widgets; keep them
+    if uploaded_file is None and audio_bytes is None and "pinned_transcript" not in st.session_state:
+        if "transcript" in st.session_state:
+            editable_transcript.clear_edits()
+        reset_session_state(["media_path", "transcript", "translation", "vad_report"])
 
     if uploaded_file:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        media_path = os.path.join(UPLOAD_DIR, uploaded_file.name)
-        with open(media_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        media_path, _ = upload_store.store(
+            uploaded_file,
+            uploaded_file.name,
+            session_id=get_session_id(),
+            token=uploaded_file.file_id
+        )
         st.session_state["media_path"] = media_path
 
     # --- MEDIA PLAYER ---
     if "media_path" in st.session_state:
-        media_player.render(st.session_state["media_path"])
+        media_player.render(
+            st.session_state["media_path"],
+            start_time=st.session_state.get("seek_to", 0.0)
+        )
 
         if st.button("Send / Process"):
-            with st.spinner(f"Running Whisper {mode.lower()}..."):
-                result = transcribe(st.session_state["media_path"])
-                st.session_state["transcript"] = result
+            job = jobs.submit(
+                mode, st.session_state["media_path"], get_session_id(), backend=backend,
+                model=model_name, two_pass=two_pass
+            )
+            st.session_state["job_id"] = job.id
+
+# JOB PROGRESS
+# Whisper runs in the background job pool; this fragment polls it without
+# rerunning the whole page, and hands the result over once it is finished.
+
+@st.fragment(run_every=1.0)
+def job_status():
+    job = jobs.get(st.session_state.get("job_id"))
+    if job is None:
+        return
+
+    if job.status == jobs.DONE:
+        # Session state keeps the array-backed form, not Whisper's dict-per-word result
+        with fragment_run():
+            st.session_state["transcript"] = compact(job.transcript)
+            editable_transcript.clear_edits()
+            st.session_state["vad_report"] = job.transcript.get("vad")
+            if job.translation is not None:
+                st.session_state["translation"] = compact(job.translation)
+        del st.session_state["job_id"]
+        st.rerun()
+    elif job.status == jobs.FAILED:
+        st.error(f"{job.mode} failed: {job.error}")
+        del st.session_state["job_id"]
+    elif job.status == jobs.CANCELLED:
+        st.info(f"{job.mode} cancelled.")
+        del st.session_state["job_id"]
+    else:
+        if job.status == jobs.QUEUED:
+            st.info(f"Waiting in queue ({job.queue_position()} ahead)...")
+        elif job.phase == jobs.DRAFT:
+            st.info(f"Drafting with {DRAFT_MODEL}...")
+        elif job.phase == jobs.REFINE:
+            st.info(f"Draft ready, refining with {job.model} "
+                    f"({job.refined_seconds:.0f}s of {job.duration:.0f}s done)...")
+        else:
+            st.info(f"Running Whisper {job.model} {job.mode.lower()}...")
+        if st.button("Cancel", key="cancel_job"):
+            jobs.cancel(job.id)
+        live_transcript.render_progress(
+            job.segments,
+            job.processed_seconds,
+            job.duration,
+            font_family=font_family,
+            font_size=font_size,
+            line_height=line_height
+        )
 
-                if mode == "Translate":
-                    st.session_state["translation"] = translate(
-                        st.session_state["media_path"]
-                    )
 
-            st.success(f"{mode} complete!")
+if "job_id" in st.session_state:
+    with col_live:
+        job_status()
 
 # AFTER PROCESSING
 
 if "transcript" in st.session_state:
 
+    vad_report = st.session_state.get("vad_report")
+    if vad_report:
+        st.caption(
+            f"Skipped {vad_report['skipped_seconds']:.0f}s of silence "
+            f"({vad_report['skipped_seconds'] / vad_report['duration']:.0%} of the recording) "
+            "before running Whisper."
+        )
+
     # LIVE PANEL 
+    # In Transcribe mode it follows the edited text, re-timed to the audio
     with col_live:
         live_transcript.render(
-            st.session_state["transcript"],
+            editable_transcript.timed_transcript(st.session_state["transcript"])
+            if mode == "Transcribe" else st.session_state["transcript"],
             font_family=font_family,
             font_size=font_size,
             line_height=line_height
@@ -134,3 +260,13 @@ if "transcript" in st.session_state:
             font_size=font_size,
             line_height=line_height
         )
+
+# DIAGNOSTICS
+# Rendered last so it includes the stages recorded during this rerun
+
+diagnostics.render()
+
+# The run is over, so this session may be spilled again; spill other
+# sessions' heavy data if the process is over its memory budget
+end_run()
+enforce_budget()
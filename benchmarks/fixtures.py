@@ -0,0 +1,75 @@
+import os
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FIXTURE_DIR = os.environ.get("BENCH_FIXTURE_DIR", "assets/bench_fixtures/")
+
+
+def synth_speechlike(seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic 16 kHz audio: bursts of modulated tones ("syllables")
+    separated by short pauses and longer silences, plus a little noise.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n, dtype=np.float32) / SAMPLE_RATE
+
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    voice = 0.3 * np.sin(2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE)
+    voice += 0.1 * np.sin(2 * np.pi * 3 * np.cumsum(pitch) / SAMPLE_RATE)
+
+    # 4 Hz syllable envelope, with 2 s of silence out of every 10 s
+    envelope = (np.sin(2 * np.pi * 4 * t) > -0.3).astype(np.float32)
+    envelope *= ((t % 10) < 8).astype(np.float32)
+
+    audio = voice * envelope + 0.005 * rng.standard_normal(n).astype(np.float32)
+    return audio.astype(np.float32)
+
+
+def write_wav(path: str, audio: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def write_video(path: str, wav_path: str) -> bool:
+    """Mux the WAV under a tiny test pattern with ffmpeg; False when ffmpeg is missing."""
+    if shutil.which("ffmpeg") is None:
+        return False
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error",
+         "-f", "lavfi", "-i", "testsrc=size=320x240:rate=10",
+         "-i", wav_path, "-shortest",
+         "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", path],
+        check=True
+    )
+    return True
+
+
+def make_fixtures(lengths=(10, 60, 600), video: bool = True) -> list:
+    """
+    Create (or reuse) audio and video fixtures of the given lengths.
+    Returns dicts with name, path, kind and duration.
+    """
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    fixtures = []
+    for seconds in lengths:
+        wav_path = os.path.join(FIXTURE_DIR, f"synthetic_{seconds}s.wav")
+        if not os.path.exists(wav_path):
+            write_wav(wav_path, synth_speechlike(seconds, seed=seconds))
+        fixtures.append({"name": f"wav_{seconds}s", "path": wav_path,
+                         "kind": "audio", "duration": float(seconds)})
+
+        if video:
+            mp4_path = os.path.join(FIXTURE_DIR, f"synthetic_{seconds}s.mp4")
+            if os.path.exists(mp4_path) or write_video(mp4_path, wav_path):
+                fixtures.append({"name": f"mp4_{seconds}s", "path": mp4_path,
+                                 "kind": "video", "duration": float(seconds)})
+    return fixtures
@@ -0,0 +1,228 @@
+"""
+Benchmark the transcription pipeline stage by stage.
+
+    python -m benchmarks.run                      # stub model, JSON to stdout
+    python -m benchmarks.run --model tiny -o bench.json
+    python -m benchmarks.run --compare bench.json
+
+Each record has the stage, fixture, wall seconds, bytes processed, the
+Python allocation peak (tracemalloc) and the process peak RSS so far.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.fixtures import SAMPLE_RATE, make_fixtures
+from benchmarks.stub_model import stub_loader
+
+
+def _peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        value = fn()
+    finally:
+        seconds = time.perf_counter() - t0
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return value, {"seconds": round(seconds, 6), "py_peak_bytes": py_peak,
+                   "peak_rss_kb": _peak_rss_kb()}
+
+
+def run(args) -> dict:
+    fixtures = make_fixtures(tuple(args.lengths), video=not args.no_video)
+    records = []
+
+    def record(stage, fixture, metrics, **extra):
+        records.append({"stage": stage, "fixture": fixture["name"] if fixture else None,
+                        **metrics, **extra})
+
+    # Isolated stores so runs never touch the app's assets
+    workdir = tempfile.mkdtemp(prefix="whisper_bench_")
+    os.environ["UPLOAD_STORE_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["WHISPER_RESULT_CACHE_DIR"] = os.path.join(workdir, "results")
+    os.environ["AUDIO_CACHE_DIR"] = os.path.join(workdir, "pcm")
+    from utils import export, upload_store
+    from utils.audio_loader import load_audio
+    from utils.media_helpers import clear_data_uri_cache, media_to_base64
+
+    from utils.whisper import model_cache
+    from utils.whisper.whisper_service import transcribe, transcribe_stream
+
+    # --- Model load ---
+    # The stub is served by the model cache, so the whole service path is timed around it
+    model_name = args.model or "stub"
+    model_cache.set_loader(None if args.model else stub_loader(args.stub_rtf))
+    model_cache.clear()
+    _, metrics = _measure(lambda: model_cache.get_model(model_name))
+    record("model_load", None, metrics, model=model_name)
+
+    for fixture in fixtures:
+        path = fixture["path"]
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        # --- Upload write (cold, then the deduplicated rerun) ---
+        _, metrics = _measure(lambda: upload_store.store(data, os.path.basename(path), "bench"))
+        record("upload_write", fixture, metrics, bytes=size)
+        _, metrics = _measure(lambda: upload_store.store(data, os.path.basename(path), "bench"))
+        record("upload_write_dedup", fixture, metrics, bytes=size)
+
+        # --- Decode (WAV natively; other media via ffmpeg, then the PCM cache) ---
+        _, metrics = _measure(lambda: load_audio(path))
+        record("decode", fixture, metrics, bytes=size)
+        if fixture["kind"] != "audio":
+            _, metrics = _measure(lambda: load_audio(path))
+            record("decode_cached", fixture, metrics, bytes=size)
+
+        # --- Inference and time to first segment ---
+        result, metrics = _measure(
+            lambda: transcribe(path, model_name=model_name, use_cache=False, long_form_mode=False)
+        )
+
+        def first_segment():
+            for event in transcribe_stream(path, model_name=model_name, use_cache=False):
+                if event["segments"]:
+                    return event
+        _, ttfs = _measure(first_segment)
+        record("inference", fixture, metrics,
+               rtf=round(metrics["seconds"] / fixture["duration"], 6),
+               segments=len(result["segments"]))
+        record("time_to_first_segment", fixture, ttfs)
+
+        # --- Player payload ---
+        clear_data_uri_cache()
+        payload, metrics = _measure(lambda: media_to_base64(path))
+        record("player_payload", fixture, metrics, bytes=len(payload))
+        _, metrics = _measure(lambda: media_to_base64(path))
+        record("player_payload_memoized", fixture, metrics, bytes=len(payload))
+
+        # --- PDF export ---
+        text = "\n".join(seg["text"].strip() for seg in result["segments"])
+        pdf, metrics = _measure(lambda: export.make_pdf(text).getvalue())
+        record("pdf_export", fixture, metrics, bytes=len(pdf), lines=text.count("\n") + 1)
+
+    # --- Concurrent sessions: one window at a time vs the shared batching worker ---
+    if args.model and args.streams > 1:
+        _record_concurrent(args, fixtures, record)
+
+    return {"meta": _meta(args), "results": records}
+
+
+def _record_concurrent(args, fixtures, record):
+    from utils.whisper import inference_worker
+    from utils.whisper.whisper_service import transcribe_stream
+
+    audio = [f for f in fixtures if f["kind"] == "audio"]
+    # The shortest fixture with a few windows keeps the run short
+    fixture = min((f for f in audio if f["duration"] >= 60), key=lambda f: f["duration"],
+                  default=max(audio, key=lambda f: f["duration"]))
+    errors = []
+
+    def stream():
+        try:
+            for _ in transcribe_stream(fixture["path"], model_name=args.model, use_cache=False):
+                pass
+        except Exception as e:
+            errors.append(e)
+
+    def concurrent():
+        threads = [threading.Thread(target=stream) for _ in range(args.streams)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+
+    batch_size = inference_worker.MAX_BATCH
+    seconds = {}
+    try:
+        for label, size in (("unbatched", 1), ("batched", batch_size)):
+            inference_worker.MAX_BATCH = size
+            _, metrics = _measure(concurrent)
+            seconds[label] = metrics["seconds"]
+            extra = {"gain": round(seconds["unbatched"] / seconds["batched"], 3)} if label == "batched" else {}
+            record(f"concurrent_inference_{label}", fixture, metrics, streams=args.streams,
+                   batch_size=size,
+                   audio_seconds_per_second=round(args.streams * fixture["duration"] / metrics["seconds"], 3),
+                   **extra)
+    finally:
+        inference_worker.MAX_BATCH = batch_size
+
+
+def _meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model": args.model or "stub",
+        "stub_rtf": None if args.model else args.stub_rtf,
+        "sample_rate": SAMPLE_RATE,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """Per (stage, fixture) time ratio current / baseline; > 1 means slower."""
+    base = {(r["stage"], r["fixture"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get((r["stage"], r["fixture"]))
+        if b and b["seconds"]:
+            rows.append({"stage": r["stage"], "fixture": r["fixture"],
+                         "baseline_seconds": b["seconds"], "seconds": r["seconds"],
+                         "ratio": round(r["seconds"] / b["seconds"], 3)})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", help="Whisper model name or path (default: stub model)")
+    parser.add_argument("--stub-rtf", type=float, default=0.0,
+                        help="Simulated real-time factor for the stub model")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 60, 600],
+                        help="Fixture lengths in seconds")
+    parser.add_argument("--no-video", action="store_true", help="Skip video fixtures")
+    parser.add_argument("--streams", type=int, default=4,
+                        help="Concurrent sessions for the batching comparison (--model only)")
+    parser.add_argument("-o", "--output", help="Write JSON here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import time
+from types import SimpleNamespace
+
+SAMPLE_RATE = 16000
+HOP_LENGTH = 160
+N_FRAMES = 3000
+SEGMENT_SECONDS = 5.0
+WORDS_PER_SEGMENT = 8
+
+
+class StubModel:
+    """
+    Deterministic stand-in for a Whisper model, loaded through
+    model_cache.set_loader() so whisper_service runs unchanged around it.
+    Produces one segment every 5 s with evenly spaced word timestamps. An
+    optional real-time factor makes inference cost proportional to the
+    audio length, so pipeline overheads can be measured without weights.
+    """
+
+    def __init__(self, rtf: float = 0.0):
+        self.rtf = rtf
+        self.dims = SimpleNamespace(n_mels=80)
+        self.device = "cpu"
+        # encoder_cache patches encoder.forward; the stub never calls it
+        self.encoder = SimpleNamespace(forward=lambda mel: mel)
+
+    def half(self):
+        return self
+
+    def parameters(self):
+        return []
+
+    def _segments(self, start_s: float, end_s: float, first_id: int = 0):
+        segments = []
+        t = start_s
+        while t < end_s:
+            seg_end = min(t + SEGMENT_SECONDS, end_s)
+            step = (seg_end - t) / WORDS_PER_SEGMENT
+            words = [
+                {"word": f" w{first_id + len(segments)}_{k}", "start": round(t + k * step, 3),
+                 "end": round(t + (k + 1) * step, 3), "probability": 0.9}
+                for k in range(WORDS_PER_SEGMENT)
+            ]
+            segments.append({
+                "id": first_id + len(segments), "seek": int(t * 100),
+                "start": round(t, 3), "end": round(seg_end, 3),
+                "text": "".join(w["word"] for w in words),
+                "tokens": list(range(WORDS_PER_SEGMENT)), "temperature": 0.0,
+                "avg_logprob": -0.2, "compression_ratio": 1.2, "no_speech_prob": 0.01,
+                "words": words,
+            })
+            t = seg_end
+        return segments
+
+    def transcribe(self, audio, task="transcribe", clip_timestamps=None, **options):
+        """Takes raw audio or a log-mel padded like whisper_service.compute_mel()."""
+        if getattr(audio, "ndim", 1) == 2:
+            duration = (audio.shape[-1] - N_FRAMES) * HOP_LENGTH / SAMPLE_RATE
+        else:
+            duration = len(audio) / SAMPLE_RATE
+        start, end = clip_timestamps if clip_timestamps else (0.0, duration)
+        if self.rtf:
+            time.sleep((end - start) * self.rtf)
+        segments = self._segments(start, end)
+        return {"text": "".join(s["text"] for s in segments), "segments": segments,
+                "language": "en"}
+
+
+def load_stub(rtf: float = 0.0) -> StubModel:
+    return StubModel(rtf=rtf)
+
+
+def stub_loader(rtf: float = 0.0):
+    """model_cache.set_loader() hook that loads the stub for any model name."""
+    return lambda name, device=None: load_stub(rtf)
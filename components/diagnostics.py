@@ -0,0 +1,63 @@
+import time
+import streamlit as st
+from utils import metrics
+from utils.state_helpers import get_session_id, session_memory
+from utils.whisper import inference_worker
+
+
+def _mb(n) -> str:
+    return f"{(n or 0) / 1024 ** 2:.1f}"
+
+
+def render():
+    """
+    Optional sidebar panel with the stage timings recorded for this session:
+    where the time went (upload, decode, model load, inference, player,
+    PDF), how many bytes each stage handled and how memory moved.
+    """
+    st.sidebar.subheader("Diagnostics")
+    if not st.sidebar.checkbox("Show diagnostics", key="show_diagnostics"):
+        return
+
+    session_id = get_session_id()
+    st.sidebar.caption(f"Process memory: {_mb(metrics.rss_bytes())} MB resident")
+    sessions = session_memory()
+    st.sidebar.caption(
+        f"Session data: {_mb(sessions.get(session_id))} MB here, "
+        f"{_mb(sum(sessions.values()))} MB across {len(sessions)} sessions"
+    )
+    batching = inference_worker.stats()
+    if batching["by_batch_size"]:
+        windows = sum(s["windows"] for s in batching["by_batch_size"].values())
+        shared = sum(s["windows"] for size, s in batching["by_batch_size"].items() if size > 1)
+        gain = f", {batching['gain']:.2f}x the unbatched throughput" if batching["gain"] else ""
+        st.sidebar.caption(f"Batched inference: {shared} of {windows} windows shared a batch{gain}")
+
+    summary = metrics.summary(session_id)
+    if not summary:
+        st.sidebar.caption("No stages recorded in this session yet.")
+        return
+
+    order = [s for s in metrics.STAGES if s in summary] + sorted(set(summary) - set(metrics.STAGES))
+    st.sidebar.dataframe(
+        [
+            {
+                "stage": name,
+                "runs": summary[name]["count"],
+                "seconds": round(summary[name]["seconds"], 3),
+                "MB": _mb(summary[name]["bytes"]),
+                "RSS Δ MB": _mb(summary[name]["rss_delta_bytes"]),
+                "errors": summary[name]["errors"],
+            }
+            for name in order
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
+
+    with st.sidebar.expander("Recent stages"):
+        for e in reversed(metrics.events(session_id, limit=20)):
+            when = time.strftime("%H:%M:%S", time.localtime(e["time"]))
+            extra = f" · {e['audio_seconds']:.0f}s audio" if e.get("audio_seconds") else ""
+            error = f" · {e['error']}" if "error" in e else ""
+            st.caption(f"{when} **{e['stage']}** {e['seconds']:.3f}s · {_mb(e.get('bytes'))} MB{extra}{error}")
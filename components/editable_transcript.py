@@ -1,22 +1,67 @@
 import streamlit as st
 from streamlit_ace import st_ace
-import io
-from reportlab.platypus import SimpleDocTemplate, Preformatted
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.pagesizes import letter
+from components import export_panel
+from utils import realign
+from utils.compact_transcript import segment_texts
+
+
+def _editor_key() -> str:
+    # A fresh key per transcript, so the editor never shows a previous one's text
+    return f"editable_ace_{st.session_state.get('edit_generation', 0)}"
+
+
+def clear_edits():
+    """Forget the edited text; call whenever st.session_state["transcript"] is replaced."""
+    for key in ("edited_text", "edit_alignment", "timed_transcript", _editor_key()):
+        if key in st.session_state:
+            del st.session_state[key]
+    st.session_state["edit_generation"] = st.session_state.get("edit_generation", 0) + 1
+
+
+def timed_transcript(transcript):
+    """
+    The transcript as currently edited, with word and segment timings
+    carried over from the original and re-timed only around each edit.
+    Returns the original transcript while the text is unedited.
+    """
+    # The editor's widget value is already current at the top of a rerun
+    text = st.session_state.get(_editor_key()) or st.session_state.get("edited_text")
+    # The live panel and the export both ask within one rerun; the text is
+    # the same object until the editor sends a new value
+    memo = st.session_state.get("timed_transcript")
+    if memo is not None and memo[0] is transcript and memo[1] is text:
+        return memo[2]
+    timed = _retime(transcript, text)
+    st.session_state["timed_transcript"] = (transcript, text, timed)
+    return timed
+
+
+def _retime(transcript, text):
+    state = st.session_state.get("edit_alignment")
+    if state is None or state[0] is not transcript:
+        base = realign.from_transcript(transcript)
+        state = (transcript, base, base)
+    _, base, alignment = state
+
+    if text is None or text == base.text:
+        st.session_state["edit_alignment"] = (transcript, base, base)
+        return transcript
+
+    # Diff against the previous edit, so the work follows the size of the change
+    alignment = realign.update(alignment, text)
+    st.session_state["edit_alignment"] = (transcript, base, alignment)
+    return alignment.to_transcript()
+
 
 def render(transcript: dict, font_family="DejaVu", font_size=16, line_height=1.5):
     """
     Editable Transcript panel using ACE editor.
     Fixes Ctrl+F search bar visibility inside Streamlit column.
-    Allows export to TXT and PDF with selected font, size, and line height.
+    Allows export to TXT, PDF (selected font, size, line height), SRT and VTT.
     """
 
     # --- Combine transcript segments into a single text ---
-    segments = transcript["segments"]
-    original_text = "\n".join(seg["text"].strip() for seg in segments)
+    original_text = "\n".join(text.strip() for text in segment_texts(transcript))
 
     # --- Persistent edited text in session state ---
     if "edited_text" not in st.session_state:
@@ -48,81 +93,21 @@ def render(transcript: dict, font_family="DejaVu", font_size=16, line_height=1.5
         wrap=True,
         show_gutter=False,
         show_print_margin=False,
-        key="editable_ace"
+        key=_editor_key()
     )
     if new_text is not None:
         st.session_state["edited_text"] = new_text
 
-    # --- PDF export function ---
-    def make_pdf(text, font_family=font_family, font_size=font_size, line_height=line_height):
-        buffer = io.BytesIO()
-
-        # Map font family to system font paths
-        font_map = {
-            "Arial": "C:/Windows/Fonts/arial.ttf",
-            "Verdana": "C:/Windows/Fonts/verdana.ttf",
-            "Tahoma": "C:/Windows/Fonts/tahoma.ttf",
-            "Trebuchet MS": "C:/Windows/Fonts/trebuc.ttf",
-            "Segoe UI": "C:/Windows/Fonts/segoeui.ttf",
-            "Calibri": "C:/Windows/Fonts/calibri.ttf",
-            "Century Gothic": "C:/Windows/Fonts/gothic.ttf",
-            "Times New Roman": "C:/Windows/Fonts/times.ttf",
-            "Georgia": "C:/Windows/Fonts/georgia.ttf",
-            "Garamond": "C:/Windows/Fonts/garamond.ttf",
-            "Cambria": "C:/Windows/Fonts/cambria.ttf",
-            "Palatino Linotype": "C:/Windows/Fonts/pala.ttf",
-            "Courier New": "C:/Windows/Fonts/cour.ttf",
-            "Consolas": "C:/Windows/Fonts/consola.ttf",
-            "Lucida Console": "C:/Windows/Fonts/lucon.ttf",
-            "DejaVu": "C:/Windows/Fonts/DejaVuSans.ttf"
-        }
-
-        font_path = font_map.get(font_family, font_map["DejaVu"])
-        font_name = f"{font_family}_Custom"
-
-        # Register the font
-        try:
-            pdfmetrics.registerFont(TTFont(font_name, font_path))
-        except Exception as e:
-            print("Font registration failed:", e)
-            font_name = "Helvetica"  # fallback
-
-        # Setup PDF document
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            topMargin=40,
-            bottomMargin=40,
-            leftMargin=50,
-            rightMargin=50
-        )
-
-        # Preformatted style preserves line breaks and spacing
-        style = ParagraphStyle(
-            "TranscriptStyle",
-            fontName=font_name,
-            fontSize=font_size,
-            leading=font_size * line_height
-        )
-
-        story = [Preformatted(text, style)]
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
-
     # --- Export buttons ---
     st.subheader("Export Edited Transcript")
 
-    st.download_button(
-        "Download TXT",
+    # Subtitles follow the edited text with its re-aligned timings
+    export_panel.render(
         st.session_state["edited_text"],
-        file_name="edited_transcript.txt",
-        mime="text/plain"
-    )
-
-    st.download_button(
-        "Download PDF",
-        make_pdf(st.session_state["edited_text"]),
-        file_name="edited_transcript.pdf",
-        mime="application/pdf"
+        timed_transcript(transcript),
+        file_stem="edited_transcript",
+        key="transcript_export",
+        font_family=font_family,
+        font_size=font_size,
+        line_height=line_height
     )
@@ -0,0 +1,38 @@
+import streamlit as st
+from utils import export
+
+FORMATS = ["TXT", "PDF", "SRT", "VTT"]
+
+
+def render(text: str, transcript, file_stem: str, key: str,
+           font_family="DejaVu", font_size=16, line_height=1.5):
+    """
+    Export buttons shared by the transcript and translation panels.
+    TXT/SRT/VTT are cheap and built (or fetched from the export cache) on
+    every run; a PDF is built only after "Prepare PDF" is clicked, and is
+    offered straight away when an identical one is already cached.
+    """
+    options = dict(font_family=font_family, font_size=font_size, line_height=line_height)
+    columns = st.columns(len(FORMATS))
+
+    for column, label in zip(columns, FORMATS):
+        fmt = label.lower()
+        with column:
+            if fmt == "pdf":
+                data = export.cached(fmt, text, transcript, **options)
+                if data is None:
+                    if st.button("Prepare PDF", key=f"{key}_prepare_pdf"):
+                        with st.spinner("Building PDF..."):
+                            data = export.export(fmt, text, transcript, **options)
+                    else:
+                        continue
+            else:
+                data = export.export(fmt, text, transcript, **options)
+
+            st.download_button(
+                f"Download {label}",
+                data,
+                file_name=f"{file_stem}.{fmt}",
+                mime=export.MIME_TYPES[fmt],
+                key=f"{key}_download_{fmt}"
+            )
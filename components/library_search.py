@@ -0,0 +1,50 @@
+import os
+import streamlit as st
+from components import editable_transcript
+from utils import transcript_library
+from utils.compact_transcript import compact
+
+
+def _timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def render():
+    """
+    Sidebar search over every transcript in the library.
+    Opening a hit loads its transcript and media and seeks the player to
+    the matching word.
+    """
+    st.sidebar.subheader("Transcript Library")
+    query = st.sidebar.text_input("Search past recordings", key="library_query")
+    if not query.strip():
+        return
+
+    hits = transcript_library.search(query, limit=20)
+    if not hits:
+        st.sidebar.caption("No matches.")
+        return
+
+    for i, hit in enumerate(hits):
+        st.sidebar.markdown(
+            f"**{hit['file_name']}** · {_timestamp(hit['start'])}  \n{hit['snippet']}"
+        )
+        available = bool(hit["media_path"]) and os.path.exists(hit["media_path"])
+        if st.sidebar.button(
+            "Open" if available else "Open transcript",
+            key=f"library_hit_{i}"
+        ):
+            transcript = compact(transcript_library.get_transcript(hit["recording_id"]))
+            # The live panel follows whichever text was hit, with its own timings
+            st.session_state["transcript"] = transcript
+            editable_transcript.clear_edits()
+            if hit["task"] == "translate":
+                st.session_state["translation"] = transcript
+            if available:
+                st.session_state["media_path"] = hit["media_path"]
+                st.session_state["seek_to"] = hit["start"]
+            st.session_state["pinned_transcript"] = True
+            st.rerun()
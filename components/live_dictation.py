@@ -0,0 +1,84 @@
+import queue
+import streamlit as st
+from components import editable_transcript, live_transcript
+from utils.compact_transcript import compact
+from utils.whisper.live_dictation import LiveDictation
+
+try:
+    from streamlit_webrtc import webrtc_streamer, WebRtcMode
+except ImportError:   # optional dependency
+    webrtc_streamer = None
+
+# How often the live panel picks up new audio and redraws
+REFRESH_SECONDS = 0.5
+
+
+def render(font_family="DejaVu", font_size=16, line_height=1.5):
+    """
+    Live dictation: microphone frames stream over WebRTC into a rolling
+    buffer that is transcribed in the background. Committed text and the
+    still-changing tentative tail are shown in the live transcript panel.
+    Stopping the stream stores the committed text as the session transcript.
+    """
+    st.subheader("Live Dictation")
+
+    if webrtc_streamer is None:
+        st.info("Install streamlit-webrtc to enable live dictation.")
+        return
+
+    ctx = webrtc_streamer(
+        key="live_dictation",
+        mode=WebRtcMode.SENDONLY,
+        audio_receiver_size=256,
+        media_stream_constraints={"audio": True, "video": False},
+    )
+
+    dictation = st.session_state.get("dictation")
+
+    if not ctx.state.playing:
+        # Stream just ended: flush the tentative tail and keep the result
+        if dictation is not None:
+            dictation.stop()
+            st.session_state["transcript"] = compact(dictation.result())
+            editable_transcript.clear_edits()
+            st.session_state["pinned_transcript"] = True
+            del st.session_state["dictation"]
+        return
+
+    if dictation is None:
+        dictation = LiveDictation()
+        st.session_state["dictation"] = dictation
+    dictation.start()
+
+    # Only this fragment reruns to drain new audio; the rest of the page stays responsive
+    @st.fragment(run_every=REFRESH_SECONDS)
+    def live_panel():
+        if not ctx.state.playing or not ctx.audio_receiver:
+            return
+        try:
+            frames = ctx.audio_receiver.get_frames(timeout=0.1)
+        except queue.Empty:
+            frames = []
+
+        for frame in frames:
+            dictation.feed(
+                frame.to_ndarray(),
+                sample_rate=frame.sample_rate,
+                channels=len(frame.layout.channels)
+            )
+        if frames:
+            # The decode thread ends once the stream stalls; audio brings it back
+            dictation.start()
+
+        committed, tentative, latency = dictation.snapshot()
+        if latency is not None:
+            st.caption(f"Transcript lag: {latency:.1f}s")
+        live_transcript.render_partial(
+            committed,
+            font_family=font_family,
+            font_size=font_size,
+            line_height=line_height,
+            tentative_text="".join(w["word"] for w in tentative)
+        )
+
+    live_panel()
@@ -1,35 +1,105 @@
-import streamlit as st
+import base64
 import json
 
-def render(transcript: dict, font_family="DejaVu", font_size=16, line_height=1.5):
+import numpy as np
+import streamlit as st
+
+from utils.compact_transcript import CompactTranscript
+
+
+def _b64(values, dtype: str) -> str:
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode("ascii")
+
+
+def _utf16_lengths(transcript: CompactTranscript) -> np.ndarray:
+    """Word lengths in UTF-16 code units, which is how the page indexes strings."""
+    buffer = transcript.word_text_buffer
+    lengths = np.diff(transcript.word_text_offsets)
+    if len(buffer.encode("utf-16-le")) == 2 * len(buffer):
+        return lengths
+    o = transcript.word_text_offsets.tolist()
+    return np.array([len(buffer[o[j]:o[j + 1]].encode("utf-16-le")) // 2 for j in range(len(o) - 1)])
+
+
+def _payload(transcript: CompactTranscript) -> str:
     """
-    Live transcript panel with search and synchronized highlighting.
-    Displays transcript segments in a scrollable container with active segment highlighting.
+    Columnar segment arrays plus every word in one string. Word lengths and
+    per-segment word counts are little-endian Uint16 arrays; word starts are
+    delta-encoded and durations stored as Float32, all sent as base64.
     """
+    word_start = transcript.word_start.astype(np.float64)
+    return json.dumps({
+        "start": [round(x, 3) for x in transcript.seg_start.tolist()],
+        "end": [round(x, 3) for x in transcript.seg_end.tolist()],
+        "text": [t.strip() for t in transcript.segment_texts()],
+        "words": {
+            "text": transcript.word_text_buffer,
+            "len": _b64(_utf16_lengths(transcript), "<u2"),
+            "count": _b64(np.diff(transcript.seg_word_offsets), "<u2"),
+            "start": _b64(np.diff(word_start, prepend=0.0), "<f4"),
+            "dur": _b64(transcript.word_end - transcript.word_start, "<f4"),
+        },
+    }, separators=(",", ":"))
+
+
+def _segments_json(segments) -> str:
+    return _payload(CompactTranscript.from_whisper({"segments": segments}))
+
 
-    # --- Combine transcript segments ---
-    segments = transcript["segments"]
-    full_text = "\n".join(seg["text"].strip() for seg in segments)
-
-    # Prepare JSON for front-end
-    json_segments = json.dumps([
-        {
-            "index": i,
-            "start": seg["start"],
-            "end": seg["end"],
-            "text": seg["text"].strip()
-        }
-        for i, seg in enumerate(segments)
-    ])
-
-    # --- Search bar ---
-    search_query = st.text_input("Search in Live Transcript:", key="live_search")
-    search_query_encoded = json.dumps(search_query)
+def _transcript_json(transcript) -> str:
+    if not isinstance(transcript, CompactTranscript):
+        return _segments_json(transcript["segments"])
+
+    # Built straight from the columns, once per transcript rather than per rerun
+    return transcript.memo("live_payload", lambda: _payload(transcript))
+
+
+def render(transcript: dict, font_family="DejaVu", font_size=16, line_height=1.5):
+    """
+    Live transcript panel with search and synchronized highlighting of the
+    current segment and word. Only the rows in view are in the DOM; search
+    runs in the page, so typing never reruns the Streamlit script.
+    """
 
     # --- Live Transcript Expander ---
     with st.expander("Live Transcript", expanded=True):
         st.components.v1.html(
-            rf"""
+            _panel_html(_transcript_json(transcript), font_family, font_size, line_height),
+            height=520
+        )
+
+
+def render_progress(segments, processed_seconds, duration, font_family="DejaVu",
+                    font_size=16, line_height=1.5):
+    """
+    Partial transcript shown while a job is still decoding, with a progress
+    bar based on how much of the audio has been processed so far.
+    """
+    if duration:
+        st.progress(
+            min(processed_seconds / duration, 1.0),
+            text=f"Processed {processed_seconds:.0f}s / {duration:.0f}s"
+        )
+    else:
+        st.progress(0.0, text="Decoding first window...")
+
+    render_partial(segments, font_family=font_family, font_size=font_size, line_height=line_height)
+
+
+def render_partial(segments, font_family="DejaVu", font_size=16, line_height=1.5,
+                   tentative_text=""):
+    """Panel for text that is still growing (jobs, dictation)."""
+    if segments or tentative_text:
+        st.components.v1.html(
+            _panel_html(_segments_json(segments), font_family, font_size, line_height, tentative_text),
+            height=520
+        )
+
+
+def _panel_html(json_segments, font_family, font_size, line_height, tentative_text="") -> str:
+    tentative_encoded = json.dumps(tentative_text.strip())
+
+    return rf"""
             <style>
             /* --- THEME-AWARE COLORS --- */
             :root {{
@@ -45,23 +115,54 @@ def render(transcript: dict, font_family="DejaVu", font_size=16, line_height=1.5
                 }}
             }}
 
+            #search_bar {{
+                display: flex;
+                gap: 0.25rem;
+                align-items: center;
+                margin-bottom: 0.5rem;
+                font-family: sans-serif;
+                font-size: 14px;
+                color: var(--text-color);
+            }}
+            #search_input {{
+                flex: 1;
+                padding: 0.3rem 0.5rem;
+                border: 1px solid var(--border-color);
+                border-radius: 4px;
+                background-color: var(--bg-color);
+                color: var(--text-color);
+            }}
+            #search_count {{
+                min-width: 4.5rem;
+                text-align: center;
+            }}
+
             #live_transcript {{
                 font-family: {font_family};
                 font-size: {font_size}px;
                 line-height: {line_height};
                 height: 450px;
                 overflow-y: auto;
-                padding: 0.5rem 1rem;
+                position: relative;
+                padding: 0 1rem;
                 border: 1px solid var(--border-color);
                 border-radius: 4px;
                 background-color: var(--bg-color);
                 color: var(--text-color);
             }}
 
+            #spacer {{
+                position: relative;
+                width: 100%;
+            }}
+
             .segment {{
+                position: absolute;
+                left: 0;
+                right: 0;
+                box-sizing: border-box;
                 padding: 0.25rem 0.5rem;
                 border-radius: 4px;
-                margin-bottom: 0.25rem;
                 font-family: {font_family};
                 font-size: {font_size}px;
                 line-height: {line_height};
@@ -74,57 +175,297 @@ def render(transcript: dict, font_family="DejaVu", font_size=16, line_height=1.5
                 transition: background 0.2s ease-in-out;
             }}
 
+            .word_active {{
+                background-color: #ffb347;
+                border-radius: 3px;
+            }}
+
+            .tentative {{
+                opacity: 0.55;
+                font-style: italic;
+            }}
+
             .highlight {{
                 color: red;
                 font-weight: bold;
                 background-color: transparent;
             }}
+
+            .current_match {{
+                outline: 2px solid red;
+            }}
             </style>
 
-            <div id="live_transcript"></div>
+            <div id="search_bar">
+                <input id="search_input" type="text" placeholder="Search in Live Transcript (Enter / Shift+Enter)">
+                <span id="search_count"></span>
+                <button id="search_prev" title="Previous match">&uarr;</button>
+                <button id="search_next" title="Next match">&darr;</button>
+            </div>
+            <div id="live_transcript"><div id="spacer"></div></div>
 
             <script>
-            const segments = {json_segments};
+            const data = {json_segments};
+            const tentativeText = {tentative_encoded};
+            const starts = data.start;
+            const ends = data.end;
+            const texts = tentativeText ? data.text.concat([tentativeText]) : data.text;
+            const lowered = texts.map(t => t.toLowerCase());
+            const nSegments = starts.length;
+            const n = texts.length;
+
+            // --- Words: decoded once from the typed-array payload ---
+            function decode(b64, Type) {{
+                const bin = atob(b64);
+                const bytes = new Uint8Array(bin.length);
+                for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+                return new Type(bytes.buffer);
+            }}
+            const wordText = data.words.text;
+            const wordLen = decode(data.words.len, Uint16Array);
+            const nWords = wordLen.length;
+            const wordOffset = new Uint32Array(nWords + 1);
+            for (let j = 0; j < nWords; j++) wordOffset[j + 1] = wordOffset[j] + wordLen[j];
+            const startDelta = decode(data.words.start, Float32Array);
+            const wordDur = decode(data.words.dur, Float32Array);
+            const wordStart = new Float64Array(nWords);
+            const wordEnd = new Float64Array(nWords);
+            for (let j = 0, t = 0; j < nWords; j++) {{
+                t += startDelta[j];
+                wordStart[j] = t;
+                wordEnd[j] = t + wordDur[j];
+            }}
+            const wordCount = decode(data.words.count, Uint16Array);
+            const segFirstWord = new Uint32Array(nSegments + 1);
+            const wordSeg = new Int32Array(nWords);
+            for (let i = 0; i < nSegments; i++) {{
+                segFirstWord[i + 1] = segFirstWord[i] + wordCount[i];
+                wordSeg.fill(i, segFirstWord[i], segFirstWord[i + 1]);
+            }}
+
             const container = document.getElementById('live_transcript');
-            const searchQuery = {search_query_encoded};
-            let lastActive = null;
-
-            function renderSegments() {{
-                container.innerHTML = '';
-                const query = searchQuery.trim().toLowerCase();
-
-                for (const seg of segments) {{
-                    const d = document.createElement('div');
-                    d.id = 'seg_' + seg.index;
-                    d.className = 'segment';
-
-                    if (query) {{
-                        // Escape special regex characters
-                        const regex = new RegExp('(' + query.replace(/[.*+?^${{}}()|[\]\\]/g, '\\$&') + ')', 'gi');
-                        d.innerHTML = seg.text.replace(regex, (match) => `<span class="highlight">${{match}}</span>`);
-                    }} else {{
-                        d.innerText = seg.text;
+            const spacer = document.getElementById('spacer');
+            const OVERSCAN = 8;
+
+            // --- Row heights: estimated, then corrected once a row is measured ---
+            const estimate = {font_size} * {line_height} * 2 + 8;
+            const heights = new Float64Array(n).fill(estimate);
+            const measured = new Uint8Array(n);
+            const offsets = new Float64Array(n + 1);
+
+            function rebuildOffsets(from) {{
+                for (let i = from; i < n; i++) offsets[i + 1] = offsets[i] + heights[i];
+                spacer.style.height = offsets[n] + 'px';
+            }}
+            rebuildOffsets(0);
+
+            // Last index i with arr[i] <= x (arr sorted ascending), or -1
+            function upperIndex(arr, x, len) {{
+                let lo = 0, hi = len - 1, found = -1;
+                while (lo <= hi) {{
+                    const mid = (lo + hi) >> 1;
+                    if (arr[mid] <= x) {{ found = mid; lo = mid + 1; }}
+                    else hi = mid - 1;
+                }}
+                return found;
+            }}
+
+            // --- Search state ---
+            let query = '';
+            let matches = [];       // segment indices containing the query
+            let currentMatch = -1;
+            let activeIndex = -1;
+            let activeWord = -1;
+
+            // Wrap each word of the row in a span so it can be highlighted on its own
+            function fillWords(el, i) {{
+                const text = texts[i];
+                const first = segFirstWord[i];
+                el.words = new Array(segFirstWord[i + 1] - first);
+                let pos = 0;
+                for (let j = first; j < segFirstWord[i + 1]; j++) {{
+                    const word = wordText.slice(wordOffset[j], wordOffset[j + 1]).trim();
+                    const hit = word ? text.indexOf(word, pos) : -1;
+                    if (hit === -1) continue;
+                    el.appendChild(document.createTextNode(text.slice(pos, hit)));
+                    const span = document.createElement('span');
+                    span.textContent = word;
+                    if (j === activeWord) span.className = 'word_active';
+                    el.appendChild(span);
+                    el.words[j - first] = span;
+                    pos = hit + word.length;
+                }}
+                el.appendChild(document.createTextNode(text.slice(pos)));
+            }}
+
+            function fillRow(el, i) {{
+                const text = texts[i];
+                el.textContent = '';
+                el.words = null;
+                if (!query && i < nSegments && segFirstWord[i + 1] > segFirstWord[i]) {{
+                    fillWords(el, i);
+                    return;
+                }}
+                // Search marks take over the row while a query is active
+                if (!query || i >= nSegments) {{
+                    el.textContent = text;
+                    return;
+                }}
+                const low = lowered[i];
+                let pos = 0, hit = low.indexOf(query);
+                while (hit !== -1) {{
+                    el.appendChild(document.createTextNode(text.slice(pos, hit)));
+                    const mark = document.createElement('span');
+                    mark.className = 'highlight';
+                    mark.textContent = text.slice(hit, hit + query.length);
+                    el.appendChild(mark);
+                    pos = hit + query.length;
+                    hit = low.indexOf(query, pos);
+                }}
+                el.appendChild(document.createTextNode(text.slice(pos)));
+            }}
+
+            // --- Virtualized rendering: only rows near the viewport exist ---
+            const rows = new Map();   // index -> element
+
+            function renderRows() {{
+                const top = container.scrollTop;
+                const bottom = top + container.clientHeight;
+                const first = Math.max(0, upperIndex(offsets, top, n) - OVERSCAN);
+                let last = upperIndex(offsets, bottom, n) + OVERSCAN;
+                last = Math.min(n - 1, last);
+
+                for (const [i, el] of rows) {{
+                    if (i < first || i > last) {{ el.remove(); rows.delete(i); }}
+                }}
+
+                let changedFrom = n;
+                for (let i = first; i <= last; i++) {{
+                    let el = rows.get(i);
+                    if (!el) {{
+                        el = document.createElement('div');
+                        el.className = i < nSegments ? 'segment' : 'segment tentative';
+                        fillRow(el, i);
+                        spacer.appendChild(el);
+                        rows.set(i, el);
+                    }}
+                    el.classList.toggle('active', i === activeIndex);
+                    el.classList.toggle('current_match', matches[currentMatch] === i);
+                    if (!measured[i]) {{
+                        const h = el.offsetHeight;
+                        measured[i] = 1;
+                        if (h && h !== heights[i]) {{
+                            heights[i] = h;
+                            changedFrom = Math.min(changedFrom, i);
+                        }}
                     }}
-                    container.appendChild(d);
                 }}
+                if (changedFrom < n) rebuildOffsets(changedFrom);
+                for (const [i, el] of rows) el.style.top = offsets[i] + 'px';
             }}
 
-            renderSegments();
+            let framePending = false;
+            function scheduleRender() {{
+                if (framePending) return;
+                framePending = true;
+                requestAnimationFrame(() => {{ framePending = false; renderRows(); }});
+            }}
+            container.addEventListener('scroll', scheduleRender);
 
-            const bc = new BroadcastChannel('media_sync');
+            function scrollToIndex(i, smooth) {{
+                const target = offsets[i] - container.clientHeight / 2 + heights[i] / 2;
+                container.scrollTo({{ top: Math.max(0, target), behavior: smooth ? 'smooth' : 'auto' }});
+                scheduleRender();
+            }}
 
-            function setActive(index) {{
-                if (lastActive !== null && lastActive !== index) {{
-                    const prev = document.getElementById('seg_' + lastActive);
-                    if (prev) prev.classList.remove('active');
+            renderRows();
+            if (tentativeText) scrollToIndex(n - 1, false);
+
+            // --- In-page search with match navigation ---
+            const input = document.getElementById('search_input');
+            const countLabel = document.getElementById('search_count');
+
+            function updateCount() {{
+                countLabel.textContent = query
+                    ? (matches.length ? (currentMatch + 1) + ' / ' + matches.length : '0 / 0')
+                    : '';
+            }}
+
+            function runSearch() {{
+                query = input.value.trim().toLowerCase();
+                matches = [];
+                if (query) {{
+                    for (let i = 0; i < nSegments; i++) {{
+                        if (lowered[i].includes(query)) matches.push(i);
+                    }}
                 }}
+                currentMatch = matches.length ? 0 : -1;
+                for (const [i, el] of rows) fillRow(el, i);
+                updateCount();
+                if (currentMatch !== -1) scrollToIndex(matches[0], false);
+                else scheduleRender();
+            }}
+
+            function step(delta) {{
+                if (!matches.length) return;
+                currentMatch = (currentMatch + delta + matches.length) % matches.length;
+                updateCount();
+                scrollToIndex(matches[currentMatch], true);
+            }}
+
+            let searchTimer = null;
+            input.addEventListener('input', () => {{
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(runSearch, 120);
+            }});
+            input.addEventListener('keydown', (e) => {{
+                if (e.key === 'Enter') {{ e.preventDefault(); step(e.shiftKey ? -1 : 1); }}
+            }});
+            document.getElementById('search_prev').addEventListener('click', () => step(-1));
+            document.getElementById('search_next').addEventListener('click', () => step(1));
 
-                const el = document.getElementById('seg_' + index);
-                if (el) {{
-                    el.classList.add('active');
-                    el.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
+            // --- Playback sync: pointers that step forward with the playhead ---
+            const bc = new BroadcastChannel('media_sync');
+            const MAX_STEPS = 32;
+
+            // Last index with arr[i] <= t, moving on from ptr. Ticks during playback
+            // move it a step or two; seeks fall back to a binary search.
+            function advance(arr, len, ptr, t) {{
+                if (ptr === -1 || t < arr[ptr]) return upperIndex(arr, t, len);
+                for (let steps = 0; ptr + 1 < len && arr[ptr + 1] <= t; steps++) {{
+                    if (steps === MAX_STEPS) return upperIndex(arr, t, len);
+                    ptr++;
                 }}
-                lastActive = index;
+                return ptr;
+            }}
+
+            let segPtr = -1;
+            let wordPtr = -1;
+
+            function wordSpan(j) {{
+                if (j === -1) return null;
+                const row = rows.get(wordSeg[j]);
+                return (row && row.words) ? row.words[j - segFirstWord[wordSeg[j]]] : null;
+            }}
+
+            // The last word to start stays lit until the next one does
+            function setActiveWord(j) {{
+                if (j === activeWord) return;
+                const prev = wordSpan(activeWord);
+                if (prev) prev.classList.remove('word_active');
+                activeWord = j;
+                const span = wordSpan(j);
+                if (span) span.classList.add('word_active');
+            }}
+
+            function setActive(index) {{
+                if (index === activeIndex) return;
+                const prev = rows.get(activeIndex);
+                if (prev) prev.classList.remove('active');
+                activeIndex = index;
+                const el = rows.get(index);
+                if (el) el.classList.add('active');
+                scrollToIndex(index, true);
             }}
 
             bc.onmessage = (ev) => {{
@@ -133,14 +474,15 @@ def render(transcript: dict, font_family="DejaVu", font_size=16, line_height=1.5
                     if (!msg || msg.type !== 'time') return;
 
                     const t = msg.currentTime;
-                    const idx = segments.findIndex(s => t >= s.start && t <= s.end);
-                    if (idx !== -1) setActive(idx);
+                    segPtr = advance(starts, nSegments, segPtr, t);
+                    if (segPtr !== -1 && t <= ends[segPtr]) setActive(segPtr);
+
+                    wordPtr = advance(wordStart, nWords, wordPtr, t);
+                    setActiveWord(wordPtr !== -1 && wordSeg[wordPtr] === activeIndex ? wordPtr : -1);
 
                 }} catch (err) {{
                     console.error(err);
                 }}
             }};
             </script>
-            """,
-            height=520
-        )
+            """
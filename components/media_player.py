@@ -1,19 +1,53 @@
+import os
+import json
 import streamlit as st
-from utils.media_helpers import media_to_base64
+from utils.media_helpers import media_to_base64, FALLBACK_MAX_BYTES, INLINE_MAX_BYTES
+from utils import media_server
 
-def render(media_path: str):
-    media_base64 = media_to_base64(media_path)
+# Shown in the player when the browser cannot reach the media server
+_UNREACHABLE = ("Could not load the media from the media server. Behind HTTPS or a reverse proxy, "
+                "set MEDIA_SERVER_URL to its public address.")
+
+
+def _media_src(media_path: str):
+    """
+    JS expression for the player source, or None when the file cannot be played.
+    Large files are streamed (and seeked) through the range-capable media
+    server; small clips, or files up to FALLBACK_MAX_BYTES when the server
+    failed to start, fall back to a memoized data URI.
+    """
+    size = os.path.getsize(media_path)
+    if size <= INLINE_MAX_BYTES:
+        return json.dumps(media_to_base64(media_path))
+    if not media_server.ensure_started():
+        return json.dumps(media_to_base64(media_path)) if size <= FALLBACK_MAX_BYTES else None
+
+    url_path = json.dumps(media_server.media_path_url(media_path))
+    if media_server.PUBLIC_URL:
+        return json.dumps(media_server.PUBLIC_URL) + " + " + url_path
+    return (
+        "window.parent.location.protocol + '//' + window.parent.location.hostname"
+        f" + ':{media_server.PORT}' + {url_path}"
+    )
+
+
+def render(media_path: str, start_time: float = 0.0):
+    media_src = _media_src(media_path)
+    if media_src is None:
+        st.warning("The media server is unavailable and this file is too large to embed in the page.")
+        return
+    unreachable = json.dumps(_UNREACHABLE)
     ext = media_path.split(".")[-1].lower()
     video_exts = ["mp4", "mov", "mkv"]
 
     if ext in video_exts:
         st.components.v1.html(f"""
-        <video id="media_player" controls style="width:100%; max-height:100%;">
-            <source src="{media_base64}">
+        <video id="media_player" controls style="width:100%; max-height:100%;" preload="metadata">
             Your browser does not support the video tag.
         </video>
         <script>
         const video = document.getElementById('media_player');
+        video.src = {media_src};
         const bc = new BroadcastChannel('media_sync');
         function sendTime() {{ bc.postMessage({{ type: 'time', currentTime: video.currentTime }}); }}
         let interval = null;
@@ -21,16 +55,26 @@ def render(media_path: str):
         video.addEventListener('pause', () => {{ sendTime(); if (interval) clearInterval(interval); }});
         video.addEventListener('seeking', sendTime);
         video.addEventListener('seeked', sendTime);
+        video.addEventListener('error', () => {{
+            if (video.src.startsWith('data:')) return;
+            const note = document.createElement('div');
+            note.style.cssText = 'font: 13px sans-serif; color: #b00020; padding-top: 4px;';
+            note.textContent = {unreachable};
+            video.after(note);
+        }}, {{ once: true }});
+        if ({start_time}) {{
+            video.addEventListener('loadedmetadata', () => {{ video.currentTime = {start_time}; }}, {{ once: true }});
+        }}
         </script>
         """, height=140)
     else:
         st.components.v1.html(f"""
         <audio id="media_player" controls style="width:100%; display:block;" preload="metadata">
-            <source src="{media_base64}">
             Your browser does not support the audio tag.
         </audio>
         <script>
         const audio = document.getElementById('media_player');
+        audio.src = {media_src};
         const bc = new BroadcastChannel('media_sync');
         function sendTime() {{ bc.postMessage({{ type: 'time', currentTime: audio.currentTime }}); }}
         let interval = null;
@@ -38,5 +82,15 @@ def render(media_path: str):
         audio.addEventListener('pause', () => {{ sendTime(); if (interval) clearInterval(interval); }});
         audio.addEventListener('seeking', sendTime);
         audio.addEventListener('seeked', sendTime);
+        audio.addEventListener('error', () => {{
+            if (audio.src.startsWith('data:')) return;
+            const note = document.createElement('div');
+            note.style.cssText = 'font: 13px sans-serif; color: #b00020; padding-top: 4px;';
+            note.textContent = {unreachable};
+            audio.after(note);
+        }}, {{ once: true }});
+        if ({start_time}) {{
+            audio.addEventListener('loadedmetadata', () => {{ audio.currentTime = {start_time}; }}, {{ once: true }});
+        }}
         </script>
         """, height=70)
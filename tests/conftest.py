@@ -0,0 +1,19 @@
+import pytest
+
+
+def whisper_result(*lines, seconds_per_word=0.5, language="en"):
+    """Whisper-shaped result with one segment per line and evenly timed words."""
+    segments, t = [], 0.0
+    for i, line in enumerate(lines):
+        words = []
+        for word in line.split():
+            words.append({"word": " " + word, "start": t, "end": t + seconds_per_word, "probability": 0.9})
+            t += seconds_per_word
+        segments.append({"id": i, "start": words[0]["start"], "end": words[-1]["end"],
+                         "text": "".join(w["word"] for w in words), "words": words})
+    return {"text": "".join(seg["text"] for seg in segments), "segments": segments, "language": language}
+
+
+@pytest.fixture
+def make_result():
+    return whisper_result
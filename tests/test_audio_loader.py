@@ -0,0 +1,58 @@
+import wave
+
+import numpy as np
+import pytest
+
+from utils import audio_loader
+
+SR = audio_loader.SAMPLE_RATE
+
+
+def _write_wav(path, samples, rate, channels=1):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm.tobytes())
+
+
+def test_16k_mono_wav_is_read_without_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_loader, "_ffmpeg_to_pcm", lambda *args: pytest.fail("ffmpeg used"))
+    samples = np.sin(np.linspace(0, 200, SR)).astype(np.float32) * 0.5
+    path = tmp_path / "clip.wav"
+    _write_wav(path, samples, SR)
+    audio = audio_loader.load_audio(str(path))
+    assert audio.dtype == np.float32
+    np.testing.assert_allclose(audio, samples, atol=1e-4)
+
+
+def test_stereo_44k_wav_is_downmixed_and_resampled(tmp_path):
+    rate = 44100
+    tone = 0.5 * np.sin(2 * np.pi * 440 * np.arange(rate) / rate)
+    path = tmp_path / "stereo.wav"
+    _write_wav(path, np.repeat(tone, 2), rate, channels=2)
+    audio = audio_loader.load_audio(str(path))
+    assert abs(len(audio) - SR) <= 1
+    # A 440 Hz tone survives the low-pass at the new Nyquist
+    assert np.abs(audio[SR // 4:-SR // 4]).max() == pytest.approx(0.5, abs=0.02)
+
+
+def test_other_media_is_decoded_once_per_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_loader, "CACHE_DIR", str(tmp_path / "pcm"))
+    calls = []
+
+    def ffmpeg(media_path, output_path):
+        calls.append(media_path)
+        np.arange(SR, dtype=np.float32).tofile(output_path)
+
+    monkeypatch.setattr(audio_loader, "_ffmpeg_to_pcm", ffmpeg)
+    first, copy = tmp_path / "a.mp3", tmp_path / "copy.mp3"
+    first.write_bytes(b"compressed audio")
+    copy.write_bytes(b"compressed audio")
+
+    a = audio_loader.load_audio(str(first))
+    b = audio_loader.load_audio(str(copy))
+    assert len(calls) == 1
+    np.testing.assert_array_equal(a, b)
+    assert len(a) == SR
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+pytest.importorskip("whisper")
+
+from utils.whisper import backends, model_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    model_cache.clear()
+    yield
+    model_cache.clear()
+
+
+def test_converted_models_are_never_downloaded(monkeypatch, tmp_path):
+    monkeypatch.setattr(backends, "MODEL_DIR", str(tmp_path))
+    for name in ("faster-whisper", "onnx"):
+        with pytest.raises(FileNotFoundError, match="No local"):
+            backends.get_backend(name, "tiny")
+
+
+def test_engines_load_once_under_per_model_locks(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    loads = []
+
+    class SlowEngine(backends.Backend):
+        name = "slow"
+
+        def __init__(self, model_name, device=None, dtype="float32"):
+            super().__init__(model_name, device, dtype)
+            loads.append(model_name)
+            if model_name == "big":
+                started.set()
+                release.wait(5)
+
+    monkeypatch.setitem(backends.BACKENDS, "slow", SlowEngine)
+    loading = threading.Thread(target=backends.get_backend, args=("slow", "big"))
+    loading.start()
+    started.wait(5)
+    # Another model does not wait for the slow load
+    small = backends.get_backend("slow", "small")
+    assert backends.get_backend("slow", "small") is small
+    release.set()
+    loading.join(5)
+    assert sorted(loads) == ["big", "small"]
+
+
+def test_engines_count_against_the_model_budget(monkeypatch):
+    monkeypatch.setattr(model_cache, "MAX_MODELS", 1)
+
+    class Engine(backends.Backend):
+        name = "stub"
+
+    monkeypatch.setitem(backends.BACKENDS, "stub", Engine)
+    first = backends.get_backend("stub", "tiny")
+    backends.get_backend("stub", "base")
+    assert [key[0] for key, _ in model_cache.loaded_models()] == ["stub:base"]
+    assert backends.get_backend("stub", "tiny") is not first
@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("whisper")
+
+from utils.whisper import batch
+
+
+class _ThreadPool(ThreadPoolExecutor):
+    """Stands in for the spawn process pool; workers would load real models."""
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers)
+
+
+@pytest.fixture
+def processed(monkeypatch):
+    calls = []
+
+    def process(path, task):
+        calls.append(os.path.basename(path))
+        if os.path.basename(path).startswith("bad"):
+            raise RuntimeError("decode failed")
+        return {task: {"text": " hi", "segments": [], "language": "en"}}, 2.0, 0.5
+
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", _ThreadPool)
+    monkeypatch.setattr(batch, "_process", process)
+    return calls
+
+
+def _media(folder, name, data=b"audio"):
+    path = folder / name
+    path.write_bytes(data)
+    return path
+
+
+def test_rerun_skips_files_already_done(tmp_path, processed):
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    _media(inputs, "a.wav")
+    _media(inputs, "b.mp3")
+    out = str(tmp_path / "out")
+
+    first = batch.run_batch([str(inputs)], out, log=lambda line: None)
+    assert first["done"] == 2 and sorted(processed) == ["a.wav", "b.mp3"]
+
+    processed.clear()
+    second = batch.run_batch([str(inputs)], out, log=lambda line: None)
+    assert second["skipped"] == 2 and processed == []
+
+
+def test_changed_or_failed_files_are_redone(tmp_path, processed):
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    _media(inputs, "a.wav")
+    changed = _media(inputs, "b.wav")
+    _media(inputs, "bad.wav")
+    out = str(tmp_path / "out")
+
+    first = batch.run_batch([str(inputs)], out, log=lambda line: None)
+    assert first["done"] == 2 and first["failed"] == 1
+
+    changed.write_bytes(b"re-recorded audio")
+    os.utime(changed, ns=(1, 1))
+    processed.clear()
+    second = batch.run_batch([str(inputs)], out, log=lambda line: None)
+    assert sorted(processed) == ["b.wav", "bad.wav"]
+    assert second["skipped"] == 1
+
+    manifest = batch.load_manifest(out)
+    assert manifest[str(changed)]["fingerprint"] == batch._fingerprint(str(changed))
+    assert manifest[str(inputs / "bad.wav")]["status"] == "failed"
+
+
+def test_truncated_manifest_line_is_ignored(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / batch.MANIFEST_NAME).write_text('{"path": "a.wav", "status": "done"}\n{"path": "b.w')
+    assert list(batch.load_manifest(str(out))) == ["a.wav"]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utils.compact_transcript import CompactTranscript, compact, segment_texts
+
+
+@pytest.fixture
+def result(make_result):
+    result = make_result("héllo world", "second line here")
+    result["segments"].append({"id": 2, "start": 4.0, "end": 5.0, "text": " no words"})
+    return result
+
+
+def test_reads_like_the_whisper_result(result):
+    transcript = compact(result)
+    assert transcript["text"] == "".join(seg["text"] for seg in result["segments"])
+    assert transcript["language"] == "en"
+    assert len(transcript["segments"]) == 3
+    assert transcript["segments"][-1]["text"] == " no words"
+    assert "words" not in transcript["segments"][-1]
+    assert [w["word"] for w in transcript["segments"][1]["words"]] == [" second", " line", " here"]
+    assert segment_texts(transcript) == segment_texts(result)
+
+
+def test_compact_is_idempotent_and_passes_none(result):
+    transcript = compact(result)
+    assert compact(transcript) is transcript
+    assert compact(None) is None
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_bytes_round_trip(result, compress):
+    transcript = compact(result)
+    restored = CompactTranscript.from_bytes(transcript.to_bytes(compress=compress))
+    assert restored.to_whisper() == transcript.to_whisper()
+    np.testing.assert_array_equal(restored.word_start, transcript.word_start)
+
+
+def test_rejects_other_bytes():
+    with pytest.raises(ValueError):
+        CompactTranscript.from_bytes(b"nope")
@@ -0,0 +1,53 @@
+import pytest
+
+st = pytest.importorskip("streamlit")
+pytest.importorskip("streamlit_ace")
+
+from components import editable_transcript
+from utils.compact_transcript import compact
+
+
+@pytest.fixture
+def session_state(monkeypatch):
+    state = {}
+    monkeypatch.setattr(st, "session_state", state)
+    return state
+
+
+def _panel_text(transcript) -> str:
+    return "".join(seg["text"] for seg in editable_transcript.timed_transcript(transcript)["segments"])
+
+
+def test_new_transcript_replaces_edits(session_state, make_result):
+    first = compact(make_result("hello world", "second line"))
+    session_state["transcript"] = first
+    session_state["edited_text"] = "hello world\nsecond line"
+    session_state[editable_transcript._editor_key()] = "hello there world\nsecond line"
+    assert "there" in _panel_text(first)
+
+    # A job result, library hit or mode change lands a new transcript
+    second = compact(make_result("brand new recording"))
+    session_state["transcript"] = second
+    editable_transcript.clear_edits()
+
+    assert "edited_text" not in session_state
+    assert editable_transcript._editor_key() not in session_state
+    assert _panel_text(second).split() == ["brand", "new", "recording"]
+
+
+def test_unedited_transcript_is_returned_as_is(session_state, make_result):
+    transcript = compact(make_result("just one line"))
+    assert editable_transcript.timed_transcript(transcript) is transcript
+
+
+def test_timed_transcript_is_worked_out_once_per_rerun(session_state, make_result, monkeypatch):
+    transcript = compact(make_result("hello world", "second line"))
+    session_state[editable_transcript._editor_key()] = "hello there world\nsecond line"
+    calls = []
+    update = editable_transcript.realign.update
+    monkeypatch.setattr(editable_transcript.realign, "update",
+                        lambda alignment, text: calls.append(text) or update(alignment, text))
+
+    first = editable_transcript.timed_transcript(transcript)
+    assert editable_transcript.timed_transcript(transcript) is first
+    assert len(calls) == 1
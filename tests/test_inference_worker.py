@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("whisper")
+
+from utils.whisper import inference_worker
+from utils.whisper.inference_worker import TIME_PRECISION, _split_segments
+
+BEGIN = 1000   # first timestamp token
+EOT = 999
+
+
+class Tokenizer:
+    timestamp_begin = BEGIN
+    eot = EOT
+
+    def decode(self, tokens):
+        return "".join(f" w{t}" for t in tokens)
+
+
+def ts(seconds: float) -> int:
+    return BEGIN + round(seconds / TIME_PRECISION)
+
+
+def _split(tokens, seek=1500, clip=(15.0, 45.0)):
+    result = SimpleNamespace(tokens=tokens, temperature=0.0, avg_logprob=-0.3,
+                             compression_ratio=1.1, no_speech_prob=0.01)
+    request = SimpleNamespace(seek=seek, clip=list(clip), frames=3000)
+    return _split_segments(result, Tokenizer(), request)
+
+
+def test_segments_between_timestamp_pairs_are_offset_by_the_window():
+    segments = _split([ts(0), 1, 2, ts(2.0), ts(2.0), 3, ts(4.0)])
+    assert [(s["start"], s["end"], s["text"]) for s in segments] == [
+        (15.0, 17.0, " w1 w2"), (17.0, 19.0, " w3")
+    ]
+    assert all(s["seek"] == 1500 for s in segments)
+
+
+def test_window_ending_mid_segment_keeps_its_text_up_to_the_clip_end():
+    segments = _split([ts(0), 1, ts(2.0), ts(2.0), 2, 3], clip=(15.0, 40.0))
+    assert segments[-1]["start"] == 17.0
+    assert segments[-1]["end"] == 40.0
+    assert segments[-1]["text"] == " w2 w3"
+
+
+def test_single_timestamp_pair_is_one_segment():
+    segments = _split([ts(0), 1, 2, ts(3.0)])
+    assert [(s["start"], s["end"]) for s in segments] == [(15.0, 18.0)]
+
+
+def test_segments_without_text_are_dropped():
+    assert _split([ts(0), ts(2.0), ts(2.0), EOT]) == []
+
+
+def _requests(*owners):
+    return [inference_worker._Request(None, 0, 0, [0.0, 30.0], "transcribe", None, owner) for owner in owners]
+
+
+def test_batches_take_one_window_per_call(monkeypatch):
+    batches = []
+
+    def decode_batch(key, batch):
+        batches.append([r.owner for r in batch])
+        return [{"segments": []}] * len(batch)
+
+    monkeypatch.setattr(inference_worker, "_decode_batch", decode_batch)
+    worker = inference_worker._Worker(("stub", "cpu", "float32"))
+    job, other = object(), object()
+    requests = _requests(job, job, other)
+    for request in requests:
+        worker.submit(request)
+
+    results = [r.future.result(timeout=5) for r in requests]
+    assert batches == [[job, other]]
+    # The job's second window had no partner left and goes back to its caller
+    assert results[1] is inference_worker._ALONE
+
+
+def test_failed_batch_hands_windows_back(monkeypatch):
+    def decode_batch(key, batch):
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(inference_worker, "_decode_batch", decode_batch)
+    worker = inference_worker._Worker(("stub", "cpu", "float32"))
+    requests = _requests(object(), object())
+    for request in requests:
+        worker.submit(request)
+    assert all(r.future.result(timeout=5) is inference_worker._ALONE for r in requests)
+    assert worker.thread.is_alive()
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+pytest.importorskip("whisper")
+
+from utils import jobs
+
+
+@pytest.fixture
+def job_table(monkeypatch):
+    table = {}
+    monkeypatch.setattr(jobs, "_jobs", table)
+    return table
+
+
+def _job(table, status=jobs.QUEUED) -> jobs.Job:
+    job = jobs.Job("Transcribe", "clip.wav", "session")
+    job.status = status
+    table[job.id] = job
+    return job
+
+
+def test_job_cancelled_before_start_is_finished(job_table):
+    job = _job(job_table)
+    job._cancel.set()
+    jobs._run_job(job)
+    assert job.status == jobs.CANCELLED
+    assert job.finished is not None
+    jobs._prune()   # used to fail on now - None
+
+
+def test_prune_keeps_recent_and_unfinished_jobs(job_table):
+    old = _job(job_table, jobs.DONE)
+    old.finished = time.time() - jobs.JOB_TTL_SECONDS - 1
+    recent = _job(job_table, jobs.FAILED)
+    recent.finished = time.time()
+    running = _job(job_table, jobs.RUNNING)
+    jobs._prune()
+    assert set(job_table) == {recent.id, running.id}
+
+
+def test_cancel_running_job_stops_at_next_progress_report(job_table):
+    job = _job(job_table, jobs.RUNNING)
+    job._report(10.0, 40.0)
+    assert job.progress == 0.25
+    assert jobs.cancel(job.id)
+    with pytest.raises(jobs.JobCancelled):
+        job._report(20.0, 40.0)
+    assert not jobs.cancel(_job(job_table, jobs.DONE).id)
+
+
+def test_long_transcribe_job_uses_parallel_long_form_path(job_table, monkeypatch, tmp_path):
+    import numpy as np
+
+    from utils.whisper import long_form, result_cache, whisper_service
+
+    media = tmp_path / "long.wav"
+    media.write_bytes(b"not really audio")
+    seconds = long_form.MIN_SECONDS + 60
+    monkeypatch.setattr(whisper_service, "load_audio",
+                        lambda path: np.zeros(int(seconds * 16000), dtype=np.float32))
+    monkeypatch.setattr(result_cache, "get", lambda key: None)
+    monkeypatch.setattr(result_cache, "put", lambda key, result: None)
+    monkeypatch.setattr(jobs, "_add_to_library", lambda job: None)
+    monkeypatch.setattr(long_form, "DEFAULT_WORKERS", 2)
+
+    calls = []
+
+    def fake_iter_long(audio, task, **kwargs):
+        calls.append(len(audio))
+        yield [{"start": 0.0, "end": 1.0, "text": " one"}], seconds / 2, "en"
+        yield [{"start": seconds - 1, "end": seconds, "text": " two"}], seconds, "en"
+
+    monkeypatch.setattr(long_form, "iter_long", fake_iter_long)
+
+    job = jobs.Job("Transcribe", str(media), "session")
+    jobs._execute(job)
+
+    assert job.status == jobs.DONE, job.error
+    assert calls == [int(seconds * 16000)]
+    assert [seg["id"] for seg in job.segments] == [0, 1]
+    assert job.transcript["text"] == " one two"
+    assert job.progress == 1.0
+
+
+def test_two_pass_job_with_a_fixed_model_does_not_load_audio(monkeypatch):
+    monkeypatch.setattr(jobs, "load_audio", lambda path: pytest.fail("audio loaded"))
+    job = jobs.Job("Transcribe", "clip.wav", "session", model="small", two_pass=True)
+    jobs._resolve_model(job)
+    assert job.model == "small"
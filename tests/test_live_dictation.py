@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+pytest.importorskip("whisper")
+
+from utils.whisper import live_dictation
+
+
+class _Model:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **options):
+        self.calls += 1
+        words = [{"word": " hello", "start": 0.0, "end": 0.4}, {"word": " world", "start": 0.5, "end": 0.9}]
+        return {"segments": [{"words": words}], "language": "en"}
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = _Model()
+
+    @contextmanager
+    def use_model(name):
+        yield model
+
+    monkeypatch.setattr(live_dictation, "use_model", use_model)
+    return model
+
+
+def _second():
+    return np.zeros(live_dictation.SAMPLE_RATE, dtype=np.float32)
+
+
+def test_step_skips_when_no_audio_arrived(model):
+    dictation = live_dictation.LiveDictation()
+    dictation.step()
+    assert model.calls == 0
+
+    dictation.feed(_second())
+    dictation.step()
+    dictation.step()
+    assert model.calls == 1
+
+    dictation.feed(_second())
+    dictation.step()
+    committed, tentative, latency = dictation.snapshot()
+    assert model.calls == 2
+    assert "".join(seg["text"] for seg in committed) == " hello world"
+    assert tentative == [] and latency is not None
+
+
+def test_thread_ends_when_the_stream_stalls(model, monkeypatch):
+    monkeypatch.setattr(live_dictation, "STEP_SECONDS", 0.01)
+    monkeypatch.setattr(live_dictation, "IDLE_SECONDS", 0.05)
+    dictation = live_dictation.LiveDictation()
+    dictation.feed(_second())
+    dictation.start()
+    dictation._thread.join(2)
+    assert not dictation._thread.is_alive()
+    assert model.calls == 1
+
+    # New audio and start() bring it back
+    dictation.feed(_second())
+    dictation.start()
+    assert dictation._thread.is_alive()
+    dictation.stop()
+
+
+def test_snapshot_is_not_changed_by_later_steps(model):
+    dictation = live_dictation.LiveDictation()
+    dictation.feed(_second())
+    dictation.step()
+    before, _, _ = dictation.snapshot()
+    dictation.feed(_second())
+    dictation.step()
+    after, _, _ = dictation.snapshot()
+    assert before == [] and len(after) == 1
@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("whisper")
+
+from utils.whisper import long_form
+from utils.whisper.long_form import SAMPLE_RATE, merge_results, split_windows
+
+
+def _window_result(words):
+    """Whisper result for one window from (word, start, end) in window-local seconds."""
+    return {"language": "en", "segments": [{
+        "start": words[0][1], "end": words[-1][2],
+        "text": "".join(" " + w for w, _, _ in words), "tokens": [1, 2, 3],
+        "words": [{"word": " " + w, "start": s, "end": e} for w, s, e in words],
+    }]}
+
+
+def test_split_windows_overlap_and_cover():
+    windows = split_windows(25 * SAMPLE_RATE, window_s=10, overlap_s=2)
+    assert windows[0] == (0, 10 * SAMPLE_RATE)
+    assert windows[1][0] == 8 * SAMPLE_RATE
+    assert windows[-1][1] == 25 * SAMPLE_RATE
+
+
+def test_merge_keeps_overlap_words_once():
+    windows = [(0, 10 * SAMPLE_RATE), (8 * SAMPLE_RATE, 16 * SAMPLE_RATE)]
+    # The overlap is 8-10 s and is split at 9 s; both windows heard "shared" and "words"
+    first = _window_result([("one", 1.0, 2.0), ("shared", 8.2, 8.8), ("words", 9.2, 9.8)])
+    second = _window_result([("shared", 0.2, 0.8), ("words", 1.2, 1.8), ("two", 5.0, 5.5)])
+
+    merged = merge_results([first, second], windows)
+
+    assert merged["text"].split() == ["one", "shared", "words", "two"]
+    assert [seg["id"] for seg in merged["segments"]] == [0, 1]
+    tail = merged["segments"][1]
+    assert tail["start"] == pytest.approx(9.2)
+    assert tail["words"][-1]["end"] == pytest.approx(13.5)
+    assert tail["tokens"] == []   # clipped text no longer matches its tokens
+
+
+def test_idle_pools_beyond_the_limit_are_shut_down(monkeypatch):
+    class FakePool:
+        def __init__(self, **kwargs):
+            self.closed = False
+
+        def shutdown(self, wait=True):
+            self.closed = True
+
+    monkeypatch.setattr(long_form, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(long_form, "_pools", long_form.OrderedDict())
+    monkeypatch.setattr(long_form, "MAX_POOLS", 1)
+
+    with long_form._use_pool("tiny", None, "float32", 2) as tiny:
+        pass
+    with long_form._use_pool("base", None, "float32", 2) as base:
+        assert tiny.closed
+        # A pool still in use survives, even over the limit
+        with long_form._use_pool("small", None, "float32", 2) as small:
+            assert not base.closed
+        assert small.closed
+    assert not base.closed
+    assert list(long_form._pools) == [("base", None, "float32", 2)]
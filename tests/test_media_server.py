@@ -0,0 +1,70 @@
+import http.client
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from utils import media_server
+
+BODY = bytes(range(256)) * 4   # 1024 bytes
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), media_server._MediaHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def url(tmp_path):
+    path = tmp_path / "clip.mp3"
+    path.write_bytes(BODY)
+    return media_server.media_path_url(str(path))
+
+
+def _get(port, url, range_header=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", url, headers={"Range": range_header} if range_header else {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def test_whole_file(server, url):
+    response, body = _get(server, url)
+    assert response.status == 200
+    assert response.getheader("Accept-Ranges") == "bytes"
+    assert body == BODY
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=100-199", 100, 199),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+])
+def test_ranges(server, url, header, start, end):
+    response, body = _get(server, url, header)
+    assert response.status == 206
+    assert response.getheader("Content-Range") == f"bytes {start}-{end}/{len(BODY)}"
+    assert body == BODY[start:end + 1]
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=2000-3000", "bytes=500-100"])
+def test_unsatisfiable_range(server, url, header):
+    response, body = _get(server, url, header)
+    assert response.status == 416
+    assert response.getheader("Content-Range") == f"bytes */{len(BODY)}"
+    assert body == b""
+
+
+def test_unknown_token_and_pruned_file(server, url, tmp_path):
+    assert _get(server, "/media/nope/clip.mp3")[0].status == 404
+    (tmp_path / "clip.mp3").unlink()
+    media_server.prune_tokens()
+    assert _get(server, url)[0].status == 404
@@ -0,0 +1,46 @@
+import pytest
+
+from utils import metrics
+from utils.whisper import model_selection
+
+
+@pytest.fixture(autouse=True)
+def no_events():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _run(seconds, audio_seconds=10.0, **labels):
+    metrics.record({"stage": "inference", "model": "tiny", "backend": "openai",
+                    "seconds": seconds, "audio_seconds": audio_seconds, **labels})
+
+
+def test_rtf_is_measured_per_task_and_path():
+    _run(1.0, task="transcribe")
+    _run(3.0, task="translate")
+    _run(0.2, task="transcribe", long_form=True)
+    _run(0.1, task="batch", batch_size=8)
+
+    assert model_selection.measured_rtf("tiny") == pytest.approx(0.1)
+    assert model_selection.measured_rtf("tiny", task="translate") == pytest.approx(0.3)
+    assert model_selection.measured_rtf("tiny", long_form=True) == pytest.approx(0.02)
+    assert model_selection.measured_rtf("base") is None
+
+
+def test_estimate_counts_every_task():
+    _run(1.0, task="transcribe")
+    _run(2.0, task="translate")
+    one = model_selection.estimate_seconds("tiny", 100.0)
+    both = model_selection.estimate_seconds("tiny", 100.0, tasks=("transcribe", "translate"))
+    assert one == pytest.approx(10.0)
+    assert both == pytest.approx(30.0)
+
+
+def test_translate_jobs_need_a_faster_model():
+    # Transcribing fits the budget with "small", transcribing and translating does not
+    duration = 0.9 * model_selection.LATENCY_BUDGET_SECONDS / model_selection.PRIOR_RTF["small"]
+    candidates = ["tiny", "small"]
+    assert model_selection.choose_model(duration, candidates=candidates) == "small"
+    assert model_selection.choose_model(duration, candidates=candidates,
+                                        tasks=("transcribe", "translate")) == "tiny"
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from utils import realign
+from utils.compact_transcript import compact
+
+
+@pytest.fixture
+def base(make_result):
+    # Words are 0.5 s long and back to back: "alpha" 0-0.5 ... "zeta" 2.5-3.0
+    return realign.from_transcript(compact(make_result("alpha beta gamma", "delta epsilon zeta")))
+
+
+def _times(alignment, word):
+    k = next(i for i in range(len(alignment)) if alignment.word(i) == word)
+    return float(alignment.start[k]), float(alignment.end[k])
+
+
+def test_editor_text_is_one_stripped_line_per_segment(base):
+    assert base.text == "alpha beta gamma\ndelta epsilon zeta"
+    assert _times(base, "delta") == (1.5, 2.0)
+
+
+def test_unchanged_text_returns_the_same_alignment(base):
+    assert realign.update(base, base.text) is base
+
+
+def test_replaced_word_takes_the_old_span_and_others_keep_theirs(base):
+    edited = realign.update(base, "alpha BETTER gamma\ndelta epsilon zeta")
+    assert _times(edited, "BETTER") == pytest.approx((0.5, 1.0))
+    assert edited.prob[1] == 0.0
+    for word in ("alpha", "gamma", "delta", "zeta"):
+        assert _times(edited, word) == _times(base, word)
+
+
+def test_words_after_the_edit_shift_by_the_length_change(base):
+    edited = realign.update(base, "alpha beta gamma gamma\ndelta epsilon zeta")
+    k = len(edited) - 1
+    assert edited.word(k) == "zeta"
+    assert edited.char_start[k] == base.char_start[-1] + len(" gamma")
+    assert len(edited) == len(base) + 1
+
+
+def test_inserted_word_without_a_pause_shares_a_neighbour(base):
+    edited = realign.update(base, "alpha new beta gamma\ndelta epsilon zeta")
+    # "new" and "beta" split beta's old 0.5-1.0 s span between them
+    start, end = _times(edited, "new")
+    assert 0.5 == start < end == _times(edited, "beta")[0]
+    assert _times(edited, "beta")[1] == 1.0
+    assert np.all(np.diff(edited.start) >= 0)
+
+
+def test_incremental_edits_match_a_single_edit(base):
+    step = realign.update(realign.update(base, "ALPHA beta gamma\ndelta epsilon zeta"),
+                          "ALPHA beta gamma\ndelta epsilon ZETA")
+    once = realign.update(base, "ALPHA beta gamma\ndelta epsilon ZETA")
+    assert step.text == once.text
+    np.testing.assert_allclose(step.start, once.start)
+    np.testing.assert_allclose(step.end, once.end)
+    np.testing.assert_array_equal(step.char_start, once.char_start)
+
+
+def test_transcript_follows_the_edited_lines(base):
+    edited = realign.update(base, "alpha beta\n\ngamma delta epsilon zeta")
+    transcript = edited.to_transcript()
+    assert [seg["text"] for seg in transcript["segments"]] == [" alpha beta", " gamma delta epsilon zeta"]
+    assert transcript["segments"][1]["start"] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("edits", [
+    ["alpha beta gamma\ndelta EPSILON zeta"],
+    ["alpha beta\ngamma\ndelta epsilon zeta", "alpha beta gamma delta epsilon zeta"],
+    ["new alpha beta gamma\ndelta epsilon zeta", "new alpha beta gamma\ndelta epsilon zeta end\nmore"],
+    ["alpha beta gamma\n\n\ndelta epsilon zeta", "alpha\n\ndelta epsilon zeta", "\n\nzeta"],
+    ["alpha beta gamma\ndelta epsilon zeta", "", "fresh words"],
+])
+def test_patched_transcript_matches_a_full_build(base, edits):
+    alignment = base
+    alignment.to_transcript()
+    for text in edits:
+        alignment = realign.update(alignment, text)
+        patched = alignment.to_transcript()
+        full = realign._build_transcript(alignment)
+        assert patched.text_buffer == full.text_buffer
+        assert patched.word_text_buffer == full.word_text_buffer
+        for name in ("seg_start", "seg_end", "seg_text_offsets", "seg_word_offsets",
+                     "word_start", "word_end", "word_prob", "word_text_offsets"):
+            np.testing.assert_array_equal(getattr(patched, name), getattr(full, name), err_msg=name)
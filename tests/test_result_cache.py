@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from utils.whisper import result_cache
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(result_cache, "CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "clip.wav"
+    path.write_bytes(b"first recording")
+    return path
+
+
+def _compute(calls, text="hello"):
+    def compute():
+        calls.append(text)
+        return {"text": text, "segments": []}
+    return compute
+
+
+def test_second_run_is_a_hit(cache_dir, media):
+    calls = []
+    first = result_cache.cached(str(media), "tiny", "transcribe", {"vad": True}, _compute(calls))
+    second = result_cache.cached(str(media), "tiny", "transcribe", {"vad": True}, _compute(calls))
+    assert first == second == {"text": "hello", "segments": []}
+    assert calls == ["hello"]
+
+
+def test_model_task_and_options_invalidate(cache_dir, media):
+    calls = []
+    result_cache.cached(str(media), "tiny", "transcribe", {"vad": True}, _compute(calls))
+    result_cache.cached(str(media), "base", "transcribe", {"vad": True}, _compute(calls))
+    result_cache.cached(str(media), "tiny", "translate", {"vad": True}, _compute(calls))
+    result_cache.cached(str(media), "tiny", "transcribe", {"vad": False}, _compute(calls))
+    assert len(calls) == 4
+
+
+def test_changed_media_content_is_a_miss(cache_dir, media):
+    calls = []
+    result_cache.cached(str(media), "tiny", "transcribe", {}, _compute(calls))
+    media.write_bytes(b"a different recording")
+    os.utime(media, ns=(1, 1))
+    result_cache.cached(str(media), "tiny", "transcribe", {}, _compute(calls))
+    assert len(calls) == 2
+
+
+def test_corrupt_entry_is_dropped(cache_dir):
+    key = result_cache.cache_key("abc", "tiny", "transcribe", {})
+    result_cache.put(key, {"text": "x"})
+    path = result_cache._entry_path(key)
+    with open(path, "wb") as f:
+        f.write(b"not zlib")
+    assert result_cache.get(key) is None
+    assert not os.path.exists(path)
+
+
+def test_evict_removes_least_recently_used(cache_dir):
+    keys = [result_cache.cache_key(str(i), "tiny", "transcribe", {}) for i in range(3)]
+    for i, key in enumerate(keys):
+        result_cache.put(key, {"text": "x" * 1000, "i": i})
+        os.utime(result_cache._entry_path(key), (i + 1, i + 1))
+    size = os.path.getsize(result_cache._entry_path(keys[0]))
+    result_cache.evict(2 * size)
+    assert result_cache.get(keys[0]) is None
+    assert result_cache.get(keys[2]) is not None
@@ -0,0 +1,54 @@
+import gc
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+from utils import state_helpers
+
+
+def _app():
+    import streamlit as st
+    from utils.state_helpers import end_run, track_session
+
+    track_session()
+    if "transcript" not in st.session_state:
+        st.session_state["transcript"] = "word " * 1000
+    st.write(len(st.session_state["transcript"]))
+    end_run()
+
+
+@pytest.fixture
+def sessions(monkeypatch, tmp_path):
+    monkeypatch.setattr(state_helpers, "_sessions", {})
+    monkeypatch.setattr(state_helpers, "SPILL_DIR", str(tmp_path))
+    return state_helpers._sessions
+
+
+def test_idle_session_is_spilled_and_reloaded_on_its_next_run(sessions, tmp_path):
+    app = AppTest.from_function(_app)
+    app.run()
+    # The first run's ScriptRunner is gone; the session must still be tracked
+    gc.collect()
+    (session_id,) = sessions
+
+    state_helpers.enforce_budget(budget=0, idle_seconds=0)
+    assert session_id in sessions
+    assert os.path.exists(tmp_path / session_id / "transcript")
+    assert isinstance(app.session_state["transcript"], state_helpers.Spilled)
+
+    app.run()
+    assert not app.exception
+    assert app.session_state["transcript"] == "word " * 1000
+    assert not os.path.exists(tmp_path / session_id / "transcript")
+
+
+def test_session_in_a_run_is_not_spilled(sessions):
+    app = AppTest.from_function(_app)
+    app.run()
+    (entry,) = sessions.values()
+    entry["running"] = True
+    state_helpers.enforce_budget(budget=0, idle_seconds=0)
+    assert app.session_state["transcript"] == "word " * 1000
@@ -0,0 +1,58 @@
+import io
+import os
+import time
+
+import pytest
+
+from utils import upload_store
+
+
+@pytest.fixture
+def store_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(upload_store, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(upload_store, "BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(upload_store, "SESSION_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr(upload_store, "_stored", {})
+    return tmp_path
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_identical_uploads_share_one_blob(store_dir):
+    a, hash_a = upload_store.store(b"same audio", "talk.mp3", "session-a")
+    b, hash_b = upload_store.store(io.BufferedReader(io.BytesIO(b"same audio")), "copy.mp3", "session-b")
+    assert hash_a == hash_b
+    assert a != b
+    assert os.listdir(store_dir / "blobs") == [hash_a + ".mp3"]
+    assert os.stat(a).st_ino == os.stat(b).st_ino
+
+
+def test_rerun_with_the_same_token_is_free(store_dir, monkeypatch):
+    first = upload_store.store(b"audio", "talk.mp3", "session", token="file-1")
+    monkeypatch.setattr(upload_store, "_write_blob", lambda *args: pytest.fail("written again"))
+    assert upload_store.store(b"audio", "talk.mp3", "session", token="file-1") == first
+
+
+def test_janitor_expires_idle_sessions_and_orphaned_blobs(store_dir):
+    old, old_hash = upload_store.store(b"old audio", "old.mp3", "idle")
+    new, _ = upload_store.store(b"new audio", "new.mp3", "active")
+    blob = store_dir / "blobs" / (old_hash + ".mp3")
+    for path in (old, os.path.dirname(old), blob):
+        _age(path, upload_store.MAX_AGE_SECONDS + 60)
+
+    upload_store.cleanup()
+    assert not os.path.exists(os.path.dirname(old))
+    assert not blob.exists()
+    assert os.path.exists(new)
+
+
+def test_janitor_evicts_the_oldest_blob_over_budget(store_dir):
+    old, _ = upload_store.store(b"x" * 100, "old.mp3", "s")
+    new, _ = upload_store.store(b"y" * 100, "new.mp3", "s")
+    _age(old, 60)
+    upload_store.cleanup(max_bytes=150)
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from utils.whisper import vad
+
+SR = vad.SAMPLE_RATE
+
+
+def _audio(*parts):
+    """Concatenate (seconds, is_speech) parts: a 220 Hz tone for speech, zeros for silence."""
+    chunks = []
+    for seconds, speech in parts:
+        n = int(seconds * SR)
+        t = np.arange(n) / SR
+        chunks.append((0.5 * np.sin(2 * np.pi * 220 * t) if speech else np.zeros(n)).astype(np.float32))
+    return np.concatenate(chunks)
+
+
+def test_all_silence_is_passed_through():
+    audio = _audio((10, False))
+    assert len(vad.speech_regions(audio)) == 0
+    trimmed, timeline = vad.trim(audio, enabled=True)
+    assert trimmed is audio and timeline is None
+    assert vad.kept_seconds(audio, enabled=True) == 10
+
+
+def test_all_speech_is_one_region_and_not_trimmed():
+    audio = _audio((8, True))
+    np.testing.assert_array_equal(vad.speech_regions(audio), [[0, len(audio)]])
+    trimmed, timeline = vad.trim(audio, enabled=True)
+    assert trimmed is audio and timeline is None
+
+
+def test_short_pauses_are_bridged_and_long_ones_cut():
+    short = vad.MIN_SILENCE_SECONDS / 2
+    assert len(vad.speech_regions(_audio((3, True), (short, False), (3, True)))) == 1
+
+    regions = vad.speech_regions(_audio((3, True), (5, False), (3, True)))
+    assert len(regions) == 2
+    pad = vad.PAD_SECONDS * SR
+    assert regions[0][1] == pytest.approx(3 * SR + pad, abs=vad.FRAME_SECONDS * SR)
+    assert regions[1][0] == pytest.approx(8 * SR - pad, abs=vad.FRAME_SECONDS * SR)
+
+
+def test_trim_and_restore_map_times_back():
+    audio = _audio((3, True), (5, False), (3, True))
+    trimmed, timeline = vad.trim(audio, enabled=True)
+    assert timeline is not None
+    assert len(trimmed) / SR == pytest.approx(vad.kept_seconds(audio, enabled=True))
+    assert timeline.skipped_seconds == pytest.approx(5 - 2 * vad.PAD_SECONDS, abs=0.05)
+
+    first_end = timeline.kept_start[0] + timeline.length[0]
+    second = timeline.kept_start[1]
+    # Inside a region: shifted by where the region sits in the original
+    assert timeline.to_original(1.0) == pytest.approx(1.0)
+    assert timeline.to_original(second + 1.0) == pytest.approx(timeline.orig_start[1] + 1.0)
+    # Inside the join between regions: the end of the region before it
+    assert timeline.to_original((first_end + second) / 2) == pytest.approx(
+        timeline.orig_start[0] + timeline.length[0])
+
+    result = {"segments": [{"start": second + 0.5, "end": second + 1.5,
+                            "words": [{"start": second + 0.5, "end": second + 1.0}]}]}
+    vad.restore(result, timeline)
+    assert result["segments"][0]["start"] == pytest.approx(timeline.orig_start[1] + 0.5)
+    assert result["segments"][0]["words"][0]["end"] == pytest.approx(timeline.orig_start[1] + 1.0)
+    assert result["vad"]["regions"] == 2
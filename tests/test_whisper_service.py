@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("whisper")
+
+from utils.whisper import whisper_service
+
+WORDS = 200
+SEGMENT_WORDS = {"transcribe": 5, "translate": 7}
+
+
+def _word(k):
+    start = k * 0.5 + 0.3
+    return start, start + 0.45
+
+
+def _decode_window(mel, clip, task, *args, **kwargs):
+    """Every word starting inside the clip; one cut off at the clip end is marked with ~."""
+    c0, c1 = clip
+    segments = {}
+    for k in range(WORDS):
+        start, end = _word(k)
+        if c0 <= start < c1:
+            word = {"word": f" w{k}" + ("~" if end > c1 else ""), "start": start, "end": min(end, c1)}
+            segments.setdefault(k // SEGMENT_WORDS[task], []).append(word)
+    return {
+        "segments": [
+            {"start": words[0]["start"], "end": words[-1]["end"],
+             "text": "".join(w["word"] for w in words), "words": words}
+            for words in segments.values()
+        ],
+        "language": "en",
+    }
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_shared_windows_neither_cut_nor_repeat_words(monkeypatch, parallel):
+    monkeypatch.setattr(whisper_service.inference_worker, "transcribe_window", _decode_window)
+    duration = _word(WORDS - 1)[1]
+    transcript, translation = whisper_service._transcribe_windows(
+        None, duration, ("transcribe", "translate"), "tiny", None, "float32", None, parallel
+    )
+    expected = [f"w{k}" for k in range(WORDS)]
+    assert transcript["text"].split() == expected
+    assert translation["text"].split() == expected
+    assert [seg["id"] for seg in transcript["segments"]] == list(range(len(transcript["segments"])))
+
+
+def test_edge_cut_keeps_a_window_that_would_stall():
+    segments = [{"start": 0.0, "end": 29.5, "text": " all"}, {"start": 0.0, "end": 29.9, "text": " of it"}]
+    seek, (kept,) = whisper_service._edge_cut([segments], 0.0, 30.0, 90.0)
+    assert seek == 30.0
+    assert kept == segments
@@ -0,0 +1,257 @@
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils import metrics
+from utils.whisper.result_cache import media_hash
+
+SAMPLE_RATE = 16000
+
+# Decoded 16 kHz float32 PCM of non-WAV media, one raw file per content hash
+CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR", "assets/pcm_cache/")
+MAX_CACHE_BYTES = int(os.environ.get("AUDIO_CACHE_BYTES", str(5 * 1024 ** 3)))
+
+# Output samples per filter block; bounds the temporary window matrix
+_BLOCK = 1 << 16
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_decode_locks = {}
+_decode_locks_lock = threading.Lock()
+
+
+# --- WAV fast path ---
+
+def _wav_layout(path: str):
+    """
+    (format, channels, rate, bits, data_offset, data_bytes) of a RIFF/WAVE
+    file, or None when it is not a WAV this module can read directly.
+    """
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                body = f.read(size)
+                if len(body) < 16:
+                    return None
+                code, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", body)
+                if code == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    # The first two bytes of the sub-format GUID hold the real format code
+                    code = struct.unpack_from("<H", body, 24)[0]
+                fmt = (code, channels, rate, bits)
+                if size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    return None
+                offset = f.tell()
+                remaining = os.fstat(f.fileno()).st_size - offset
+                # Streaming writers leave the size as 0 or 0xFFFFFFFF
+                if size == 0 or size > remaining:
+                    size = remaining
+                return fmt + (offset, size)
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def _read_wav(path: str):
+    """16 kHz mono float32 from a PCM or float WAV, or None if unsupported."""
+    layout = _wav_layout(path)
+    if layout is None:
+        return None
+    code, channels, rate, bits, offset, size = layout
+    if not channels or not rate:
+        return None
+
+    width = bits // 8
+    frames = size // (width * channels)
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    count = frames * channels
+
+    if code == _WAVE_FORMAT_PCM and bits == 16:
+        pcm = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(count,))
+        samples = pcm.astype(np.float32) / 32768.0
+    elif code == _WAVE_FORMAT_PCM and bits == 32:
+        pcm = np.memmap(path, dtype="<i4", mode="r", offset=offset, shape=(count,))
+        samples = (pcm / 2147483648.0).astype(np.float32)
+    elif code == _WAVE_FORMAT_PCM and bits == 24:
+        raw = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(count * 3,))
+        raw = raw.reshape(-1, 3).astype(np.int32)
+        pcm = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        pcm = np.where(pcm & 0x800000, pcm - (1 << 24), pcm)
+        samples = pcm.astype(np.float32) / 8388608.0
+    elif code == _WAVE_FORMAT_PCM and bits == 8:
+        pcm = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(count,))
+        samples = (pcm.astype(np.float32) - 128.0) / 128.0
+    elif code == _WAVE_FORMAT_FLOAT and bits in (32, 64):
+        pcm = np.memmap(path, dtype="<f4" if bits == 32 else "<f8", mode="r",
+                        offset=offset, shape=(count,))
+        samples = pcm.astype(np.float32)
+    else:
+        return None
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return resample(samples, rate)
+
+
+# --- Resampling ---
+
+def _lowpass_taps(factor: int) -> np.ndarray:
+    """Hamming-windowed sinc low-pass for decimating by `factor`."""
+    n = 16 * factor + 1
+    k = np.arange(n) - (n - 1) / 2
+    cutoff = 0.475 / factor   # a little under the new Nyquist
+    taps = 2 * cutoff * np.sinc(2 * cutoff * k) * np.hamming(n)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def _decimate(samples: np.ndarray, factor: int) -> np.ndarray:
+    taps = _lowpass_taps(factor)
+    half = len(taps) // 2
+    padded = np.pad(samples, (half, half))
+    # Only every factor-th filter output is computed
+    windows = sliding_window_view(padded, len(taps))[::factor]
+    out = np.empty(len(windows), dtype=np.float32)
+    for start in range(0, len(windows), _BLOCK):
+        out[start:start + _BLOCK] = windows[start:start + _BLOCK] @ taps
+    return out
+
+
+def _interpolate(samples: np.ndarray, rate: int, target: int) -> np.ndarray:
+    n_out = int(round(len(samples) * target / rate))
+    positions = np.arange(n_out, dtype=np.float64) * (rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def resample(samples: np.ndarray, rate: int, target: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample mono float32 audio with numpy only. Rates that are a multiple
+    of the target are low-pass filtered and decimated; other rates are first
+    interpolated up to the next multiple (e.g. 44.1 kHz -> 48 kHz) so the
+    anti-aliasing filter still applies. Rates below the target are
+    interpolated directly.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if rate == target or len(samples) == 0:
+        return samples
+    if rate < target:
+        return _interpolate(samples, rate, target)
+    factor = -(-rate // target)
+    if rate != factor * target:
+        samples = _interpolate(samples, rate, factor * target)
+    return _decimate(samples, factor)
+
+
+# --- Cached PCM for everything else ---
+
+def _cache_path(content_hash: str) -> str:
+    return os.path.join(CACHE_DIR, content_hash[:2], content_hash + ".f32")
+
+
+def _open_pcm(path: str) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    # Copy-on-write: pages are shared with the file until someone writes
+    return np.memmap(path, dtype=np.float32, mode="c")
+
+
+def _ffmpeg_to_pcm(media_path: str, output_path: str):
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-y", "-i", media_path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le", "-acodec", "pcm_f32le",
+        output_path,
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='replace')}") from e
+
+
+def _load_cached(media_path: str) -> np.ndarray:
+    """Decode with ffmpeg once per content hash, then memory-map the PCM."""
+    path = _cache_path(media_hash(media_path))
+    if os.path.exists(path):
+        os.utime(path)
+        return _open_pcm(path)
+
+    with _decode_locks_lock:
+        lock = _decode_locks.setdefault(path, threading.Lock())
+    with lock:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            os.close(fd)
+            try:
+                _ffmpeg_to_pcm(media_path, tmp_path)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            evict()
+    with _decode_locks_lock:
+        _decode_locks.pop(path, None)
+    return _open_pcm(path)
+
+
+def evict(max_bytes: int = MAX_CACHE_BYTES):
+    """Remove least recently used PCM files until the cache fits in max_bytes."""
+    if not max_bytes or not os.path.isdir(CACHE_DIR):
+        return
+
+    entries = []
+    total = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith(".f32"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # Still mapped on a platform that refuses to delete open files
+            continue
+        total -= size
+
+
+def load_audio(media_path: str) -> np.ndarray:
+    """
+    16 kHz mono float32 PCM for any supported media.
+    WAV files are read directly without a subprocess; everything else is
+    decoded by ffmpeg once and then memory-mapped from the PCM cache.
+    """
+    with metrics.stage("decode", bytes=os.path.getsize(media_path)) as event:
+        audio = _read_wav(media_path) if media_path.lower().endswith(".wav") else None
+        event["decoder"] = "wav"
+        if audio is None:
+            cached = os.path.exists(_cache_path(media_hash(media_path)))
+            audio = _load_cached(media_path)
+            event["decoder"] = "pcm_cache" if cached else "ffmpeg"
+        event["audio_seconds"] = len(audio) / SAMPLE_RATE
+    return audio
@@ -0,0 +1,212 @@
+import json
+import struct
+import zlib
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+_MAGIC = b"WCT1"
+
+
+class _Segments(Sequence):
+    """Read-only list of Whisper-shaped segment dicts, built on access."""
+
+    def __init__(self, transcript):
+        self._t = transcript
+
+    def __len__(self):
+        return len(self._t.seg_start)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._t.segment(i)
+
+
+class CompactTranscript(Mapping):
+    """
+    Array-backed Whisper result.
+
+    Segments and words are stored as float32 start/end columns plus int32
+    offsets into one text buffer each, instead of a dict per segment and
+    per word. It still reads like a Whisper result (transcript["segments"],
+    seg["text"], seg["words"]), converting rows to dicts only on access.
+    Decoder internals (tokens, logprobs, seek, ...) are not kept.
+    """
+
+    def __init__(self, seg_start, seg_end, seg_text_offsets, text,
+                 seg_word_offsets, word_start, word_end, word_prob,
+                 word_text_offsets, word_text, language=None):
+        self.seg_start = seg_start
+        self.seg_end = seg_end
+        self.seg_text_offsets = seg_text_offsets
+        self.text_buffer = text
+        self.seg_word_offsets = seg_word_offsets
+        self.word_start = word_start
+        self.word_end = word_end
+        self.word_prob = word_prob
+        self.word_text_offsets = word_text_offsets
+        self.word_text_buffer = word_text
+        self.language = language
+        self._memo = {}
+
+    # --- Construction ---
+
+    @classmethod
+    def from_whisper(cls, result):
+        if isinstance(result, CompactTranscript):
+            return result
+
+        segments = result.get("segments", [])
+        seg_texts = [seg["text"] for seg in segments]
+        words = [w for seg in segments for w in seg.get("words") or []]
+        word_texts = [w["word"] for w in words]
+
+        return cls(
+            seg_start=np.array([seg["start"] for seg in segments], dtype=np.float32),
+            seg_end=np.array([seg["end"] for seg in segments], dtype=np.float32),
+            seg_text_offsets=_offsets(seg_texts),
+            text="".join(seg_texts),
+            seg_word_offsets=np.cumsum(
+                [0] + [len(seg.get("words") or []) for seg in segments], dtype=np.int64
+            ).astype(np.int32),
+            word_start=np.array([w["start"] for w in words], dtype=np.float32),
+            word_end=np.array([w["end"] for w in words], dtype=np.float32),
+            word_prob=np.array([w.get("probability", 1.0) for w in words], dtype=np.float32),
+            word_text_offsets=_offsets(word_texts),
+            word_text="".join(word_texts),
+            language=result.get("language"),
+        )
+
+    # --- Row access ---
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter(("text", "segments", "language"))
+
+    def __getitem__(self, key):
+        if key == "text":
+            return self.text_buffer
+        if key == "segments":
+            return _Segments(self)
+        if key == "language":
+            return self.language
+        raise KeyError(key)
+
+    def segment_text(self, i: int) -> str:
+        return self.text_buffer[self.seg_text_offsets[i]:self.seg_text_offsets[i + 1]]
+
+    def segment_texts(self) -> list:
+        o = self.seg_text_offsets.tolist()
+        return [self.text_buffer[o[i]:o[i + 1]] for i in range(len(o) - 1)]
+
+    def words(self, i: int) -> list:
+        lo, hi = int(self.seg_word_offsets[i]), int(self.seg_word_offsets[i + 1])
+        o = self.word_text_offsets
+        return [
+            {"word": self.word_text_buffer[o[j]:o[j + 1]],
+             "start": round(float(self.word_start[j]), 3),
+             "end": round(float(self.word_end[j]), 3),
+             "probability": round(float(self.word_prob[j]), 3)}
+            for j in range(lo, hi)
+        ]
+
+    def segment(self, i: int) -> dict:
+        if i < 0:
+            i += len(self.seg_start)
+        if not 0 <= i < len(self.seg_start):
+            raise IndexError(i)
+        seg = {
+            "id": i,
+            "start": round(float(self.seg_start[i]), 3),
+            "end": round(float(self.seg_end[i]), 3),
+            "text": self.segment_text(i),
+        }
+        if self.seg_word_offsets[i + 1] > self.seg_word_offsets[i]:
+            seg["words"] = self.words(i)
+        return seg
+
+    def to_whisper(self) -> dict:
+        return {"text": self.text_buffer, "segments": list(self["segments"]), "language": self.language}
+
+    def memo(self, key, build):
+        """Cache a derived value (e.g. a front-end payload) on this immutable transcript."""
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def nbytes(self) -> int:
+        arrays = (self.seg_start, self.seg_end, self.seg_text_offsets, self.seg_word_offsets,
+                  self.word_start, self.word_end, self.word_prob, self.word_text_offsets)
+        return (sum(a.nbytes for a in arrays)
+                + len(self.text_buffer.encode("utf-8"))
+                + len(self.word_text_buffer.encode("utf-8")))
+
+    # --- Binary serialization ---
+
+    def to_bytes(self, compress: bool = True) -> bytes:
+        """
+        Layout: magic, header length, JSON header (array lengths, language),
+        then the raw little-endian arrays and both UTF-8 text buffers.
+        """
+        arrays = [self.seg_start, self.seg_end, self.seg_text_offsets, self.seg_word_offsets,
+                  self.word_start, self.word_end, self.word_prob, self.word_text_offsets]
+        texts = [self.text_buffer.encode("utf-8"), self.word_text_buffer.encode("utf-8")]
+        header = json.dumps({
+            "n_segments": len(self.seg_start),
+            "n_words": len(self.word_start),
+            "text_bytes": [len(t) for t in texts],
+            "language": self.language,
+        }).encode("utf-8")
+        body = b"".join([a.astype(a.dtype.newbyteorder("<")).tobytes() for a in arrays] + texts)
+        if compress:
+            body = zlib.compress(body, 6)
+        return _MAGIC + struct.pack("<?I", compress, len(header)) + header + body
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        if data[:4] != _MAGIC:
+            raise ValueError("Not a compact transcript")
+        compressed, header_len = struct.unpack_from("<?I", data, 4)
+        start = 4 + struct.calcsize("<?I")
+        header = json.loads(data[start:start + header_len])
+        body = data[start + header_len:]
+        if compressed:
+            body = zlib.decompress(body)
+
+        n_seg, n_words = header["n_segments"], header["n_words"]
+        layout = [("<f4", n_seg), ("<f4", n_seg), ("<i4", n_seg + 1), ("<i4", n_seg + 1),
+                  ("<f4", n_words), ("<f4", n_words), ("<f4", n_words), ("<i4", n_words + 1)]
+        arrays, pos = [], 0
+        for dtype, count in layout:
+            a = np.frombuffer(body, dtype=dtype, count=count, offset=pos)
+            arrays.append(a.astype(dtype[1:]))
+            pos += a.nbytes
+        text_len, word_text_len = header["text_bytes"]
+        text = body[pos:pos + text_len].decode("utf-8")
+        word_text = body[pos + text_len:pos + text_len + word_text_len].decode("utf-8")
+
+        return cls(arrays[0], arrays[1], arrays[2], text, arrays[3],
+                   arrays[4], arrays[5], arrays[6], arrays[7], word_text,
+                   language=header["language"])
+
+
+def _offsets(strings) -> np.ndarray:
+    # Offsets are in characters so slicing the Python str needs no decoding
+    return np.cumsum([0] + [len(s) for s in strings], dtype=np.int64).astype(np.int32)
+
+
+def compact(result):
+    """CompactTranscript for a Whisper result (no-op if already compact, None passes through)."""
+    if result is None:
+        return None
+    return CompactTranscript.from_whisper(result)
+
+
+def segment_texts(transcript) -> list:
+    """Segment texts from either a compact transcript or a Whisper dict."""
+    if isinstance(transcript, CompactTranscript):
+        return transcript.segment_texts()
+    return [seg["text"] for seg in transcript["segments"]]
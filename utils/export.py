@@ -0,0 +1,173 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from reportlab.platypus import SimpleDocTemplate, Preformatted
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.pagesizes import letter
+
+from utils import metrics
+from utils.compact_transcript import CompactTranscript
+from utils.fonts import resolve_font
+
+MIME_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+}
+
+MAX_CACHE_BYTES = int(os.environ.get("EXPORT_CACHE_BYTES", str(256 * 1024 ** 2)))
+# Lines per Preformatted block; one giant block makes page splitting quadratic
+PDF_LINES_PER_BLOCK = 60
+
+_cache = OrderedDict()   # key -> bytes
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+# --- Timed lines ---
+
+def timed_lines(text: str, transcript) -> list:
+    """
+    (start, end, line) tuples for subtitle export.
+    Edited text keeps the segment timings while it still has one line per
+    segment; otherwise the original segments are used.
+    """
+    if isinstance(transcript, CompactTranscript):
+        starts, ends = transcript.seg_start.tolist(), transcript.seg_end.tolist()
+        originals = transcript.segment_texts()
+    else:
+        segments = transcript.get("segments", [])
+        starts = [seg["start"] for seg in segments]
+        ends = [seg["end"] for seg in segments]
+        originals = [seg["text"] for seg in segments]
+
+    lines = text.split("\n") if text is not None else []
+    if len(lines) != len(starts):
+        lines = originals
+    return [(s, e, line.strip()) for s, e, line in zip(starts, ends, lines) if line.strip()]
+
+
+def _timestamp(seconds: float, sep: str) -> str:
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+def iter_srt(lines):
+    for i, (start, end, line) in enumerate(lines, 1):
+        yield f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{line}\n\n"
+
+
+def iter_vtt(lines):
+    yield "WEBVTT\n\n"
+    for start, end, line in lines:
+        yield f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{line}\n\n"
+
+
+# --- PDF ---
+
+def make_pdf(text: str, font_family="DejaVu", font_size=16, line_height=1.5,
+             output=None, style_name="TranscriptStyle"):
+    """
+    Render text to PDF, into `output` (any binary file object) or a new
+    BytesIO. Text is laid out in fixed-size blocks so long transcripts
+    paginate in linear time.
+    """
+    buffer = output if output is not None else io.BytesIO()
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        topMargin=40,
+        bottomMargin=40,
+        leftMargin=50,
+        rightMargin=50
+    )
+
+    # Preformatted style preserves line breaks and spacing
+    style = ParagraphStyle(
+        style_name,
+        fontName=resolve_font(font_family),
+        fontSize=font_size,
+        leading=font_size * line_height
+    )
+
+    lines = text.split("\n")
+    with metrics.stage("pdf_export", bytes=len(text), lines=len(lines)) as event:
+        story = [
+            Preformatted("\n".join(lines[i:i + PDF_LINES_PER_BLOCK]), style)
+            for i in range(0, len(lines), PDF_LINES_PER_BLOCK)
+        ]
+        doc.build(story)
+        event["output_bytes"] = buffer.tell()
+    buffer.seek(0)
+    return buffer
+
+
+# --- Cached entry point ---
+
+def _key(fmt, text, transcript, font_family, font_size, line_height) -> str:
+    digest = hashlib.sha256(text.encode("utf-8"))
+    if fmt in ("srt", "vtt") and transcript is not None:
+        for s, e, _ in timed_lines(None, transcript):
+            digest.update(f"{s:.3f}-{e:.3f};".encode())
+    if fmt == "pdf":
+        digest.update(f"{font_family}|{font_size}|{line_height}".encode())
+    return f"{fmt}:{digest.hexdigest()}"
+
+
+def _store(key, data: bytes):
+    global _cache_bytes
+    with _cache_lock:
+        if key in _cache:
+            return
+        _cache[key] = data
+        _cache_bytes += len(data)
+        while _cache_bytes > MAX_CACHE_BYTES and len(_cache) > 1:
+            _, old = _cache.popitem(last=False)
+            _cache_bytes -= len(old)
+
+
+def cached(fmt, text, transcript=None, font_family="DejaVu", font_size=16, line_height=1.5):
+    """Previously built export, or None. Never builds anything."""
+    key = _key(fmt, text, transcript, font_family, font_size, line_height)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+
+def export(fmt, text, transcript=None, font_family="DejaVu", font_size=16, line_height=1.5) -> bytes:
+    """
+    Build (or fetch from the process-wide cache) an export of `text`.
+    Cache keys are the text hash plus whatever else shapes the output:
+    font, size and line height for PDF, segment timings for SRT/VTT.
+    Returns the whole file, as a download button needs it; to write one
+    straight to a file use iter_srt()/iter_vtt() or make_pdf(output=...).
+    """
+    data = cached(fmt, text, transcript, font_family, font_size, line_height)
+    if data is not None:
+        return data
+
+    if fmt == "txt":
+        data = text.encode("utf-8")
+    elif fmt in ("srt", "vtt"):
+        writer = iter_srt if fmt == "srt" else iter_vtt
+        out = io.StringIO()
+        for chunk in writer(timed_lines(text, transcript)):
+            out.write(chunk)
+        data = out.getvalue().encode("utf-8")
+    elif fmt == "pdf":
+        data = make_pdf(text, font_family, font_size, line_height).getvalue()
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    _store(_key(fmt, text, transcript, font_family, font_size, line_height), data)
+    return data
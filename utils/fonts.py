@@ -0,0 +1,108 @@
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FALLBACK_FONT = "Helvetica"
+
+# Typical file names per family, used when fontconfig is not available
+FONT_FILES = {
+    "Arial": ["arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"],
+    "Helvetica": ["Helvetica.ttf", "LiberationSans-Regular.ttf", "arial.ttf"],
+    "Verdana": ["verdana.ttf", "Verdana.ttf"],
+    "Tahoma": ["tahoma.ttf", "Tahoma.ttf"],
+    "Trebuchet MS": ["trebuc.ttf", "Trebuchet MS.ttf"],
+    "Segoe UI": ["segoeui.ttf"],
+    "Calibri": ["calibri.ttf", "Carlito-Regular.ttf"],
+    "Century Gothic": ["gothic.ttf"],
+    "Times New Roman": ["times.ttf", "Times New Roman.ttf", "LiberationSerif-Regular.ttf"],
+    "Georgia": ["georgia.ttf", "Georgia.ttf"],
+    "Garamond": ["garamond.ttf", "GARA.TTF"],
+    "Cambria": ["cambria.ttf", "Caladea-Regular.ttf"],
+    "Palatino Linotype": ["pala.ttf"],
+    "Courier New": ["cour.ttf", "Courier New.ttf", "LiberationMono-Regular.ttf"],
+    "Consolas": ["consola.ttf"],
+    "Lucida Console": ["lucon.ttf"],
+    "DejaVu": ["DejaVuSans.ttf"],
+}
+
+FONT_DIRS = [
+    "C:/Windows/Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+]
+
+_log = logging.getLogger(__name__)
+
+_registered = {}   # family -> reportlab font name
+_lock = threading.Lock()
+_file_index = None
+
+
+def _index_font_files() -> dict:
+    """Lower-cased file name -> path for every .ttf under the system font dirs (scanned once)."""
+    global _file_index
+    if _file_index is None:
+        index = {}
+        for root_dir in FONT_DIRS:
+            for root, _, files in os.walk(root_dir):
+                for name in files:
+                    if name.lower().endswith(".ttf"):
+                        index.setdefault(name.lower(), os.path.join(root, name))
+        _file_index = index
+    return _file_index
+
+
+def _fontconfig_match(family: str):
+    if shutil.which("fc-match") is None:
+        return None
+    try:
+        out = subprocess.run(
+            ["fc-match", "-f", "%{file}", f"{family}:fontformat=TrueType"],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out if out.lower().endswith(".ttf") and os.path.isfile(out) else None
+
+
+def find_font_file(family: str):
+    index = _index_font_files()
+    for name in FONT_FILES.get(family, []) + [f"{family}.ttf"]:
+        path = index.get(name.lower())
+        if path:
+            return path
+    return _fontconfig_match(family)
+
+
+def resolve_font(family: str) -> str:
+    """
+    ReportLab font name for a UI font family.
+    Each family is looked up and registered once per process; families
+    with no TrueType file fall back to the built-in Helvetica.
+    """
+    with _lock:
+        if family in _registered:
+            return _registered[family]
+
+        font_name = FALLBACK_FONT
+        path = find_font_file(family) or find_font_file("DejaVu")
+        if path:
+            font_name = f"{family}_Custom"
+            try:
+                pdfmetrics.registerFont(TTFont(font_name, path))
+            except Exception:
+                _log.exception("Font registration failed: %s", path)
+                font_name = FALLBACK_FONT
+
+        _registered[family] = font_name
+        return font_name
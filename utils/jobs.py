@@ -0,0 +1,253 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics, transcript_library
+from utils.audio_loader import SAMPLE_RATE, load_audio
+from utils.whisper.backends import DEFAULT_BACKEND
+from utils.whisper.model_cache import DEFAULT_MODEL
+from utils.whisper.model_selection import AUTO, DRAFT_MODEL, choose_model
+from utils.whisper import long_form, vad
+from utils.whisper.result_cache import media_hash
+from utils.whisper.whisper_service import transcribe_stream, transcribe_and_translate
+
+MAX_CONCURRENT_JOBS = int(os.environ.get("WHISPER_MAX_JOBS", "2"))
+JOB_TTL_SECONDS = int(os.environ.get("WHISPER_JOB_TTL_SECONDS", str(6 * 3600)))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+# Phases of a two-pass job
+DRAFT, REFINE = "draft", "refine"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_log = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="whisper-job")
+_jobs = {}    # job id -> Job
+_jobs_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    One transcription request. Lives in this process, not in the Streamlit
+    session, so it keeps running across reruns and closed tabs.
+    """
+
+    def __init__(self, mode: str, media_path: str, session_id: str, backend: str = DEFAULT_BACKEND,
+                 model: str = DEFAULT_MODEL, two_pass: bool = False):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.media_path = media_path
+        self.session_id = session_id
+        self.backend = backend
+        self.requested_model = model
+        self.model = model          # resolved when the job starts if "auto"
+        self.two_pass = two_pass
+        self.phase = None           # DRAFT / REFINE while a two-pass job runs
+        self.refined_seconds = 0.0
+        self.status = QUEUED
+        self.progress = 0.0
+        self.processed_seconds = 0.0
+        self.duration = None
+        self.segments = []
+        self.transcript = None
+        self.translation = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def queue_position(self) -> int:
+        """How many queued jobs were submitted before this one (0 when running)."""
+        if self.status != QUEUED:
+            return 0
+        with _jobs_lock:
+            return sum(
+                1 for job in _jobs.values()
+                if job.status == QUEUED and job.created < self.created
+            )
+
+    def _check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def _report(self, processed_seconds: float, duration: float):
+        """Progress callback for runs that do not stream segments; also the cancel checkpoint."""
+        self._check_cancelled()
+        self.processed_seconds = processed_seconds
+        self.duration = duration
+        self.progress = processed_seconds / duration if duration else 1.0
+
+
+def _add_to_library(job: Job):
+    # The library is a convenience; a failure here must not fail the job
+    try:
+        content_hash = media_hash(job.media_path)
+        model = job.model if job.backend == "openai" else f"{job.backend}/{job.model}"
+        transcript_library.ingest(
+            job.transcript, content_hash, job.media_path, "transcribe", model
+        )
+        if job.translation is not None:
+            transcript_library.ingest(
+                job.translation, content_hash, job.media_path, "translate", model
+            )
+    except Exception:
+        _log.exception("Transcript library ingest failed: %s", job.media_path)
+
+
+def _run_job(job: Job):
+    if job._cancel.is_set():
+        job.status = CANCELLED
+        job.finished = time.time()
+        return
+
+    # Every stage recorded on this worker thread is attributed to the job
+    with metrics.bind(session_id=job.session_id, request_id=job.id, mode=job.mode):
+        _execute(job)
+
+
+def _resolve_model(job: Job):
+    """
+    Pick a model for "auto" jobs from the clip length and the current load.
+    Speed is measured on the audio left after silence skipping, so the
+    estimate is made for that length too, on the path the job will take.
+    """
+    if job.requested_model != AUTO:
+        return
+    audio = load_audio(job.media_path)
+    job.duration = len(audio) / SAMPLE_RATE
+    speech = vad.kept_seconds(audio)
+    translate = job.mode == "Translate"
+    # Only streamed Whisper transcription hands long recordings to the long-form pool
+    parallel = (not translate and job.backend == "openai"
+                and long_form.should_use(int(speech * SAMPLE_RATE)))
+    job.model = choose_model(speech, queue_depth=len(active_jobs()) - 1,
+                             workers=MAX_CONCURRENT_JOBS, backend=job.backend,
+                             tasks=("transcribe", "translate") if translate else ("transcribe",),
+                             long_form=parallel)
+
+
+def _stream(job: Job, model_name: str):
+    """Yield stream events for the job, honouring cancellation between windows."""
+    for event in transcribe_stream(job.media_path, model_name=model_name, backend=job.backend):
+        job._check_cancelled()
+        job.processed_seconds = event["processed_seconds"]
+        job.duration = event["duration"]
+        job.progress = event["progress"]
+        yield event
+
+
+def _run_two_pass(job: Job):
+    """
+    Stream a draft from the fast model, then re-decode with the job's model
+    and swap refined segments in over the draft as each window finishes.
+    """
+    job.phase = DRAFT
+    draft = []
+    for event in _stream(job, DRAFT_MODEL):
+        draft = draft + event["segments"]
+        job.segments = draft
+
+    job.phase = REFINE
+    refined = []
+    for event in _stream(job, job.model):
+        refined = refined + event["segments"]
+        job.refined_seconds = event["processed_seconds"]
+        job.segments = refined + [seg for seg in draft if seg["start"] >= job.refined_seconds]
+        if "result" in event:
+            job.transcript = event["result"]
+
+
+def _execute(job: Job):
+    job.status = RUNNING
+    try:
+        _resolve_model(job)
+        if job.mode == "Translate":
+            transcript, translation = transcribe_and_translate(
+                job.media_path, model_name=job.model, backend=job.backend, progress=job._report
+            )
+            job._check_cancelled()
+            job.transcript, job.translation = transcript, translation
+        elif job.two_pass and job.model != DRAFT_MODEL:
+            _run_two_pass(job)
+        else:
+            for event in _stream(job, job.model):
+                job.segments = job.segments + event["segments"]
+                if "result" in event:
+                    job.transcript = event["result"]
+        _add_to_library(job)
+        job.progress = 1.0
+        job.status = DONE
+    except JobCancelled:
+        job.status = CANCELLED
+    except Exception as e:
+        job.error = str(e)
+        job.status = FAILED
+    finally:
+        job.finished = time.time()
+
+
+def _prune():
+    now = time.time()
+    with _jobs_lock:
+        for job_id, job in list(_jobs.items()):
+            if job.done and job.finished is not None and now - job.finished > JOB_TTL_SECONDS:
+                del _jobs[job_id]
+
+
+def submit(mode: str, media_path: str, session_id: str, backend: str = None,
+           model: str = None, two_pass: bool = False) -> Job:
+    """
+    Queue a job, or return the one already pending for the same session,
+    mode, file, engine and model so repeated clicks do not stack up work.
+    model="auto" picks a model when the job starts; two_pass streams a fast
+    draft first (Transcribe mode only).
+    """
+    backend = backend or DEFAULT_BACKEND
+    model = model or DEFAULT_MODEL
+    two_pass = two_pass and mode != "Translate"
+    _prune()
+    with _jobs_lock:
+        for job in _jobs.values():
+            if (job.session_id == session_id and job.mode == mode and job.backend == backend
+                    and job.requested_model == model and job.two_pass == two_pass
+                    and job.media_path == media_path and not job.done):
+                return job
+        job = Job(mode, media_path, session_id, backend, model, two_pass)
+        _jobs[job.id] = job
+
+    job.future = _executor.submit(_run_job, job)
+    return job
+
+
+def get(job_id: str):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def cancel(job_id: str) -> bool:
+    """Cancel a queued job immediately, or a running one at its next checkpoint."""
+    job = get(job_id)
+    if job is None or job.done:
+        return False
+    job._cancel.set()
+    if job.future is not None and job.future.cancel():
+        job.status = CANCELLED
+        job.finished = time.time()
+    return True
+
+
+def active_jobs() -> list:
+    with _jobs_lock:
+        return [job for job in _jobs.values() if not job.done]
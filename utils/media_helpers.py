@@ -1,16 +1,71 @@
 import base64
+import os
+import threading
+from collections import OrderedDict
 
-def media_to_base64(media_path: str) -> str:
-    with open(media_path, "rb") as f:
-        data = f.read()
+from utils import metrics
+
+VIDEO_EXTS = ["mp4", "mkv", "mov"]
+AUDIO_EXTS = ["mp3", "wav", "m4a"]
+
+# Small clips are cheaper to inline than to fetch over a second connection
+INLINE_MAX_BYTES = int(os.environ.get("MEDIA_INLINE_MAX_BYTES", str(2 * 1024 * 1024)))
+# Largest file inlined when the media server is unavailable; bigger ones are not played
+FALLBACK_MAX_BYTES = int(os.environ.get("MEDIA_FALLBACK_MAX_BYTES", str(50 * 1024 * 1024)))
+# Memoized data URIs kept across reruns, counted in base64 characters
+DATA_URI_CACHE_BYTES = int(os.environ.get("MEDIA_DATA_URI_CACHE_BYTES", str(128 * 1024 * 1024)))
+
+_uris = OrderedDict()   # (path, mtime_ns) -> data URI
+_uris_bytes = 0
+_uris_lock = threading.Lock()
+
+
+def media_mime(media_path: str) -> str:
     ext = media_path.split(".")[-1].lower()
-    video_exts = ["mp4", "mkv", "mov"]
-    audio_exts = ["mp3", "wav", "m4a"]
-    if ext in video_exts:
-        mime = f"video/{ext if ext!='mkv' else 'mp4'}"
-    elif ext in audio_exts:
-        mime = "audio/mpeg"
+    if ext in VIDEO_EXTS:
+        return f"video/{ext if ext!='mkv' else 'mp4'}"
+    elif ext in AUDIO_EXTS:
+        return "audio/mpeg"
     else:
-        mime = "video/mp4"
-    b64 = base64.b64encode(data).decode("utf-8")
-    return f"data:{mime};base64,{b64}"
+        return "video/mp4"
+
+
+def _data_uri(media_path: str) -> str:
+    # Only cold builds are recorded; memoized hits cost nothing
+    with metrics.stage("player_payload") as event:
+        with open(media_path, "rb") as f:
+            data = f.read()
+        b64 = base64.b64encode(data).decode("utf-8")
+        event["bytes"] = len(data)
+        event["payload_bytes"] = len(b64)
+    return f"data:{media_mime(media_path)};base64,{b64}"
+
+
+def media_to_base64(media_path: str) -> str:
+    """
+    Data URI for the file, memoized per (path, mtime) across reruns within
+    DATA_URI_CACHE_BYTES (least recently used URIs are dropped first).
+    """
+    global _uris_bytes
+    key = (os.path.abspath(media_path), os.stat(media_path).st_mtime_ns)
+    with _uris_lock:
+        if key in _uris:
+            _uris.move_to_end(key)
+            return _uris[key]
+
+    uri = _data_uri(key[0])
+    with _uris_lock:
+        if key not in _uris:
+            _uris[key] = uri
+            _uris_bytes += len(uri)
+        while _uris_bytes > DATA_URI_CACHE_BYTES and len(_uris) > 1:
+            _, old = _uris.popitem(last=False)
+            _uris_bytes -= len(old)
+    return uri
+
+
+def clear_data_uri_cache():
+    global _uris_bytes
+    with _uris_lock:
+        _uris.clear()
+        _uris_bytes = 0
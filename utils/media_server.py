@@ -0,0 +1,163 @@
+import logging
+import os
+import re
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+from utils import metrics
+from utils.media_helpers import media_mime
+
+HOST = os.environ.get("MEDIA_SERVER_HOST", "0.0.0.0")
+PORT = int(os.environ.get("MEDIA_SERVER_PORT", "8765"))
+# Externally reachable base URL (e.g. behind a reverse proxy). When empty the
+# player derives it from the page's hostname and PORT; the server speaks plain
+# HTTP, so pages served over HTTPS need this set to a TLS-terminating proxy.
+PUBLIC_URL = os.environ.get("MEDIA_SERVER_URL", "").rstrip("/")
+CHUNK_SIZE = 256 * 1024
+# Serve the Prometheus text exposition at /metrics on the same port
+METRICS_ENDPOINT = os.environ.get("WHISPER_METRICS_ENDPOINT", "1") == "1"
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+_log = logging.getLogger(__name__)
+
+_tokens = {}     # token -> absolute path
+_paths = {}      # absolute path -> token
+_tokens_lock = threading.Lock()
+_server = None
+_server_lock = threading.Lock()
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    """Serves registered files only, with HTTP Range support for seeking, plus /metrics."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "media":
+            return None
+        with _tokens_lock:
+            path = _tokens.get(unquote(parts[1]))
+        if path is None or not os.path.isfile(path):
+            return None
+        return path
+
+    def _send_headers(self, path):
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+
+        match = _RANGE_RE.match(self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            else:
+                # Suffix range: last N bytes
+                start = max(size - int(match.group(2)), 0)
+            if start > end or start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return None
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", media_mime(path))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Cache-Control", "private, max-age=3600")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        return start, end
+
+    def do_HEAD(self):
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        self._send_headers(path)
+
+    def _send_metrics(self):
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if METRICS_ENDPOINT and self.path.split("?")[0] == "/metrics":
+            self._send_metrics()
+            return
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        span = self._send_headers(path)
+        if span is None:
+            return
+
+        start, end = span
+        remaining = end - start + 1
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # Browsers routinely abort range requests while seeking
+            pass
+
+
+def ensure_started():
+    """Start the media server once per process. Returns False if the port is unavailable."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return True
+        try:
+            _server = ThreadingHTTPServer((HOST, PORT), _MediaHandler)
+        except OSError:
+            _log.exception("Media server failed to start on %s:%d", HOST, PORT)
+            return False
+        _server.daemon_threads = True
+        threading.Thread(
+            target=_server.serve_forever, name="media-server", daemon=True
+        ).start()
+        return True
+
+
+def media_path_url(media_path: str) -> str:
+    """
+    Register a file and return its URL path (/media/<token>/<name>).
+    Tokens are random, so only files handed to the player are reachable.
+    """
+    path = os.path.abspath(media_path)
+    with _tokens_lock:
+        token = _paths.get(path)
+        if token is None:
+            token = secrets.token_urlsafe(16)
+            _paths[path] = token
+            _tokens[token] = path
+    return f"/media/{token}/{quote(os.path.basename(path))}"
+
+
+def prune_tokens():
+    """Forget tokens whose files are gone (the upload janitor removed the session link)."""
+    with _tokens_lock:
+        for token, path in list(_tokens.items()):
+            if not os.path.exists(path):
+                del _tokens[token]
+                _paths.pop(path, None)
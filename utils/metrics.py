@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# JSON lines log of every stage: "" disables it, "-" writes to stderr,
+# anything else is a file path that is appended to
+METRICS_LOG = os.environ.get("WHISPER_METRICS_LOG", "")
+MAX_EVENTS = int(os.environ.get("WHISPER_METRICS_EVENTS", "2000"))
+# Histogram bucket upper bounds in seconds, as in Prometheus
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+STAGES = ("upload_write", "decode", "vad", "mel", "encode", "model_load", "inference", "player_payload", "pdf_export")
+
+_log = logging.getLogger(__name__)
+
+_events = deque(maxlen=MAX_EVENTS)
+_totals = {}     # stage -> {"count", "seconds", "bytes", "errors", "buckets"}
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+_context = threading.local()
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+# --- Context ---
+
+@contextmanager
+def bind(**context):
+    """
+    Attach labels (session_id, request_id, ...) to every stage recorded by
+    this thread inside the block. Jobs bind their session and job id.
+    """
+    previous = getattr(_context, "labels", {})
+    _context.labels = {**previous, **context}
+    try:
+        yield
+    finally:
+        _context.labels = previous
+
+
+def current_labels() -> dict:
+    """Labels stages recorded by this thread would get (to re-bind them on a worker)."""
+    labels = dict(getattr(_context, "labels", {}))
+    if "session_id" not in labels:
+        # Script reruns run on Streamlit's thread for the session
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            ctx = get_script_run_ctx(suppress_warning=True)
+        except Exception:
+            ctx = None
+        if ctx is not None:
+            labels["session_id"] = ctx.session_id
+    return labels
+
+
+# --- Recording ---
+
+@contextmanager
+def stage(name: str, bytes: int = None, **labels):
+    """
+    Time one pipeline stage. Yields the event dict so the caller can fill in
+    values only known afterwards (e.g. event["bytes"] of the output).
+    """
+    event = {"stage": name, "bytes": bytes, **labels}
+    rss_before = rss_bytes()
+    t0 = time.perf_counter()
+    try:
+        yield event
+    except BaseException as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        event["seconds"] = time.perf_counter() - t0
+        rss_after = rss_bytes()
+        event["rss_bytes"] = rss_after
+        event["rss_delta_bytes"] = rss_after - rss_before
+        record(event)
+
+
+def record(event: dict):
+    """Store a finished stage event, update the aggregates and log it."""
+    event = {"time": time.time(), **current_labels(), **event}
+    stage_name = event["stage"]
+    seconds = event.get("seconds") or 0.0
+
+    with _lock:
+        _events.append(event)
+        totals = _totals.setdefault(stage_name, {
+            "count": 0, "seconds": 0.0, "bytes": 0, "errors": 0,
+            "buckets": [0] * len(BUCKETS),
+        })
+        totals["count"] += 1
+        totals["seconds"] += seconds
+        totals["bytes"] += event.get("bytes") or 0
+        if "error" in event:
+            totals["errors"] += 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                totals["buckets"][i] += 1
+
+    if METRICS_LOG:
+        _write_log(event)
+
+
+def _write_log(event: dict):
+    line = json.dumps(event, default=str, separators=(",", ":"))
+    try:
+        with _log_lock:
+            if METRICS_LOG == "-":
+                print(line, file=sys.stderr, flush=True)
+            else:
+                with open(METRICS_LOG, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+    except OSError:
+        _log.exception("Metrics log write failed: %s", METRICS_LOG)
+
+
+# --- Reading ---
+
+def events(session_id: str = None, limit: int = None) -> list:
+    """Recent stage events, oldest first, optionally for one session."""
+    with _lock:
+        selected = [e for e in _events if session_id is None or e.get("session_id") == session_id]
+    return selected[-limit:] if limit else selected
+
+
+def summary(session_id: str = None) -> dict:
+    """
+    Per-stage count, total seconds, bytes and summed RSS delta. Process-wide
+    totals when session_id is None, otherwise from the recent events.
+    """
+    if session_id is None:
+        with _lock:
+            return {
+                name: {"count": t["count"], "seconds": t["seconds"], "bytes": t["bytes"],
+                       "errors": t["errors"]}
+                for name, t in _totals.items()
+            }
+
+    out = {}
+    for e in events(session_id):
+        s = out.setdefault(e["stage"], {"count": 0, "seconds": 0.0, "bytes": 0, "errors": 0,
+                                        "rss_delta_bytes": 0})
+        s["count"] += 1
+        s["seconds"] += e.get("seconds") or 0.0
+        s["bytes"] += e.get("bytes") or 0
+        s["errors"] += "error" in e
+        s["rss_delta_bytes"] += e.get("rss_delta_bytes") or 0
+    return out
+
+
+def prometheus_text() -> str:
+    """Aggregates in the Prometheus text exposition format."""
+    with _lock:
+        totals = {name: dict(t, buckets=list(t["buckets"])) for name, t in _totals.items()}
+
+    lines = [
+        "# HELP whisperapp_stage_seconds Time spent per pipeline stage.",
+        "# TYPE whisperapp_stage_seconds histogram",
+    ]
+    for name, t in sorted(totals.items()):
+        for bound, count in zip(BUCKETS, t["buckets"]):
+            lines.append(f'whisperapp_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+        lines.append(f'whisperapp_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {t["count"]}')
+        lines.append(f'whisperapp_stage_seconds_sum{{stage="{name}"}} {t["seconds"]:.6f}')
+        lines.append(f'whisperapp_stage_seconds_count{{stage="{name}"}} {t["count"]}')
+
+    lines += [
+        "# HELP whisperapp_stage_bytes_total Bytes processed per pipeline stage.",
+        "# TYPE whisperapp_stage_bytes_total counter",
+    ]
+    lines += [f'whisperapp_stage_bytes_total{{stage="{name}"}} {t["bytes"]}'
+              for name, t in sorted(totals.items())]
+
+    lines += [
+        "# HELP whisperapp_stage_errors_total Failed stage runs.",
+        "# TYPE whisperapp_stage_errors_total counter",
+    ]
+    lines += [f'whisperapp_stage_errors_total{{stage="{name}"}} {t["errors"]}'
+              for name, t in sorted(totals.items())]
+
+    lines += [
+        "# HELP whisperapp_resident_memory_bytes Resident memory of the app process.",
+        "# TYPE whisperapp_resident_memory_bytes gauge",
+        f"whisperapp_resident_memory_bytes {rss_bytes()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _totals.clear()
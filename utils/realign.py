@@ -0,0 +1,319 @@
+import re
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from utils.compact_transcript import CompactTranscript, _offsets, segment_texts
+
+_WORD_RE = re.compile(r"\S+")
+_NORMALIZE_RE = re.compile(r"[^\w']+")
+# An inserted word needs at least this much room between its neighbours,
+# otherwise it shares the preceding word's time span
+MIN_WORD_SECONDS = 0.08
+_BLOCK = 4096
+
+
+class Alignment:
+    """
+    Editor text plus a time span for every whitespace-separated word in it.
+    Words are stored as parallel arrays: character span in the text, start,
+    end and probability (0 for words re-timed by interpolation).
+    """
+
+    def __init__(self, text, char_start, char_end, start, end, prob, language=None):
+        self.text = text
+        self.char_start = char_start
+        self.char_end = char_end
+        self.start = start
+        self.end = end
+        self.prob = prob
+        self.language = language
+        self._transcript = None
+        # (alignment, i, j) when made by update(): words [i, j) of that
+        # alignment were replaced, so its transcript can be patched
+        self._previous = None
+
+    def __len__(self):
+        return len(self.char_start)
+
+    def word(self, i: int) -> str:
+        return self.text[self.char_start[i]:self.char_end[i]]
+
+    def to_transcript(self) -> CompactTranscript:
+        """
+        Segments are the editor lines that contain words; built once per
+        alignment, by patching the previous edit's transcript when it has one.
+        """
+        if self._transcript is None:
+            previous = self._previous
+            if previous is not None and previous[0]._transcript is not None:
+                self._transcript = _patch_transcript(previous[0]._transcript, self, *previous[1:])
+            else:
+                self._transcript = _build_transcript(self)
+            self._previous = None
+        return self._transcript
+
+
+# --- Initial alignment from Whisper output ---
+
+def _distribute(lengths, t0: float, t1: float):
+    """Split [t0, t1] between items in proportion to their character lengths."""
+    weights = np.asarray(lengths, dtype=np.float64) + 1.0
+    edges = t0 + (t1 - t0) * np.concatenate(([0.0], np.cumsum(weights))) / weights.sum()
+    return edges[:-1], edges[1:]
+
+
+def from_transcript(transcript) -> Alignment:
+    """
+    Alignment of the text the editor starts from (one stripped line per
+    segment). Each editor word takes its times from the Whisper words it
+    overlaps; segments without word timings are split by character length.
+    """
+    texts = segment_texts(transcript)
+    segments = transcript["segments"]
+    lines, char_start, char_end, start, end, prob = [], [], [], [], [], []
+    offset = 0
+
+    for i, raw in enumerate(texts):
+        line = raw.strip()
+        lead = len(raw) - len(raw.lstrip())
+        tokens = [(m.start(), m.end()) for m in _WORD_RE.finditer(line)]
+        seg = segments[i]
+        words = seg.get("words") or []
+
+        # Character span of each Whisper word inside the raw segment text
+        spans, pos = [], 0
+        for w in words:
+            idx = raw.find(w["word"], pos)
+            if idx < 0:
+                idx = pos
+            pos = idx + len(w["word"])
+            spans.append((idx - lead, pos - lead, w["start"], w["end"], w.get("probability", 1.0)))
+
+        if spans:
+            k = 0
+            for a, b in tokens:
+                while k < len(spans) - 1 and spans[k][1] <= a:
+                    k += 1
+                hits = [s for s in spans[k:] if s[0] < b and s[1] > a] or [spans[k]]
+                start.append(min(s[2] for s in hits))
+                end.append(max(s[3] for s in hits))
+                prob.append(min(s[4] for s in hits))
+        elif tokens:
+            s0, s1 = _distribute([b - a for a, b in tokens], seg["start"], seg["end"])
+            start.extend(s0)
+            end.extend(s1)
+            prob.extend([0.0] * len(tokens))
+
+        char_start.extend(offset + a for a, _ in tokens)
+        char_end.extend(offset + b for _, b in tokens)
+        lines.append(line)
+        offset += len(line) + 1
+
+    return Alignment(
+        "\n".join(lines),
+        np.array(char_start, dtype=np.int64), np.array(char_end, dtype=np.int64),
+        np.array(start, dtype=np.float64), np.array(end, dtype=np.float64),
+        np.array(prob, dtype=np.float32),
+        language=transcript["language"],
+    )
+
+
+# --- Incremental update ---
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    # Whole blocks compare in C; only the block with the difference is scanned
+    while i + _BLOCK <= n and a[i:i + _BLOCK] == b[i:i + _BLOCK]:
+        i += _BLOCK
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    i = 0
+    while i + _BLOCK <= limit and a[len(a) - i - _BLOCK:len(a) - i] == b[len(b) - i - _BLOCK:len(b) - i]:
+        i += _BLOCK
+    while i < limit and a[len(a) - i - 1] == b[len(b) - i - 1]:
+        i += 1
+    return i
+
+
+def _normalize(word: str) -> str:
+    return _NORMALIZE_RE.sub("", word.lower()) or word
+
+
+def update(alignment: Alignment, text: str) -> Alignment:
+    """
+    Alignment for an edited version of alignment.text.
+
+    Only the span between the common prefix and suffix is looked at: the
+    words it touches are diffed against the new words there, matching words
+    keep their times and replaced or inserted words are interpolated between
+    the surrounding timings. Words outside the edit are carried over as they
+    are (their character offsets shift by the length change).
+    """
+    old = alignment.text
+    if text == old:
+        return alignment
+
+    p = _common_prefix(old, text)
+    s = _common_suffix(old, text, min(len(old), len(text)) - p)
+    old_lo, old_hi = p, len(old) - s
+    delta = len(text) - len(old)
+
+    # Widen the edit to the whole words it touches
+    i = int(np.searchsorted(alignment.char_end, old_lo, side="left"))
+    j = int(np.searchsorted(alignment.char_start, old_hi, side="right"))
+    lo, hi = old_lo, old_hi
+    if i < j:
+        lo = min(lo, int(alignment.char_start[i]))
+        hi = max(hi, int(alignment.char_end[j - 1]))
+
+    new_spans = [m.span() for m in _WORD_RE.finditer(text, lo, hi + delta)]
+    old_words = [_normalize(alignment.word(k)) for k in range(i, j)]
+    new_words = [_normalize(text[a:b]) for a, b in new_spans]
+
+    m = len(new_spans)
+    start, end = np.zeros(m), np.zeros(m)
+    prob = np.zeros(m, dtype=np.float32)
+    prev_end = float(alignment.end[i - 1]) if i > 0 else (float(alignment.start[i]) if i < len(alignment) else 0.0)
+    next_start = float(alignment.start[j]) if j < len(alignment) else None
+
+    opcodes = SequenceMatcher(None, old_words, new_words, autojunk=False).get_opcodes()
+    # Matching words first, so changed runs can lean on both neighbours
+    for tag, a1, a2, b1, b2 in opcodes:
+        if tag == "equal":
+            start[b1:b2] = alignment.start[i + a1:i + a2]
+            end[b1:b2] = alignment.end[i + a1:i + a2]
+            prob[b1:b2] = alignment.prob[i + a1:i + a2]
+
+    for tag, a1, a2, b1, b2 in opcodes:
+        if tag == "replace":
+            t0, t1 = float(alignment.start[i + a1]), float(alignment.end[i + a2 - 1])
+        elif tag == "insert":
+            t0 = float(end[b1 - 1]) if b1 > 0 else prev_end
+            t1 = float(start[b2]) if b2 < m else next_start
+            if t1 is None:
+                t1 = t0 + MIN_WORD_SECONDS * (b2 - b1)
+            if t1 - t0 < MIN_WORD_SECONDS * (b2 - b1):
+                # No pause to put the words in: share a neighbouring word's span
+                if b1 > 0:
+                    b1 -= 1
+                    t0 = float(start[b1])
+                elif b2 < m:
+                    t1 = float(end[b2])
+                    b2 += 1
+        else:
+            continue
+        lengths = [new_spans[k][1] - new_spans[k][0] for k in range(b1, b2)]
+        start[b1:b2], end[b1:b2] = _distribute(lengths, t0, max(t0, t1))
+        prob[b1:b2] = 0.0
+
+    edited = Alignment(
+        text,
+        np.concatenate((alignment.char_start[:i], [a for a, _ in new_spans], alignment.char_start[j:] + delta)).astype(np.int64),
+        np.concatenate((alignment.char_end[:i], [b for _, b in new_spans], alignment.char_end[j:] + delta)).astype(np.int64),
+        np.concatenate((alignment.start[:i], start, alignment.start[j:])),
+        np.concatenate((alignment.end[:i], end, alignment.end[j:])),
+        np.concatenate((alignment.prob[:i], prob, alignment.prob[j:])).astype(np.float32),
+        language=alignment.language,
+    )
+    edited._previous = (alignment, i, j)
+    return edited
+
+
+# --- Back to a transcript ---
+
+def _rows(alignment: Alignment, a: int, b: int):
+    """
+    Segment texts, first word of each segment and word texts for words
+    [a, b), which must begin and end on whole lines. Only those lines of
+    the editor text are scanned.
+    """
+    if a >= b:
+        return [], np.zeros(0, dtype=np.int64), []
+    text = alignment.text
+    c0 = text.rfind("\n", 0, int(alignment.char_start[a])) + 1
+    c1 = text.find("\n", int(alignment.char_end[b - 1]))
+    if c1 < 0:
+        c1 = len(text)
+
+    chunk = np.frombuffer(text[c0:c1].encode("utf-32-le"), dtype=np.uint32)
+    newlines = c0 + np.flatnonzero(chunk == 10)
+    line_of_word = np.searchsorted(newlines, alignment.char_start[a:b], side="right")
+    lines, first = np.unique(line_of_word, return_index=True)
+    line_start = np.concatenate(([c0], newlines + 1)).tolist()
+    line_end = np.concatenate((newlines, [c1])).tolist()
+
+    seg_texts = [" " + text[line_start[k]:line_end[k]].strip() for k in lines.tolist()]
+    word_texts = [" " + text[s:e] for s, e in zip(alignment.char_start[a:b].tolist(),
+                                                   alignment.char_end[a:b].tolist())]
+    return seg_texts, first + a, word_texts
+
+
+def _splice(buffer: str, offsets, a: int, b: int, strings):
+    """Replace entries [a, b) of an offset-indexed text buffer."""
+    lo, hi = int(offsets[a]), int(offsets[b])
+    inner = lo + _offsets(strings).astype(np.int64)
+    tail = offsets[b + 1:].astype(np.int64) + (int(inner[-1]) - hi)
+    return (buffer[:lo] + "".join(strings) + buffer[hi:],
+            np.concatenate((offsets[:a], inner, tail)).astype(np.int32))
+
+
+def _assemble(alignment, seg_word_offsets, text, seg_text_offsets, word_text, word_text_offsets):
+    # Times stay monotonic even if an edit moved words around
+    word_start = np.maximum.accumulate(alignment.start) if len(alignment) else alignment.start
+    word_end = np.maximum(alignment.end, word_start)
+    first, last = seg_word_offsets[:-1], seg_word_offsets[1:] - 1
+
+    return CompactTranscript(
+        seg_start=word_start[first].astype(np.float32),
+        seg_end=word_end[last].astype(np.float32),
+        seg_text_offsets=seg_text_offsets,
+        text=text,
+        seg_word_offsets=seg_word_offsets,
+        word_start=word_start.astype(np.float32),
+        word_end=word_end.astype(np.float32),
+        word_prob=alignment.prob.astype(np.float32),
+        word_text_offsets=word_text_offsets,
+        word_text=word_text,
+        language=alignment.language,
+    )
+
+
+def _build_transcript(alignment: Alignment) -> CompactTranscript:
+    seg_texts, first, word_texts = _rows(alignment, 0, len(alignment))
+    return _assemble(
+        alignment,
+        np.append(first, len(alignment)).astype(np.int32),
+        "".join(seg_texts), _offsets(seg_texts),
+        "".join(word_texts), _offsets(word_texts),
+    )
+
+
+def _patch_transcript(old: CompactTranscript, alignment: Alignment, i: int, j: int) -> CompactTranscript:
+    """
+    Transcript for an alignment whose words [i, j) replaced those of the
+    one old was built from. Only the lines from word i - 1's to word j's
+    can have changed; text and offsets elsewhere are copied over.
+    """
+    n_old = len(old.word_start)
+    if not n_old or not len(alignment):
+        return _build_transcript(alignment)
+
+    offsets = old.seg_word_offsets
+    sa = int(np.searchsorted(offsets, max(i - 1, 0), side="right")) - 1
+    sb = int(np.searchsorted(offsets, min(j, n_old - 1), side="right"))
+    wa, wb = int(offsets[sa]), int(offsets[sb])
+    shift = len(alignment) - n_old
+
+    seg_texts, first, word_texts = _rows(alignment, wa, wb + shift)
+    text, seg_text_offsets = _splice(old.text_buffer, old.seg_text_offsets, sa, sb, seg_texts)
+    word_text, word_text_offsets = _splice(old.word_text_buffer, old.word_text_offsets, wa, wb, word_texts)
+    seg_word_offsets = np.concatenate((offsets[:sa], first, offsets[sb:].astype(np.int64) + shift))
+
+    return _assemble(alignment, seg_word_offsets.astype(np.int32), text, seg_text_offsets,
+                     word_text, word_text_offsets)
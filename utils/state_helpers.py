@@ -1,6 +1,286 @@
+import logging
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+import weakref
+import zlib
+from contextlib import contextmanager
+
 import streamlit as st
 
+from utils.compact_transcript import CompactTranscript
+
+# Heavy values that are written to disk when memory is short and read back
+# on the session's next rerun
+SPILL_KEYS = ("transcript", "translation", "edited_text", "edited_translation")
+# Derived values that are simply dropped; they are rebuilt on demand
+DROP_KEYS = ("edit_alignment",)
+
+SPILL_DIR = os.environ.get("SESSION_SPILL_DIR", "assets/session_spill/")
+# Heavy session data held in memory across all sessions before the least
+# recently active ones are spilled
+MEMORY_BUDGET_BYTES = int(os.environ.get("SESSION_MEMORY_BUDGET_BYTES", str(512 * 1024 ** 2)))
+IDLE_SECONDS = int(os.environ.get("SESSION_IDLE_SECONDS", "600"))
+# A run that started this long ago without reaching end_run() is assumed to
+# have stopped early (st.rerun, st.stop or an exception)
+RUN_TIMEOUT_SECONDS = int(os.environ.get("SESSION_RUN_TIMEOUT_SECONDS", "600"))
+SPILL_MAX_AGE_SECONDS = int(os.environ.get("SESSION_SPILL_MAX_AGE_SECONDS", str(24 * 3600)))
+JANITOR_INTERVAL_SECONDS = int(os.environ.get("SESSION_JANITOR_INTERVAL_SECONDS", "60"))
+
+_sessions = {}   # session id -> {"state": weakref, "last_seen", "running", "fragments", "sizes": {key: (id(value), bytes)}}
+_sessions_lock = threading.Lock()
+_janitor = None
+_janitor_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
 def reset_session_state(keys: list):
     for k in keys:
         if k in st.session_state:
             del st.session_state[k]
+
+
+def get_session_id() -> str:
+    """Id of the current browser session (stable across reruns)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+
+# --- Spilled values ---
+
+class Spilled:
+    """Stands in for a session value that was written to disk."""
+
+    def __init__(self, path: str, nbytes: int):
+        self.path = path
+        self.nbytes = nbytes
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if data[:4] == b"WCT1":
+            return CompactTranscript.from_bytes(data)
+        return pickle.loads(zlib.decompress(data))
+
+
+def _spill(session_id: str, key: str, value) -> Spilled:
+    folder = os.path.join(SPILL_DIR, session_id)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, key)
+    if isinstance(value, CompactTranscript):
+        data = value.to_bytes()
+    else:
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    with open(path, "wb") as f:
+        f.write(data)
+    return Spilled(path, len(data))
+
+
+def value_bytes(value) -> int:
+    """Approximate in-memory size of a session value."""
+    if isinstance(value, CompactTranscript):
+        return value.nbytes()
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, Spilled) or value is None:
+        return 0
+    if isinstance(value, tuple):
+        return sum(value_bytes(v) for v in value)
+    if hasattr(value, "to_transcript"):
+        # Edit alignment: word arrays plus the edited text
+        return (sum(getattr(value, name).nbytes for name in ("char_start", "char_end", "start", "end", "prob"))
+                + sys.getsizeof(value.text))
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+# --- Per-session accounting ---
+
+def _measure(entry: dict, state) -> int:
+    """Heavy bytes currently held by one session, re-measuring only changed values."""
+    sizes = entry["sizes"]
+    total = 0
+    for key in SPILL_KEYS + DROP_KEYS:
+        value = state[key] if key in state else None
+        cached = sizes.get(key)
+        # Keyed by id() so the accounting never keeps an old value alive
+        if cached is None or cached[0] != id(value):
+            cached = (id(value), value_bytes(value))
+            sizes[key] = cached
+        total += cached[1]
+    return total
+
+
+def _persistent_state(ctx):
+    """
+    The session's SessionState. ctx.session_state is a wrapper that each
+    script run builds anew and drops when it ends, so a weak reference to
+    it dies with the run; the state it wraps lives as long as the session.
+    """
+    return getattr(ctx.session_state, "_state", ctx.session_state)
+
+
+def track_session():
+    """
+    Call at the top of every rerun: marks the session's run as in progress,
+    so the janitor leaves it alone until end_run(), and brings back values
+    spilled while the session was idle.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+
+    with _sessions_lock:
+        entry = _sessions.setdefault(ctx.session_id, {"sizes": {}, "fragments": 0})
+        entry["state"] = weakref.ref(_persistent_state(ctx))
+        entry["last_seen"] = time.time()
+        entry["running"] = True
+
+    for key in SPILL_KEYS:
+        value = st.session_state.get(key)
+        if isinstance(value, Spilled):
+            try:
+                st.session_state[key] = value.load()
+                os.remove(value.path)
+            except (OSError, ValueError, pickle.UnpicklingError, zlib.error):
+                _log.exception("Session value reload failed: %s", key)
+                del st.session_state[key]
+
+
+def end_run():
+    """Call at the end of every rerun: the session's values may be spilled again."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    with _sessions_lock:
+        entry = _sessions.get(ctx.session_id)
+        if entry is not None:
+            entry["running"] = False
+            entry["last_seen"] = time.time()
+
+
+@contextmanager
+def fragment_run():
+    """Wrap the body of a fragment that replaces spilled keys, so it is never spilled mid-run."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    with _sessions_lock:
+        entry = _sessions.get(ctx.session_id) if ctx is not None else None
+        if entry is not None:
+            entry["fragments"] += 1
+    try:
+        yield
+    finally:
+        if entry is not None:
+            with _sessions_lock:
+                entry["fragments"] -= 1
+
+
+def _in_run(entry: dict, now: float) -> bool:
+    if entry["fragments"]:
+        return True
+    return entry.get("running", False) and now - entry["last_seen"] < RUN_TIMEOUT_SECONDS
+
+
+def _evict_session(session_id: str, entry: dict):
+    """Move one session's heavy values to disk (must hold _sessions_lock)."""
+    state = entry["state"]()
+    if state is None:
+        return
+    for key in DROP_KEYS:
+        if key in state:
+            del state[key]
+    for key in SPILL_KEYS:
+        if key in state and not isinstance(state[key], Spilled) and state[key] is not None:
+            spilled = _spill(session_id, key, state[key])
+            # Deleting first drops the copy kept from the previous run as well
+            del state[key]
+            state[key] = spilled
+    entry["sizes"].clear()
+
+
+def enforce_budget(budget: int = MEMORY_BUDGET_BYTES, idle_seconds: int = IDLE_SECONDS):
+    """
+    Spill idle sessions, then the least recently active ones until the heavy
+    data of all sessions fits in the budget. Sessions with a script or
+    fragment run in progress are never touched. Returns the bytes still held
+    in memory.
+    """
+    now = time.time()
+    with _sessions_lock:
+        totals = {}
+        for session_id, entry in list(_sessions.items()):
+            state = entry["state"]()
+            if state is None:
+                # Streamlit dropped the session; so do we
+                del _sessions[session_id]
+                shutil.rmtree(os.path.join(SPILL_DIR, session_id), ignore_errors=True)
+                continue
+            totals[session_id] = _measure(entry, state)
+
+        held = sum(totals.values())
+        for session_id in sorted(totals, key=lambda s: _sessions[s]["last_seen"]):
+            entry = _sessions[session_id]
+            idle = now - entry["last_seen"]
+            if _in_run(entry, now) or not totals[session_id]:
+                continue
+            if idle >= idle_seconds or (budget and held > budget):
+                try:
+                    _evict_session(session_id, entry)
+                except Exception:
+                    _log.exception("Session spill failed: %s", session_id)
+                    continue
+                held -= totals[session_id]
+        return held
+
+
+def session_memory() -> dict:
+    """Heavy bytes held in memory per tracked session."""
+    with _sessions_lock:
+        out = {}
+        for session_id, entry in _sessions.items():
+            state = entry["state"]()
+            if state is not None:
+                out[session_id] = _measure(entry, state)
+        return out
+
+
+def _remove_stale_spills(max_age: int = SPILL_MAX_AGE_SECONDS):
+    if not os.path.isdir(SPILL_DIR):
+        return
+    now = time.time()
+    with _sessions_lock:
+        live = set(_sessions)
+    for name in os.listdir(SPILL_DIR):
+        folder = os.path.join(SPILL_DIR, name)
+        if name not in live and now - os.path.getmtime(folder) > max_age:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def start_session_janitor(interval: int = JANITOR_INTERVAL_SECONDS):
+    """Run enforce_budget() periodically on a daemon thread (once per process)."""
+    global _janitor
+    with _janitor_lock:
+        if _janitor is not None and _janitor.is_alive():
+            return _janitor
+
+        def _loop():
+            while True:
+                try:
+                    enforce_budget()
+                    _remove_stale_spills()
+                except Exception:
+                    _log.exception("Session janitor failed")
+                time.sleep(interval)
+
+        _janitor = threading.Thread(target=_loop, name="session-janitor", daemon=True)
+        _janitor.start()
+        return _janitor
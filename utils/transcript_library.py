@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+LIBRARY_PATH = os.environ.get("TRANSCRIPT_LIBRARY_PATH", "assets/transcript_library.sqlite3")
+
+_local = threading.local()
+_SESSION_PREFIX = re.compile(r"^[0-9a-f]{16}_")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    task TEXT NOT NULL,
+    model TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    media_path TEXT,
+    language TEXT,
+    duration REAL,
+    created REAL NOT NULL,
+    UNIQUE (content_hash, task, model)
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    recording_id INTEGER NOT NULL REFERENCES recordings(id) ON DELETE CASCADE,
+    seg_index INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    text TEXT NOT NULL,
+    words TEXT
+);
+CREATE INDEX IF NOT EXISTS segments_recording ON segments (recording_id, seg_index);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5 (
+    text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread; WAL lets searches run while a job ingests."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(LIBRARY_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(LIBRARY_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def display_name(media_path: str) -> str:
+    """Original file name, without the upload store's content-hash prefix."""
+    return _SESSION_PREFIX.sub("", os.path.basename(media_path))
+
+
+def ingest(result: dict, content_hash: str, media_path: str = None, task: str = "transcribe",
+           model: str = "small", file_name: str = None) -> int:
+    """
+    Add one Whisper result to the library and return its recording id.
+    A result already stored for the same (media, task, model) is left as is,
+    so re-ingesting is cheap and the index only grows by new material.
+    """
+    conn = _connect()
+    row = conn.execute(
+        "SELECT id FROM recordings WHERE content_hash = ? AND task = ? AND model = ?",
+        (content_hash, task, model)
+    ).fetchone()
+    if row is not None:
+        if media_path:
+            conn.execute("UPDATE recordings SET media_path = ? WHERE id = ?", (media_path, row["id"]))
+            conn.commit()
+        return row["id"]
+
+    segments = result.get("segments", [])
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO recordings (content_hash, task, model, file_name, media_path, "
+            "language, duration, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (content_hash, task, model,
+             file_name or (display_name(media_path) if media_path else content_hash[:16]),
+             media_path, result.get("language"),
+             segments[-1]["end"] if segments else 0.0, time.time())
+        )
+        recording_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO segments (recording_id, seg_index, start, end, text, words) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (recording_id, i, seg["start"], seg["end"], seg["text"].strip(),
+                 json.dumps(
+                     [[round(w["start"], 3), round(w["end"], 3), w["word"]]
+                      for w in seg.get("words", [])],
+                     separators=(",", ":")
+                 ) if seg.get("words") else None)
+                for i, seg in enumerate(segments)
+            ]
+        )
+    return recording_id
+
+
+def _fts_query(query: str) -> str:
+    # Quote every token so user input can't break FTS syntax; prefix-match the last one
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return ""
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _word_start(words_json, tokens, default):
+    """Start time of the first word matching a query token, for exact seeking."""
+    if not words_json or not tokens:
+        return default
+    for start, _, word in json.loads(words_json):
+        norm = word.strip().lower()
+        if any(norm.startswith(t) for t in tokens):
+            return start
+    return default
+
+
+def search(query: str, limit: int = 20, task: str = None) -> list:
+    """
+    Ranked (bm25) full-text search over every stored segment.
+    Each hit carries the file and the start time of the matching word.
+    """
+    fts = _fts_query(query)
+    if not fts:
+        return []
+    tokens = [t.lower() for t in _TOKEN.findall(query)]
+
+    sql = (
+        "SELECT s.id, s.recording_id, s.start, s.end, s.text, s.words, "
+        "r.file_name, r.media_path, r.task, bm25(segments_fts) AS score, "
+        "snippet(segments_fts, 0, '[', ']', '...', 12) AS snippet "
+        "FROM segments_fts JOIN segments s ON s.id = segments_fts.rowid "
+        "JOIN recordings r ON r.id = s.recording_id "
+        "WHERE segments_fts MATCH ?"
+    )
+    params = [fts]
+    if task:
+        sql += " AND r.task = ?"
+        params.append(task)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    hits = []
+    for row in _connect().execute(sql, params):
+        hits.append({
+            "recording_id": row["recording_id"],
+            "file_name": row["file_name"],
+            "media_path": row["media_path"],
+            "task": row["task"],
+            "start": _word_start(row["words"], tokens, row["start"]),
+            "segment_start": row["start"],
+            "segment_end": row["end"],
+            "text": row["text"],
+            "snippet": row["snippet"],
+            "score": row["score"],
+        })
+    return hits
+
+
+def get_transcript(recording_id: int):
+    """Rebuild the Whisper-shaped result for a stored recording."""
+    conn = _connect()
+    rec = conn.execute("SELECT * FROM recordings WHERE id = ?", (recording_id,)).fetchone()
+    if rec is None:
+        return None
+
+    segments = []
+    for row in conn.execute(
+        "SELECT seg_index, start, end, text, words FROM segments "
+        "WHERE recording_id = ? ORDER BY seg_index", (recording_id,)
+    ):
+        seg = {"id": row["seg_index"], "start": row["start"], "end": row["end"],
+               "text": " " + row["text"]}
+        if row["words"]:
+            seg["words"] = [
+                {"start": s, "end": e, "word": w} for s, e, w in json.loads(row["words"])
+            ]
+        segments.append(seg)
+
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": rec["language"],
+    }
+
+
+def get_recording(recording_id: int):
+    row = _connect().execute("SELECT * FROM recordings WHERE id = ?", (recording_id,)).fetchone()
+    return dict(row) if row else None
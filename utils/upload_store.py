@@ -0,0 +1,231 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from utils import metrics
+
+STORE_DIR = os.environ.get("UPLOAD_STORE_DIR", "assets/temp_uploads/")
+BLOB_DIR = os.path.join(STORE_DIR, "blobs")
+SESSION_DIR = os.path.join(STORE_DIR, "sessions")
+
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_AGE_SECONDS = int(os.environ.get("UPLOAD_MAX_AGE_SECONDS", str(24 * 3600)))
+MAX_STORE_BYTES = int(os.environ.get("UPLOAD_MAX_STORE_BYTES", str(20 * 1024 ** 3)))
+JANITOR_INTERVAL_SECONDS = int(os.environ.get("UPLOAD_JANITOR_INTERVAL_SECONDS", "600"))
+
+_log = logging.getLogger(__name__)
+
+_stored = {}   # (session_id, token) -> (path, sha256); skips re-hashing on reruns
+_stored_lock = threading.Lock()
+_janitor = None
+_janitor_lock = threading.Lock()
+
+
+def _safe_name(filename: str) -> str:
+    name = os.path.basename(filename or "upload")
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name) or "upload"
+
+
+def _chunks(data):
+    """Yield chunks from bytes, a buffer-backed upload, or a readable stream."""
+    if hasattr(data, "getbuffer"):
+        data = data.getbuffer()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield view[start:start + CHUNK_SIZE]
+        return
+    for chunk in iter(lambda: data.read(CHUNK_SIZE), b""):
+        yield chunk
+
+
+def _in_memory(data) -> bool:
+    return hasattr(data, "getbuffer") or isinstance(data, (bytes, bytearray, memoryview))
+
+
+def _write_blob(data, ext: str):
+    """
+    Store content under its SHA-256 and return (blob_path, sha256).
+    In-memory data is hashed first so a duplicate is never written;
+    streams are hashed while being written to a temp file.
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+
+    if _in_memory(data):
+        digest = hashlib.sha256()
+        for chunk in _chunks(data):
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+        blob_path = os.path.join(BLOB_DIR, content_hash + ext)
+        if os.path.exists(blob_path):
+            os.utime(blob_path)
+            return blob_path, content_hash
+        chunks = _chunks(data)
+        digest = None
+    else:
+        chunks = _chunks(data)
+        digest = hashlib.sha256()
+
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                if digest is not None:
+                    digest.update(chunk)
+                f.write(chunk)
+        if digest is not None:
+            content_hash = digest.hexdigest()
+            blob_path = os.path.join(BLOB_DIR, content_hash + ext)
+        if os.path.exists(blob_path):
+            os.remove(tmp_path)
+            os.utime(blob_path)
+        else:
+            os.replace(tmp_path, blob_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return blob_path, content_hash
+
+
+def store(data, filename: str, session_id: str, token=None):
+    """
+    Save an upload for one session and return (path, sha256).
+
+    Identical content is stored once under blobs/ and hard-linked into
+    sessions/<session_id>/, so every session gets its own path without
+    duplicating bytes. Pass a token that identifies the upload (e.g. the
+    Streamlit file_id) to make repeated calls on reruns free.
+    """
+    memo_key = (session_id, token)
+    if token is not None:
+        with _stored_lock:
+            hit = _stored.get(memo_key)
+        if hit and os.path.exists(hit[0]):
+            os.utime(hit[0])
+            return hit
+
+    name = _safe_name(filename)
+    ext = os.path.splitext(name)[1].lower()
+    with metrics.stage("upload_write") as event:
+        blob_path, content_hash = _write_blob(data, ext)
+        event["bytes"] = os.path.getsize(blob_path)
+
+    session_path = os.path.join(SESSION_DIR, _safe_name(session_id), f"{content_hash[:16]}_{name}")
+    os.makedirs(os.path.dirname(session_path), exist_ok=True)
+    if not os.path.exists(session_path):
+        try:
+            os.link(blob_path, session_path)
+        except OSError:
+            # No hard links on this filesystem: share the blob path directly
+            session_path = blob_path
+    os.utime(session_path)
+
+    # Let the result cache reuse the hash instead of reading the file again
+    from utils.whisper.result_cache import remember_hash
+    remember_hash(session_path, content_hash)
+
+    if token is not None:
+        with _stored_lock:
+            _stored[memo_key] = (session_path, content_hash)
+    return session_path, content_hash
+
+
+def _unlink_sessions(content_hash: str):
+    prefix = content_hash[:16] + "_"
+    if not os.path.isdir(SESSION_DIR):
+        return
+    for session in os.listdir(SESSION_DIR):
+        folder = os.path.join(SESSION_DIR, session)
+        for name in os.listdir(folder):
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except FileNotFoundError:
+                    pass
+
+
+def cleanup(max_age: int = MAX_AGE_SECONDS, max_bytes: int = MAX_STORE_BYTES):
+    """
+    Remove session folders idle for longer than max_age, then blobs no
+    session links to any more, then the oldest blobs (and their session
+    links, which share the same inode) while over max_bytes.
+    """
+    now = time.time()
+
+    if os.path.isdir(SESSION_DIR):
+        for name in os.listdir(SESSION_DIR):
+            path = os.path.join(SESSION_DIR, name)
+            try:
+                newest = max(
+                    [os.stat(path).st_mtime] +
+                    [os.stat(os.path.join(path, f)).st_mtime for f in os.listdir(path)]
+                )
+            except FileNotFoundError:
+                continue
+            if now - newest > max_age:
+                shutil.rmtree(path, ignore_errors=True)
+
+    if not os.path.isdir(BLOB_DIR):
+        return
+
+    blobs = []
+    for name in os.listdir(BLOB_DIR):
+        path = os.path.join(BLOB_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stale = now - st.st_mtime > max_age
+        if name.endswith(".part"):
+            if stale:
+                os.remove(path)
+            continue
+        if st.st_nlink <= 1 and stale:
+            os.remove(path)
+            continue
+        blobs.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in blobs)
+    for _, size, path in sorted(blobs):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        _unlink_sessions(os.path.basename(path))
+        total -= size
+
+    with _stored_lock:
+        for key, (path, _) in list(_stored.items()):
+            if not os.path.exists(path):
+                del _stored[key]
+
+    from utils import media_server
+    media_server.prune_tokens()
+
+
+def start_janitor(interval: int = JANITOR_INTERVAL_SECONDS):
+    """Run cleanup() periodically on a daemon thread (once per process)."""
+    global _janitor
+    with _janitor_lock:
+        if _janitor is not None and _janitor.is_alive():
+            return _janitor
+
+        def _loop():
+            while True:
+                try:
+                    cleanup()
+                except Exception:
+                    _log.exception("Upload cleanup failed")
+                time.sleep(interval)
+
+        _janitor = threading.Thread(target=_loop, name="upload-janitor", daemon=True)
+        _janitor.start()
+        return _janitor
@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+
+from utils.audio_loader import SAMPLE_RATE
+from utils.whisper.model_cache import DEFAULT_MODEL, get_engine, use_model, decode_options
+
+DEFAULT_BACKEND = os.environ.get("WHISPER_BACKEND", "openai")
+# Directory with locally provided converted models (never downloaded):
+#   faster-whisper-<name>/  (CTranslate2, e.g. from ct2-transformers-converter)
+#   onnx-whisper-<name>/    (optimum ONNX export)
+MODEL_DIR = os.environ.get("WHISPER_MODEL_DIR", "assets/models/")
+CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", "0"))  # 0 = library default
+
+
+def _local_model(kind: str, model_name: str) -> str:
+    path = os.path.join(MODEL_DIR, f"{kind}-{model_name}")
+    if not os.path.isdir(path):
+        raise FileNotFoundError(
+            f"No local {kind} model for '{model_name}': expected a converted model in {path}"
+        )
+    return path
+
+
+class Backend:
+    """
+    One inference engine. Every engine takes 16 kHz float32 audio and
+    returns the Whisper result shape the components use:
+    {"text", "language", "segments": [{"id", "start", "end", "text", "words"?}]}.
+    """
+
+    name = None
+
+    def __init__(self, model_name: str, device: str = None, dtype: str = "float32"):
+        self.model_name = model_name
+        self.device = device
+        self.dtype = dtype
+
+    def iter_segments(self, audio, task="transcribe", language=None):
+        """Yield (segment, language) pairs as the engine produces them."""
+        result = self.transcribe(audio, task=task, language=language)
+        for seg in result["segments"]:
+            yield seg, result.get("language")
+
+    def transcribe(self, audio, task="transcribe", language=None) -> dict:
+        segments, detected = [], language
+        for seg, lang in self.iter_segments(audio, task=task, language=language):
+            seg["id"] = len(segments)
+            segments.append(seg)
+            detected = detected or lang
+        return {
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": detected,
+        }
+
+
+class OpenAIWhisperBackend(Backend):
+    """openai-whisper on PyTorch, through the shared model cache."""
+
+    name = "openai"
+
+    def transcribe(self, audio, task="transcribe", language=None) -> dict:
+        with use_model(self.model_name, device=self.device, dtype=self.dtype) as model:
+            return model.transcribe(
+                audio, word_timestamps=True, task=task, language=language,
+                **decode_options(self.dtype)
+            )
+
+
+class FasterWhisperBackend(Backend):
+    """CTranslate2 via faster-whisper, int8 on CPU by default."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name, device=None, dtype="float32"):
+        super().__init__(model_name, device, dtype)
+        local = _local_model("faster-whisper", model_name)
+        from faster_whisper import WhisperModel
+
+        device = device or "cpu"
+        compute_type = "int8" if device == "cpu" else ("float16" if dtype == "float16" else "int8_float16")
+        self._model = WhisperModel(
+            local,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=CPU_THREADS,
+            local_files_only=True,
+        )
+        self._lock = threading.Lock()
+
+    def iter_segments(self, audio, task="transcribe", language=None):
+        with self._lock:
+            segments, info = self._model.transcribe(
+                audio, task=task, language=language, word_timestamps=True
+            )
+            # faster-whisper decodes lazily, window by window, as we iterate
+            for seg in segments:
+                yield {
+                    "id": seg.id,
+                    "seek": seg.seek,
+                    "start": seg.start,
+                    "end": seg.end,
+                    "text": seg.text,
+                    "tokens": list(seg.tokens),
+                    "temperature": seg.temperature,
+                    "avg_logprob": seg.avg_logprob,
+                    "compression_ratio": seg.compression_ratio,
+                    "no_speech_prob": seg.no_speech_prob,
+                    "words": [
+                        {"word": w.word, "start": w.start, "end": w.end, "probability": w.probability}
+                        for w in (seg.words or [])
+                    ],
+                }, info.language
+
+
+class OnnxWhisperBackend(Backend):
+    """
+    ONNX Runtime through optimum's exported Whisper model.
+    The ONNX decoder does not expose cross-attention, so results carry
+    segment timestamps only (no per-word timings).
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name, device=None, dtype="float32"):
+        super().__init__(model_name, device, dtype)
+        local = _local_model("onnx-whisper", model_name)
+        from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+        from transformers import AutoProcessor, pipeline
+
+        processor = AutoProcessor.from_pretrained(local, local_files_only=True)
+        model = ORTModelForSpeechSeq2Seq.from_pretrained(
+            local, export=False, local_files_only=True, provider="CPUExecutionProvider"
+        )
+        self._pipe = pipeline(
+            "automatic-speech-recognition",
+            model=model,
+            tokenizer=processor.tokenizer,
+            feature_extractor=processor.feature_extractor,
+            chunk_length_s=30,
+        )
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, task="transcribe", language=None) -> dict:
+        generate_kwargs = {"task": task}
+        if language:
+            generate_kwargs["language"] = language
+        with self._lock:
+            out = self._pipe(
+                {"raw": audio, "sampling_rate": SAMPLE_RATE},
+                return_timestamps=True,
+                return_language=True,
+                generate_kwargs=generate_kwargs,
+            )
+
+        segments, detected = [], language
+        for chunk in out.get("chunks", []):
+            detected = detected or chunk.get("language")
+            start, end = chunk["timestamp"]
+            if end is None:
+                end = len(audio) / SAMPLE_RATE
+            text = chunk["text"]
+            if not re.match(r"\s", text):
+                text = " " + text
+            segments.append({"id": len(segments), "start": start, "end": end, "text": text})
+
+        return {
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": detected,
+        }
+
+
+BACKENDS = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    OnnxWhisperBackend.name: OnnxWhisperBackend,
+}
+
+
+def get_backend(name: str = None, model_name: str = DEFAULT_MODEL, device: str = None,
+                dtype: str = "float32") -> Backend:
+    """
+    Engine for (backend, model, device, dtype). Converted models are shared
+    process-wide through the model cache, under its load locks and budget;
+    the openai engine borrows its checkpoints from there on every call.
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown Whisper backend: {name} (choose from {', '.join(BACKENDS)})")
+
+    cls = BACKENDS[name]
+    if cls is OpenAIWhisperBackend:
+        return cls(model_name, device=device, dtype=dtype)
+    return get_engine(name, model_name, device, dtype, lambda: cls(model_name, device=device, dtype=dtype))
@@ -0,0 +1,241 @@
+"""
+Headless batch transcription.
+
+    python -m utils.whisper.batch recordings/ "archive/**/*.mp3" -o out/ --format jsonl srt
+
+Every finished file is appended to <output>/batch.jsonl straight away, so
+an interrupted run picks up where it stopped: files already recorded as
+done (same size and mtime) are skipped on restart.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.media_helpers import AUDIO_EXTS, VIDEO_EXTS
+from utils.whisper.backends import BACKENDS, DEFAULT_BACKEND
+from utils.whisper.model_cache import DEFAULT_MODEL
+
+MEDIA_EXTS = tuple("." + ext for ext in VIDEO_EXTS + AUDIO_EXTS)
+MANIFEST_NAME = "batch.jsonl"
+FORMATS = ("jsonl", "json", "srt")
+TASKS = ("transcribe", "translate", "both")
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 1) // 4)
+
+# --- Worker process side ---
+
+_worker_options = {}
+
+
+def _init_worker(options, threads):
+    """Load the model once per worker and split the CPU between workers."""
+    import torch
+    torch.set_num_threads(max(1, threads))
+    _worker_options.update(options)
+
+    if options["backend"] == "openai":
+        from utils.whisper.model_cache import get_model
+        get_model(options["model_name"], device=options["device"], dtype=options["dtype"])
+    else:
+        from utils.whisper.backends import get_backend
+        get_backend(options["backend"], options["model_name"], options["device"], options["dtype"])
+
+
+def _process(path, task):
+    """Transcribe one file in a worker. Returns (results by task, audio seconds, seconds)."""
+    from utils.whisper import whisper_service
+
+    t0 = time.perf_counter()
+    audio_seconds = len(whisper_service.load_audio(path)) / whisper_service.SAMPLE_RATE
+
+    if task == "both":
+        transcript, translation = whisper_service.transcribe_and_translate(path, **_worker_options)
+        results = {"transcribe": transcript, "translate": translation}
+    else:
+        # One file per worker already keeps every core busy; no nested process pool
+        run = whisper_service.translate if task == "translate" else whisper_service.transcribe
+        results = {task: run(path, long_form_mode=False, **_worker_options)}
+
+    return results, audio_seconds, time.perf_counter() - t0
+
+
+# --- Parent side ---
+
+def find_media(inputs) -> list:
+    """Media files from files, directories (recursive) and glob patterns, sorted and unique."""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                found.update(os.path.join(root, f) for f in files if f.lower().endswith(MEDIA_EXTS))
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            found.update(p for p in glob.glob(item, recursive=True)
+                         if os.path.isfile(p) and p.lower().endswith(MEDIA_EXTS))
+    return sorted(os.path.abspath(p) for p in found)
+
+
+def _fingerprint(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_manifest(output_dir: str) -> dict:
+    """Latest manifest record per input path."""
+    records = {}
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; the file will be redone
+                continue
+            records[record["path"]] = record
+    return records
+
+
+def _output_stem(path: str, inputs_root: str, output_dir: str) -> str:
+    # Mirror the input tree so equal file names in different folders do not collide
+    rel = os.path.relpath(path, inputs_root)
+    return os.path.join(output_dir, os.path.splitext(rel)[0])
+
+
+def _write_files(stem: str, results: dict, formats) -> list:
+    written = []
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    for task, result in results.items():
+        suffix = "" if len(results) == 1 else f".{task}"
+        if "json" in formats:
+            out = f"{stem}{suffix}.json"
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            written.append(out)
+        if "srt" in formats:
+            from utils.export import iter_srt, timed_lines
+            out = f"{stem}{suffix}.srt"
+            with open(out, "w", encoding="utf-8") as f:
+                f.writelines(iter_srt(timed_lines(None, result)))
+            written.append(out)
+    return written
+
+
+def run_batch(inputs, output_dir, task="transcribe", formats=("jsonl",), workers=DEFAULT_WORKERS,
+              model_name=DEFAULT_MODEL, device=None, dtype="float32", language=None,
+              backend=DEFAULT_BACKEND, use_cache=True, log=print) -> dict:
+    """
+    Run every media file under `inputs` through a process pool with one
+    model per worker. Returns the throughput summary.
+    """
+    files = find_media(inputs)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    pending = [
+        p for p in files
+        if not (manifest.get(p, {}).get("status") == "done"
+                and manifest[p].get("fingerprint") == _fingerprint(p))
+    ]
+    skipped = len(files) - len(pending)
+    log(f"{len(files)} files, {skipped} already done, {len(pending)} to process")
+
+    summary = {"files": len(files), "skipped": skipped, "done": 0, "failed": 0,
+               "audio_seconds": 0.0, "compute_seconds": 0.0, "wall_seconds": 0.0}
+    if not pending:
+        return _finish(summary)
+
+    inputs_root = os.path.commonpath([os.path.dirname(p) for p in files])
+    options = {"model_name": model_name, "device": device, "dtype": dtype,
+               "language": language, "use_cache": use_cache, "backend": backend}
+    workers = max(1, min(workers, len(pending)))
+    threads = (os.cpu_count() or 1) // workers
+
+    t0 = time.perf_counter()
+    # spawn: forked children would inherit the parent's torch/OpenMP state
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(options, threads)
+    ) as pool, open(os.path.join(output_dir, MANIFEST_NAME), "a", encoding="utf-8") as manifest_file:
+        futures = {pool.submit(_process, path, task): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            record = {"path": path, "fingerprint": _fingerprint(path), "task": task,
+                      "model": model_name, "backend": backend, "finished": time.time()}
+            try:
+                results, audio_seconds, seconds = future.result()
+            except Exception as e:
+                record.update(status="failed", error=str(e))
+                summary["failed"] += 1
+                log(f"FAILED {path}: {e}")
+            else:
+                record.update(
+                    status="done", audio_seconds=round(audio_seconds, 3),
+                    seconds=round(seconds, 3),
+                    rtf=round(seconds / audio_seconds, 4) if audio_seconds else None,
+                    outputs=_write_files(_output_stem(path, inputs_root, output_dir),
+                                         results, formats),
+                )
+                silence = max((r.get("vad") or {}).get("skipped_seconds", 0.0) for r in results.values())
+                if silence:
+                    record["skipped_seconds"] = silence
+                if "jsonl" in formats:
+                    record["results"] = results
+                summary["done"] += 1
+                summary["audio_seconds"] += audio_seconds
+                summary["compute_seconds"] += seconds
+                log(f"[{summary['done'] + summary['failed']}/{len(pending)}] {path} "
+                    f"({audio_seconds:.0f}s audio in {seconds:.1f}s)")
+
+            # One line per file, flushed at once, so a crash loses at most the files in flight
+            manifest_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest_file.flush()
+
+    summary["wall_seconds"] = time.perf_counter() - t0
+    summary["workers"] = workers
+    return _finish(summary)
+
+
+def _finish(summary: dict) -> dict:
+    wall, audio = summary["wall_seconds"], summary["audio_seconds"]
+    summary["files_per_hour"] = round(summary["done"] * 3600 / wall, 1) if wall else None
+    # Wall-clock seconds per second of audio across the whole pool
+    summary["aggregate_rtf"] = round(wall / audio, 4) if audio else None
+    summary["per_file_rtf"] = round(summary["compute_seconds"] / audio, 4) if audio else None
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe media files without the web UI.")
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="batch_output", help="Output directory")
+    parser.add_argument("--task", choices=TASKS, default="transcribe")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["jsonl"],
+                        help="jsonl keeps results in batch.jsonl; json/srt write one file per input")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Worker processes, each with its own model")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--device")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--language")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.inputs, args.output, task=args.task, formats=args.format, workers=args.workers,
+        model_name=args.model, device=args.device, dtype=args.dtype, language=args.language,
+        backend=args.backend, use_cache=not args.no_cache
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
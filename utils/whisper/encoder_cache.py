@@ -0,0 +1,135 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from utils import metrics
+
+# Encoder outputs are ~1500 x n_audio_state floats per 30 s window (4.6 MB for
+# "small" in float32), so the default holds a few dozen windows
+MAX_CACHE_BYTES = int(os.environ.get("WHISPER_ENCODER_CACHE_BYTES", str(256 * 1024 ** 2)))
+
+_cache = OrderedDict()   # key -> encoder output tensor
+_cache_bytes = 0
+_inflight = {}           # key -> Event set once the owner has stored the output
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+_local = threading.local()
+
+
+def _tensor_bytes(t) -> int:
+    return t.element_size() * t.nelement()
+
+
+def _key(prefix, mel) -> tuple:
+    data = mel.detach().contiguous().cpu().numpy().tobytes()
+    return prefix + (tuple(mel.shape), str(mel.dtype), hashlib.blake2b(data, digest_size=16).digest())
+
+
+def _store(key, value):
+    global _cache_bytes
+    _cache[key] = value
+    _cache_bytes += _tensor_bytes(value)
+    while _cache_bytes > MAX_CACHE_BYTES and len(_cache) > 1:
+        _, old = _cache.popitem(last=False)
+        _cache_bytes -= _tensor_bytes(old)
+
+
+@contextmanager
+def sharing():
+    """
+    Enable the cache for encoder calls made by this thread inside the block.
+    Outside it installed encoders run uncached, without hashing their input
+    or copying it to the host.
+    """
+    _local.depth = getattr(_local, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+
+
+def install(model, prefix: tuple):
+    """
+    Memoize model.encoder by input content inside sharing() blocks. Every
+    encoder call there goes through it: decoding, temperature fallback,
+    language detection and word alignment. Models with the same prefix (e.g.
+    replicas of one checkpoint on one device and dtype) share entries, so
+    transcribing and translating the same window encodes it once. Batched
+    calls are cached per window.
+    """
+    encoder = model.encoder
+    if getattr(encoder, "_encoder_cache", None) == prefix:
+        return
+    original = getattr(encoder, "_uncached_forward", encoder.forward)
+
+    def forward_batch(mel):
+        import torch
+        keys = [_key(prefix, mel[i:i + 1]) for i in range(mel.shape[0])]
+        with _lock:
+            outputs = [_cache.get(key) for key in keys]
+            for key, out in zip(keys, outputs):
+                if out is not None:
+                    _cache.move_to_end(key)
+            _stats["hits"] += sum(out is not None for out in outputs)
+        missing = [i for i, out in enumerate(outputs) if out is None]
+        if missing:
+            with _lock:
+                _stats["misses"] += len(missing)
+            with metrics.stage("encode", bytes=_tensor_bytes(mel) * len(missing) // len(keys),
+                               batch_size=len(missing)):
+                computed = original(mel[missing])
+            with _lock:
+                for n, i in enumerate(missing):
+                    outputs[i] = computed[n:n + 1].clone()
+                    _store(keys[i], outputs[i])
+        return torch.cat(outputs)
+
+    def forward(mel):
+        if not getattr(_local, "depth", 0):
+            return original(mel)
+        if mel.shape[0] > 1:
+            return forward_batch(mel)
+        key = _key(prefix, mel)
+        while True:
+            with _lock:
+                if key in _cache:
+                    _cache.move_to_end(key)
+                    _stats["hits"] += 1
+                    return _cache[key]
+                waiter = _inflight.get(key)
+                if waiter is None:
+                    # We compute it; concurrent callers for the same window wait
+                    done = _inflight[key] = threading.Event()
+                    _stats["misses"] += 1
+                    break
+            waiter.wait()
+            # Re-check: the owner may have failed, or the entry may be evicted already
+
+        try:
+            with metrics.stage("encode", bytes=_tensor_bytes(mel)):
+                out = original(mel)
+            with _lock:
+                _store(key, out)
+            return out
+        finally:
+            with _lock:
+                _inflight.pop(key, None)
+            done.set()
+
+    encoder._uncached_forward = original
+    encoder._encoder_cache = prefix
+    encoder.forward = forward
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats, entries=len(_cache), bytes=_cache_bytes)
+
+
+def clear():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
@@ -0,0 +1,320 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from utils import metrics
+from utils.whisper import encoder_cache
+from utils.whisper.model_cache import get_model, use_model
+
+# Windows decoded together at most; 1 turns batching off
+MAX_BATCH = int(os.environ.get("WHISPER_BATCH_SIZE", "8"))
+# How long the first window of a batch waits for windows from other sessions
+MAX_WAIT_SECONDS = float(os.environ.get("WHISPER_BATCH_WAIT_MS", "50")) / 1000
+
+# model.transcribe() defaults, applied per window
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+# Seconds per timestamp token
+TIME_PRECISION = 0.02
+
+_workers = {}   # (model_name, device, dtype) -> _Worker
+_workers_lock = threading.Lock()
+_stats = {}     # batch size -> {"batches", "windows", "seconds", "audio_seconds"}
+_stats_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+# Future result telling the caller to decode its window itself
+_ALONE = object()
+
+
+class _Request:
+    def __init__(self, mel, seek, frames, clip, task, language, owner):
+        self.mel = mel            # (n_mels, N_FRAMES) window on the model's device
+        self.seek = seek          # first mel frame of the window
+        self.frames = frames      # frames of real audio in it
+        self.clip = clip
+        self.task = task
+        self.language = language
+        self.owner = owner        # the call that submitted it; one window per owner per batch
+        self.labels = metrics.current_labels()
+        self.submitted = time.monotonic()
+        self.future = Future()
+
+
+class _Worker:
+    """
+    One thread per model that drains the window queue in batches. It only
+    ever runs batched decodes: a window with no partner from another call is
+    handed back and decoded by its caller, so lone windows keep their
+    replica and prompt and still run concurrently.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._loop, name=f"whisper-batch-{key[0]}", daemon=True)
+        self.thread.start()
+
+    def submit(self, request: _Request):
+        with self.cond:
+            self.pending.append(request)
+            self.cond.notify()
+
+    def _take(self) -> list:
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            deadline = self.pending[0].submitted + MAX_WAIT_SECONDS
+            while len(self.pending) < MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            # Windows of the same call (e.g. its transcribe and translate
+            # tasks) wait for the next batch rather than share this one
+            batch, owners, rest = [], set(), deque()
+            while self.pending:
+                request = self.pending.popleft()
+                if request.owner in owners or len(batch) >= MAX_BATCH:
+                    rest.append(request)
+                else:
+                    owners.add(request.owner)
+                    batch.append(request)
+            self.pending = rest
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = []
+            try:
+                batch = self._take()
+                if len(batch) == 1:
+                    batch[0].future.set_result(_ALONE)
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    results = _decode_batch(self.key, batch)
+                except Exception:
+                    # Recorded as an inference error by _decode_batch's stage
+                    _log.exception("Batched decoding failed, decoding %d windows one by one", len(batch))
+                    results = [_ALONE] * len(batch)
+                else:
+                    _record(len(batch), time.perf_counter() - t0, batch)
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                # Never leave a caller waiting on a window this thread dropped
+                _log.exception("Inference worker for %s failed", self.key[0])
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+
+def _worker(key) -> _Worker:
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None:
+            worker = _workers[key] = _Worker(key)
+        return worker
+
+
+def transcribe_window(mel, clip, task, model_name, device, dtype, language=None, single=None,
+                      owner=None) -> dict:
+    """
+    Decode the [start, end] seconds of a full-file mel through the model's
+    shared worker, batched with windows that other calls submitted at about
+    the same time. Windows passing the same owner (one per call, e.g. the
+    tasks of a transcribe-and-translate run) are never batched together.
+    A window that ends up alone is decoded by single(), the regular
+    model.transcribe() path, on the calling thread, so a lone session is
+    unaffected. Returns a Whisper-shaped result for the window.
+    """
+    if MAX_BATCH <= 1:
+        return single()
+
+    import torch
+    from whisper.audio import HOP_LENGTH, N_FRAMES, SAMPLE_RATE, pad_or_trim
+
+    model = get_model(model_name, device=device, dtype=dtype)
+    seek = round(clip[0] * SAMPLE_RATE / HOP_LENGTH)
+    frames = min(N_FRAMES, max(1, round(clip[1] * SAMPLE_RATE / HOP_LENGTH) - seek))
+    # Sliced and padded exactly as model.transcribe() does, so encoder cache keys match
+    segment = pad_or_trim(mel[:, seek:seek + frames], N_FRAMES)
+    segment = segment.to(model.device).to(torch.float16 if dtype == "float16" else torch.float32)
+
+    request = _Request(segment, seek, frames, clip, task, language, owner if owner is not None else object())
+    _worker((model_name, device, dtype)).submit(request)
+    result = request.future.result()
+    if result is not _ALONE:
+        return result
+
+    t0 = time.perf_counter()
+    result = single()
+    _record(1, time.perf_counter() - t0, [request])
+    return result
+
+
+# --- Batched decoding ---
+
+def _needs_fallback(result) -> bool:
+    if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+        return False   # silence; a hotter temperature would only invent text
+    return result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD
+
+
+def _decode_with_fallback(model, features, task, language, dtype) -> list:
+    """Decode a batch of encoded windows, retrying only the failed ones at higher temperatures."""
+    from whisper.decoding import DecodingOptions
+
+    results = [None] * len(features)
+    todo = list(range(len(features)))
+    for temperature in TEMPERATURES:
+        options = DecodingOptions(task=task, language=language, temperature=temperature,
+                                  fp16=dtype == "float16")
+        for i, result in zip(todo, model.decode(features[todo], options)):
+            results[i] = result
+        todo = [i for i in todo if _needs_fallback(results[i])]
+        if not todo:
+            break
+    return results
+
+
+def _split_segments(result, tokenizer, request) -> list:
+    """Segments from the timestamp tokens of one decoded window, as model.transcribe() splits them."""
+    from whisper.audio import HOP_LENGTH, SAMPLE_RATE
+
+    tokens = result.tokens
+    begin = tokenizer.timestamp_begin
+    offset = request.seek * HOP_LENGTH / SAMPLE_RATE
+    is_ts = [t >= begin for t in tokens]
+    single_ending = is_ts[-2:] == [False, True]
+    slices = [i + 1 for i in range(len(tokens) - 1) if is_ts[i] and is_ts[i + 1]]
+
+    spans = []
+    if slices:
+        if single_ending:
+            slices.append(len(tokens))
+        last = 0
+        for current in slices:
+            part = tokens[last:current]
+            spans.append(((part[0] - begin) * TIME_PRECISION, (part[-1] - begin) * TIME_PRECISION, part))
+            last = current
+        tail = tokens[last:]
+        # The window ended mid-segment: keep the text up to the window edge
+        if not single_ending and any(t < tokenizer.eot for t in tail):
+            start = (tail[0] - begin) * TIME_PRECISION if tail[0] >= begin else spans[-1][1]
+            spans.append((start, request.clip[1] - offset, tail))
+    else:
+        end = request.frames * HOP_LENGTH / SAMPLE_RATE
+        stamps = [t for t in tokens if t >= begin]
+        if stamps and stamps[-1] != begin:
+            end = (stamps[-1] - begin) * TIME_PRECISION
+        spans.append((0.0, end, tokens))
+
+    segments = []
+    for start, end, part in spans:
+        text = tokenizer.decode([t for t in part if t < tokenizer.eot])
+        if not text.strip():
+            continue
+        segments.append({
+            "seek": request.seek,
+            "start": offset + start,
+            "end": min(offset + end, request.clip[1]),
+            "text": text,
+            "tokens": list(part),
+            "temperature": result.temperature,
+            "avg_logprob": result.avg_logprob,
+            "compression_ratio": result.compression_ratio,
+            "no_speech_prob": result.no_speech_prob,
+        })
+    return segments
+
+
+def _window_result(model, request, result) -> dict:
+    from whisper.timing import add_word_timestamps
+    from whisper.tokenizer import get_tokenizer
+
+    segments = []
+    if not (result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD):
+        tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                  language=result.language, task=request.task)
+        segments = _split_segments(result, tokenizer, request)
+        if segments:
+            # Alignment re-runs the encoder on this window; the cache already holds it
+            add_word_timestamps(segments=segments, model=model, tokenizer=tokenizer, mel=request.mel,
+                                num_frames=request.frames, last_speech_timestamp=request.clip[0])
+    return {"text": "".join(seg["text"] for seg in segments), "segments": segments,
+            "language": result.language}
+
+
+def _decode_batch(key, batch) -> list:
+    """
+    Encode every window in one batch, then decode them together per
+    (task, language). Previous-text prompts differ per session and cannot
+    share a decoder batch, so batched windows are decoded without them.
+    """
+    import torch
+
+    model_name, device, dtype = key
+    audio_seconds = sum(r.clip[1] - r.clip[0] for r in batch)
+    with use_model(model_name, device=device, dtype=dtype) as model, torch.no_grad(), \
+            encoder_cache.sharing(), \
+            metrics.stage("inference", task="batch", model=model_name, backend="openai",
+                          batch_size=len(batch), audio_seconds=audio_seconds):
+        encoder_cache.install(model, (model_name, str(model.device), dtype))
+        features = model.encoder(torch.stack([r.mel for r in batch]))
+
+        groups = {}
+        for i, request in enumerate(batch):
+            groups.setdefault((request.task, request.language), []).append(i)
+        decoded = [None] * len(batch)
+        for (task, language), indices in groups.items():
+            results = _decode_with_fallback(model, features[indices], task, language, dtype)
+            for i, result in zip(indices, results):
+                decoded[i] = result
+
+        return [_window_result(model, request, result) for request, result in zip(batch, decoded)]
+
+
+# --- Throughput report ---
+
+def _record(batch_size: int, seconds: float, batch: list):
+    with _stats_lock:
+        s = _stats.setdefault(batch_size, {"batches": 0, "windows": 0, "seconds": 0.0, "audio_seconds": 0.0})
+        s["batches"] += 1
+        s["windows"] += len(batch)
+        s["seconds"] += seconds
+        s["audio_seconds"] += sum(r.clip[1] - r.clip[0] for r in batch)
+
+
+def stats() -> dict:
+    """
+    Windows decoded alone and in batches, with the throughput of each
+    (audio seconds per second of decoding). gain is batched throughput over
+    unbatched throughput, once both have been observed.
+    """
+    with _stats_lock:
+        by_size = {size: dict(s) for size, s in sorted(_stats.items())}
+
+    def throughput(rows):
+        seconds = sum(r["seconds"] for r in rows)
+        return sum(r["audio_seconds"] for r in rows) / seconds if seconds else None
+
+    unbatched = throughput([s for size, s in by_size.items() if size == 1])
+    batched = throughput([s for size, s in by_size.items() if size > 1])
+    return {
+        "by_batch_size": by_size,
+        "unbatched_throughput": unbatched,
+        "batched_throughput": batched,
+        "gain": batched / unbatched if batched and unbatched else None,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,240 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.audio_loader import SAMPLE_RATE
+from utils.whisper.model_cache import use_model, decode_options
+
+# Tiny/base keep the decode of a short window well under a second on CPU
+DICTATION_MODEL = os.environ.get("WHISPER_DICTATION_MODEL", "base")
+STEP_SECONDS = float(os.environ.get("WHISPER_DICTATION_STEP_SECONDS", "1.0"))
+MAX_BUFFER_SECONDS = float(os.environ.get("WHISPER_DICTATION_BUFFER_SECONDS", "20"))
+# The background thread ends when no audio has arrived for this long
+IDLE_SECONDS = float(os.environ.get("WHISPER_DICTATION_IDLE_SECONDS", "30"))
+MIN_DECODE_SECONDS = 1.0
+PROMPT_CHARS = 200
+
+
+class RingBuffer:
+    """Fixed-capacity float32 sample buffer; the oldest samples are overwritten."""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, samples) -> int:
+        """Append samples and return how many old samples were overwritten."""
+        samples = np.asarray(samples, dtype=np.float32)
+        capacity = len(self._data)
+        if len(samples) >= capacity:
+            dropped = self._size + len(samples) - capacity
+            self._data[:] = samples[-capacity:]
+            self._start, self._size = 0, capacity
+            return dropped
+
+        end = (self._start + self._size) % capacity
+        first = min(len(samples), capacity - end)
+        self._data[end:end + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+
+        dropped = max(0, self._size + len(samples) - capacity)
+        self._size = min(self._size + len(samples), capacity)
+        self._start = (self._start + dropped) % capacity
+        return dropped
+
+    def discard(self, n: int):
+        n = min(n, self._size)
+        self._start = (self._start + n) % len(self._data)
+        self._size -= n
+
+    def read(self) -> np.ndarray:
+        idx = (self._start + np.arange(self._size)) % len(self._data)
+        return self._data[idx]
+
+
+def to_mono_16k(samples, sample_rate: int, channels: int = 1) -> np.ndarray:
+    """
+    Interleaved int16/float PCM -> mono float32 at 16 kHz.
+    Vectorized linear interpolation; no ffmpeg round trip.
+    """
+    samples = np.asarray(samples)
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / 32768.0
+    else:
+        samples = samples.astype(np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    else:
+        samples = samples.reshape(-1)
+    if sample_rate == SAMPLE_RATE or len(samples) == 0:
+        return samples
+
+    n_out = int(round(len(samples) * SAMPLE_RATE / sample_rate))
+    positions = np.arange(n_out) * (sample_rate / SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _norm(word: str) -> str:
+    return word.strip().lower().strip(".,!?;:\"'")
+
+
+class LiveDictation:
+    """
+    Incremental transcription of a live audio stream.
+
+    Audio goes into a ring buffer that starts at the last committed word.
+    A background thread re-decodes that buffer every STEP_SECONDS; words
+    that two consecutive hypotheses agree on are committed and dropped from
+    the buffer, so finalized text is never decoded again. The rest is kept
+    as tentative text. committed and tentative are replaced, never mutated,
+    so a list read through snapshot() stays consistent.
+    """
+
+    def __init__(self, model_name: str = DICTATION_MODEL, language: str = None,
+                 task: str = "transcribe"):
+        self.model_name = model_name
+        self.language = language
+        self.task = task
+        self.committed = []          # segments: {"start", "end", "text", "words"}
+        self.tentative = []          # words: {"start", "end", "word"}
+        self.latency = None          # seconds from the newest decoded sample to its text
+        self._buffer = RingBuffer(int(MAX_BUFFER_SECONDS * SAMPLE_RATE))
+        self._buffer_start = 0.0     # global time of the first buffered sample
+        self._last_feed = None
+        self._decoded_feed = None    # _last_feed as of the last decode
+        self._started = None
+        self._previous = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Feeding ---
+
+    def feed(self, samples, sample_rate: int = SAMPLE_RATE, channels: int = 1):
+        audio = to_mono_16k(samples, sample_rate, channels)
+        with self._lock:
+            dropped = self._buffer.append(audio)
+            self._buffer_start += dropped / SAMPLE_RATE
+            self._last_feed = time.monotonic()
+
+    def start(self):
+        """Start (or, after the stream stalled, restart) the background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._loop, name="live-dictation", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if flush:
+            self.step()
+            with self._lock:
+                self._commit(self.tentative)
+                self.tentative = self._previous = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            with self._lock:
+                fed_at = max(self._last_feed or 0.0, self._started)
+            if t0 - fed_at > IDLE_SECONDS:
+                break
+            self.step()
+            self._stop.wait(max(0.0, STEP_SECONDS - (time.monotonic() - t0)))
+
+    # --- Decoding ---
+
+    def step(self):
+        """
+        Decode the uncommitted audio once and update committed/tentative
+        text. Does nothing if no audio arrived since the last decode.
+        """
+        with self._lock:
+            fed_at = self._last_feed
+            if fed_at is None or fed_at == self._decoded_feed:
+                return
+            audio = self._buffer.read()
+            offset = self._buffer_start
+            prompt = "".join(seg["text"] for seg in self.committed)[-PROMPT_CHARS:] or None
+            language = self.language
+        if len(audio) < MIN_DECODE_SECONDS * SAMPLE_RATE:
+            return
+
+        with use_model(self.model_name) as model:
+            result = model.transcribe(
+                audio, task=self.task, language=language, word_timestamps=True,
+                condition_on_previous_text=False, initial_prompt=prompt,
+                **decode_options()
+            )
+
+        words = [
+            {"start": w["start"] + offset, "end": w["end"] + offset, "word": w["word"]}
+            for seg in result["segments"] for w in seg.get("words", [])
+        ]
+
+        with self._lock:
+            self.language = self.language or result.get("language")
+
+            # Local agreement: commit the prefix shared with the previous hypothesis
+            agreed = 0
+            for prev, new in zip(self._previous, words):
+                if _norm(prev["word"]) != _norm(new["word"]):
+                    break
+                agreed += 1
+            confirmed, pending = words[:agreed], words[agreed:]
+
+            # Buffer full and still no agreement: force out all but the last words
+            if not confirmed and len(audio) >= 0.9 * MAX_BUFFER_SECONDS * SAMPLE_RATE:
+                confirmed, pending = words[:-2], words[-2:]
+
+            self._commit(confirmed)
+            self._previous = pending
+            self.tentative = pending
+            self.latency = time.monotonic() - fed_at
+            self._decoded_feed = fed_at
+
+    def _commit(self, words):
+        """Caller holds _lock."""
+        if not words:
+            return
+        self.committed = self.committed + [{
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "text": "".join(w["word"] for w in words),
+            "words": words,
+        }]
+        drop = int((words[-1]["end"] - self._buffer_start) * SAMPLE_RATE)
+        if drop > 0:
+            self._buffer.discard(drop)
+            self._buffer_start += drop / SAMPLE_RATE
+
+    # --- Output ---
+
+    def snapshot(self):
+        """(committed segments, tentative words, latency) as of one decode step."""
+        with self._lock:
+            return self.committed, self.tentative, self.latency
+
+    def committed_text(self) -> str:
+        committed, _, _ = self.snapshot()
+        return "".join(seg["text"] for seg in committed)
+
+    def tentative_text(self) -> str:
+        _, tentative, _ = self.snapshot()
+        return "".join(w["word"] for w in tentative)
+
+    def result(self) -> dict:
+        """Committed text in the Whisper result shape the components expect."""
+        committed, _, _ = self.snapshot()
+        segments = [dict(seg, id=i) for i, seg in enumerate(committed)]
+        return {"text": "".join(seg["text"] for seg in committed), "segments": segments,
+                "language": self.language}
@@ -0,0 +1,279 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from whisper.audio import HOP_LENGTH, SAMPLE_RATE
+
+from utils.whisper.model_cache import DEFAULT_MODEL
+
+WINDOW_SECONDS = float(os.environ.get("WHISPER_LONG_FORM_WINDOW_SECONDS", "120"))
+OVERLAP_SECONDS = float(os.environ.get("WHISPER_LONG_FORM_OVERLAP_SECONDS", "5"))
+MIN_SECONDS = float(os.environ.get("WHISPER_LONG_FORM_MIN_SECONDS", "600"))
+DEFAULT_WORKERS = int(
+    os.environ.get("WHISPER_LONG_FORM_WORKERS", str(max(1, (os.cpu_count() or 1) // 2)))
+)
+# Worker pools kept alive at once; each holds a model per worker process
+MAX_POOLS = int(os.environ.get("WHISPER_LONG_FORM_MAX_POOLS", "1"))
+
+_pools = OrderedDict()   # (model_name, device, dtype, workers) -> [ProcessPoolExecutor, users]
+_pools_lock = threading.Lock()
+
+# --- Worker process side ---
+
+_worker_model = None
+_worker_dtype = "float32"
+
+
+def _init_worker(model_name, device, dtype, threads):
+    """Load one model per worker process and split the CPU between workers."""
+    global _worker_model, _worker_dtype
+    import torch
+    import whisper
+    torch.set_num_threads(max(1, threads))
+    _worker_model = whisper.load_model(model_name, device=device or "cpu")
+    if dtype == "float16":
+        _worker_model = _worker_model.half()
+    _worker_dtype = dtype
+
+
+def _detect_language(audio):
+    import whisper
+    audio = whisper.pad_or_trim(audio)
+    mel = whisper.log_mel_spectrogram(audio, _worker_model.dims.n_mels).to(_worker_model.device)
+    _, probs = _worker_model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+
+def _transcribe_window(audio, task, language):
+    return _worker_model.transcribe(
+        audio, word_timestamps=True, task=task, language=language,
+        fp16=_worker_dtype == "float16"
+    )
+
+
+# --- Parent side ---
+
+def _shrink_pools():
+    """Shut down least recently used idle pools beyond MAX_POOLS (must hold _pools_lock)."""
+    for key in list(_pools):
+        if len(_pools) <= MAX_POOLS:
+            return
+        pool, users = _pools[key]
+        if not users:
+            del _pools[key]
+            pool.shutdown(wait=False)
+
+
+@contextmanager
+def _use_pool(model_name, device, dtype, workers):
+    """
+    The worker pool for this model, created on first use. Pools in use are
+    never shut down; the rest are kept to the MAX_POOLS most recently used.
+    """
+    key = (model_name, device, dtype, workers)
+    with _pools_lock:
+        entry = _pools.get(key)
+        if entry is None:
+            threads = (os.cpu_count() or 1) // workers
+            # spawn: forked children would inherit the parent's torch/OpenMP state
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, device, dtype, threads)
+            )
+            entry = _pools[key] = [pool, 0]
+        entry[1] += 1
+        _pools.move_to_end(key)
+        _shrink_pools()
+    try:
+        yield entry[0]
+    finally:
+        with _pools_lock:
+            entry[1] -= 1
+            _shrink_pools()
+
+
+def split_windows(n_samples: int, window_s: float = WINDOW_SECONDS,
+                  overlap_s: float = OVERLAP_SECONDS):
+    """
+    Overlapping (start, end) sample ranges covering the audio.
+    Consecutive windows share overlap_s seconds.
+    """
+    window = int(window_s * SAMPLE_RATE)
+    step = window - int(overlap_s * SAMPLE_RATE)
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window, n_samples)
+        windows.append((start, end))
+        if end >= n_samples:
+            return windows
+        start += step
+
+
+def _shift_segment(seg, offset_s, offset_frames):
+    seg = dict(seg)
+    seg["start"] = round(seg["start"] + offset_s, 3)
+    seg["end"] = round(seg["end"] + offset_s, 3)
+    seg["seek"] = seg.get("seek", 0) + offset_frames
+    if seg.get("words"):
+        seg["words"] = [
+            {**w, "start": round(w["start"] + offset_s, 3), "end": round(w["end"] + offset_s, 3)}
+            for w in seg["words"]
+        ]
+    return seg
+
+
+def clip_segment(seg, lo, hi):
+    """
+    Keep the part of a segment that belongs to [lo, hi) on the global
+    timeline. With word timestamps the cut is per word; otherwise the
+    segment midpoint decides.
+    """
+    words = seg.get("words")
+    if not words:
+        mid = (seg["start"] + seg["end"]) / 2
+        return seg if lo <= mid < hi else None
+
+    kept = [w for w in words if lo <= (w["start"] + w["end"]) / 2 < hi]
+    if not kept:
+        return None
+    if len(kept) == len(words):
+        return seg
+
+    seg = dict(seg)
+    seg["words"] = kept
+    seg["start"] = kept[0]["start"]
+    seg["end"] = kept[-1]["end"]
+    seg["text"] = "".join(w["word"] for w in kept)
+    # Tokens no longer line up with the clipped text
+    seg["tokens"] = []
+    return seg
+
+
+def _window_segments(result, windows, i) -> list:
+    """
+    Window i's segments on the global timeline, keeping only what it owns:
+    each overlap is split at its midpoint, so overlap text appears once.
+    Needs only the neighbouring window bounds, so windows can be merged in
+    order as they finish.
+    """
+    start, end = windows[i]
+    offset_s = start / SAMPLE_RATE
+    lo = 0.0 if i == 0 else (start + windows[i - 1][1]) / 2 / SAMPLE_RATE
+    hi = float("inf") if i == len(windows) - 1 else (windows[i + 1][0] + end) / 2 / SAMPLE_RATE
+
+    segments = []
+    for seg in result["segments"]:
+        seg = clip_segment(_shift_segment(seg, offset_s, start // HOP_LENGTH), lo, hi)
+        if seg is not None:
+            segments.append(seg)
+    return segments
+
+
+def _assemble(segments, language) -> dict:
+    for i, seg in enumerate(segments):
+        seg["id"] = i
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": language,
+    }
+
+
+def merge_results(results, windows):
+    """
+    Stitch per-window results into one Whisper-shaped result.
+    Words (or segments) in an overlap are taken from whichever window owns
+    their side of its midpoint.
+    """
+    segments = [seg for i, result in enumerate(results) for seg in _window_segments(result, windows, i)]
+    return _assemble(segments, results[0].get("language") if results else None)
+
+
+def iter_long(audio, task="transcribe", model_name=DEFAULT_MODEL, device=None,
+              dtype="float32", language=None, workers=None):
+    """
+    Decode 16 kHz float32 audio as overlapping windows in a process pool,
+    one model per worker, and yield (segments, end_seconds, language) per
+    window in order, as soon as it and every window before it are done.
+    Closing the generator cancels the windows not started yet.
+    """
+    workers = workers or DEFAULT_WORKERS
+    windows = split_windows(len(audio))
+    with _use_pool(model_name, device, dtype, workers) as pool:
+        # Detect once so every window decodes in the same language
+        if language is None:
+            language = pool.submit(_detect_language, audio[:30 * SAMPLE_RATE]).result()
+
+        futures = [
+            pool.submit(_transcribe_window, audio[start:end], task, language)
+            for start, end in windows
+        ]
+        try:
+            for i, future in enumerate(futures):
+                yield _window_segments(future.result(), windows, i), windows[i][1] / SAMPLE_RATE, language
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def transcribe_long(audio, task="transcribe", model_name=DEFAULT_MODEL, device=None,
+                    dtype="float32", language=None, workers=None):
+    """Whole-file version of iter_long(); returns one Whisper-shaped result."""
+    segments = []
+    for window_segments, _, language in iter_long(audio, task, model_name, device, dtype, language, workers):
+        segments.extend(window_segments)
+    return _assemble(segments, language)
+
+
+def should_use(n_samples: int, workers: int = None) -> bool:
+    workers = workers or DEFAULT_WORKERS
+    return workers > 1 and n_samples / SAMPLE_RATE >= MIN_SECONDS
+
+
+def measure_speedup(media_path, task="transcribe", model_name=DEFAULT_MODEL,
+                    workers=DEFAULT_WORKERS):
+    """
+    Time the single-pass and the chunked path on the same file.
+    Worker pools and the shared model are warmed up first so only
+    inference is compared.
+    """
+    from utils.whisper.model_cache import use_model
+    from utils.whisper.whisper_service import load_audio
+
+    audio = load_audio(media_path)
+    with _use_pool(model_name, None, "float32", workers) as pool:
+        list(pool.map(time.sleep, [1.0] * workers))
+
+    with use_model(model_name) as model:
+        t0 = time.perf_counter()
+        model.transcribe(audio, word_timestamps=True, task=task, fp16=False)
+        single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    transcribe_long(audio, task=task, model_name=model_name, workers=workers)
+    chunked = time.perf_counter() - t0
+
+    duration = len(audio) / SAMPLE_RATE
+    return {
+        "audio_seconds": duration,
+        "workers": workers,
+        "single_pass_seconds": single,
+        "chunked_seconds": chunked,
+        "speedup": single / chunked if chunked else None,
+        "single_pass_rtf": single / duration,
+        "chunked_rtf": chunked / duration,
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    print(json.dumps(measure_speedup(sys.argv[1]), indent=2))
@@ -0,0 +1,163 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import whisper
+
+from utils import metrics
+
+DEFAULT_MODEL = os.environ.get("WHISPER_MODEL", "small")
+# Distinct checkpoints held at once; the replicas of one count as one
+MAX_MODELS = int(os.environ.get("WHISPER_MAX_MODELS", "2"))
+MAX_MODEL_BYTES = int(os.environ.get("WHISPER_MAX_MODEL_BYTES", "0"))  # 0 = no byte budget
+# Comma separated model names to preload; set WHISPER_WARMUP="" to disable
+WARMUP_MODELS = [n for n in os.environ.get("WHISPER_WARMUP", DEFAULT_MODEL).split(",") if n]
+
+_models = OrderedDict()   # (name, device, dtype, replica) -> (model, size_bytes, inference_lock)
+_registry_lock = threading.Lock()
+_load_locks = {}
+_loader = whisper.load_model
+
+
+def _resolve_device(device):
+    if device:
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _model_bytes(model) -> int:
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+def _evict(keep_key):
+    """
+    Drop least recently used models until the count and byte budgets hold.
+    The count is of distinct (name, device, dtype), so parallel replicas do
+    not push another model out; the bytes of every replica count. The model
+    that was just requested, and its replicas, are never evicted.
+    """
+    def over_budget():
+        if MAX_MODELS and len({k[:3] for k in _models}) > MAX_MODELS:
+            return True
+        if MAX_MODEL_BYTES and sum(entry[1] for entry in _models.values()) > MAX_MODEL_BYTES:
+            return True
+        return False
+
+    while over_budget():
+        oldest = next((k for k in _models if k[:3] != keep_key[:3]), None)
+        if oldest is None:
+            break
+        del _models[oldest]
+
+
+def _get_entry(key, load=None):
+    with _registry_lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        # Another session may have finished loading while we waited
+        with _registry_lock:
+            if key in _models:
+                _models.move_to_end(key)
+                return _models[key]
+
+        with metrics.stage("model_load", model=key[0], device=key[1], dtype=key[2]) as event:
+            if load is not None:
+                model = load()
+                event["bytes"] = getattr(model, "nbytes", 0)
+            else:
+                model = _loader(key[0], device=key[1])
+                if key[2] == "float16":
+                    model = model.half()
+                event["bytes"] = _model_bytes(model)
+
+        entry = (model, event["bytes"], threading.Lock())
+        with _registry_lock:
+            _models[key] = entry
+            _evict(key)
+            _load_locks.pop(key, None)
+        return entry
+
+
+def get_model(name: str = DEFAULT_MODEL, device: str = None, dtype: str = "float32",
+              replica: int = 0):
+    """
+    Return a process-wide shared Whisper model, loading it on first use.
+    Concurrent callers asking for the same model wait for a single load.
+    A non-zero replica loads an independent copy for parallel decoding.
+    """
+    return _get_entry((name, _resolve_device(device), dtype, replica))[0]
+
+
+@contextmanager
+def use_model(name: str = DEFAULT_MODEL, device: str = None, dtype: str = "float32",
+              replica: int = 0):
+    """
+    Borrow a shared model for one inference call.
+    Whisper installs kv-cache and alignment hooks on the model while decoding,
+    so two threads must never decode on the same instance at once.
+    """
+    model, _, inference_lock = _get_entry((name, _resolve_device(device), dtype, replica))
+    with inference_lock:
+        yield model
+
+
+def get_engine(backend: str, name: str, device: str, dtype: str, load):
+    """
+    Process-wide instance of another inference engine's model, built by
+    load() on first use. It is held next to the Whisper checkpoints, with
+    the same per-model load locks, and counts against the same budget.
+    """
+    return _get_entry((f"{backend}:{name}", device, dtype, 0), load)[0]
+
+
+def decode_options(dtype: str = "float32") -> dict:
+    """Extra model.transcribe() options matching the cached model dtype."""
+    return {"fp16": dtype == "float16"}
+
+
+def warmup(names=None, device: str = None, dtype: str = "float32", background: bool = True):
+    """
+    Preload models at startup so the first request does not pay the load cost.
+    """
+    names = WARMUP_MODELS if names is None else names
+    if not names:
+        return None
+
+    def _load_all():
+        for name in names:
+            get_model(name, device=device, dtype=dtype)
+
+    if not background:
+        _load_all()
+        return None
+
+    thread = threading.Thread(target=_load_all, name="whisper-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def loaded_models() -> list:
+    """Keys and sizes of the models currently held, least recently used first."""
+    with _registry_lock:
+        return [(key, entry[1]) for key, entry in _models.items()]
+
+
+def set_loader(loader=None):
+    """
+    Load models with loader(name, device=...) instead of whisper.load_model
+    (None restores it). Benchmarks use this to time the service with a stub.
+    Already loaded models are kept; call clear() to drop them.
+    """
+    global _loader
+    _loader = loader or whisper.load_model
+
+
+def clear():
+    with _registry_lock:
+        _models.clear()
@@ -0,0 +1,68 @@
+import os
+import statistics
+
+from utils import metrics
+
+AUTO = "auto"
+# Candidates from fastest to most accurate
+ADAPTIVE_MODELS = [n for n in os.environ.get("WHISPER_ADAPTIVE_MODELS", "tiny,base,small").split(",") if n]
+# How long a user should wait for a finished transcript, queue time included
+LATENCY_BUDGET_SECONDS = float(os.environ.get("WHISPER_LATENCY_BUDGET_SECONDS", "60"))
+DRAFT_MODEL = os.environ.get("WHISPER_DRAFT_MODEL", "tiny")
+
+# Real-time factors assumed until this process has measured its own (CPU, float32)
+PRIOR_RTF = {"tiny": 0.06, "base": 0.12, "small": 0.35, "medium": 1.0, "large": 2.0, "turbo": 0.8}
+# Recent inference runs per model that the estimate is taken from
+RTF_WINDOW = 20
+
+
+def measured_rtf(model_name: str, backend: str = None, task: str = "transcribe",
+                 long_form: bool = False):
+    """
+    Median real-time factor of this model's recent runs of one task on one
+    path (windowed or long-form), or None. Batched windows are left out, as
+    their time is shared between sessions. Runs record the audio actually
+    decoded (after silence skipping), so apply it to that length, not to
+    the recording's.
+    """
+    samples = [
+        e["seconds"] / e["audio_seconds"]
+        for e in metrics.events()
+        if e["stage"] == "inference" and e.get("model") == model_name
+        and e.get("task") == task and bool(e.get("long_form")) == long_form
+        and (backend is None or e.get("backend") == backend)
+        and e.get("audio_seconds") and "error" not in e
+    ][-RTF_WINDOW:]
+    return statistics.median(samples) if samples else None
+
+
+def rtf(model_name: str, backend: str = None, task: str = "transcribe", long_form: bool = False) -> float:
+    measured = measured_rtf(model_name, backend, task, long_form)
+    if measured is not None:
+        return measured
+    return PRIOR_RTF.get(model_name.split(".")[0], 1.0)
+
+
+def estimate_seconds(model_name: str, duration: float, queue_depth: int = 0, workers: int = 1,
+                     backend: str = None, tasks=("transcribe",), long_form: bool = False) -> float:
+    """
+    Expected time to a finished result: this file's decode time for every
+    task the job runs, stretched by the other jobs competing for the same
+    workers and cores.
+    """
+    load = 1.0 + max(queue_depth, 0) / max(workers, 1)
+    return sum(rtf(model_name, backend, task, long_form) for task in tasks) * duration * load
+
+
+def choose_model(duration: float, queue_depth: int = 0, workers: int = 1,
+                 budget: float = LATENCY_BUDGET_SECONDS, candidates=None, backend: str = None,
+                 tasks=("transcribe",), long_form: bool = False) -> str:
+    """
+    Most accurate candidate expected to finish within the latency budget;
+    the fastest one when none does.
+    """
+    candidates = candidates or ADAPTIVE_MODELS
+    for name in reversed(candidates):
+        if estimate_seconds(name, duration, queue_depth, workers, backend, tasks, long_form) <= budget:
+            return name
+    return candidates[0]
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+CACHE_DIR = os.environ.get("WHISPER_RESULT_CACHE_DIR", "assets/result_cache/")
+MAX_CACHE_BYTES = int(os.environ.get("WHISPER_RESULT_CACHE_BYTES", str(2 * 1024 ** 3)))
+HASH_CHUNK_SIZE = 1024 * 1024
+CACHE_VERSION = 1
+
+_hash_memo = {}   # (path, size, mtime_ns) -> sha256 hex
+_memo_lock = threading.Lock()
+
+
+def media_hash(media_path: str) -> str:
+    """
+    SHA-256 of the media bytes. Memoized per (path, size, mtime) so reruns
+    on the same file do not re-read it.
+    """
+    st = os.stat(media_path)
+    memo_key = (os.path.abspath(media_path), st.st_size, st.st_mtime_ns)
+    with _memo_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(media_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    with _memo_lock:
+        _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def remember_hash(media_path: str, content_hash: str):
+    """Record a hash computed elsewhere (e.g. while streaming an upload to disk)."""
+    st = os.stat(media_path)
+    with _memo_lock:
+        _hash_memo[(os.path.abspath(media_path), st.st_size, st.st_mtime_ns)] = content_hash
+
+
+def cache_key(content_hash: str, model_name: str, task: str, options: dict) -> str:
+    payload = json.dumps(
+        {"v": CACHE_VERSION, "media": content_hash, "model": model_name,
+         "task": task, "options": options},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], key + ".json.z")
+
+
+def _to_builtin(value):
+    # numpy scalars/arrays sometimes leak into Whisper results
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def get(key: str):
+    path = _entry_path(key)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        result = json.loads(zlib.decompress(data))
+    except (zlib.error, ValueError):
+        # Corrupt entry: drop it and treat as a miss
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    # Bump mtime so eviction treats this entry as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def put(key: str, result: dict):
+    """Write an entry atomically: temp file in the same dir, then rename."""
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    data = zlib.compress(
+        json.dumps(result, separators=(",", ":"), default=_to_builtin).encode("utf-8"),
+        6
+    )
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    evict(MAX_CACHE_BYTES)
+
+
+def evict(max_bytes: int = MAX_CACHE_BYTES):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    if not max_bytes or not os.path.isdir(CACHE_DIR):
+        return
+
+    entries = []
+    total = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith(".json.z"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    if total <= max_bytes:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+def cached(media_path: str, model_name: str, task: str, options: dict, compute):
+    """
+    Return the cached result for this media/model/task/options, or run
+    compute() and store what it returns.
+    """
+    key = cache_key(media_hash(media_path), model_name, task, options)
+    result = get(key)
+    if result is None:
+        result = compute()
+        put(key, result)
+    return result
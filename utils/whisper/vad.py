@@ -0,0 +1,196 @@
+import os
+
+import numpy as np
+
+from utils import metrics
+from utils.audio_loader import SAMPLE_RATE
+
+# Drop silence before inference; "0" sends the whole recording to Whisper
+VAD_ENABLED = os.environ.get("WHISPER_VAD", "1") == "1"
+FRAME_SECONDS = 0.02
+# Only pauses at least this long are cut; shorter ones stay as context
+MIN_SILENCE_SECONDS = float(os.environ.get("WHISPER_VAD_MIN_SILENCE_SECONDS", "1.0"))
+# Audio kept on each side of a speech region so word onsets are not clipped
+PAD_SECONDS = float(os.environ.get("WHISPER_VAD_PAD_SECONDS", "0.2"))
+# Silence put between joined regions so Whisper still hears a pause there
+JOIN_SECONDS = 0.2
+# A frame is speech when it is this far above the recording's noise floor...
+MARGIN_DB = float(os.environ.get("WHISPER_VAD_MARGIN_DB", "10"))
+# ...but the threshold never rises closer than this to the loud frames
+HEADROOM_DB = 25.0
+# Frames quieter than this are silence whatever the recording level
+ABSOLUTE_FLOOR_DB = -60.0
+# Trimming less than this is not worth changing the timeline for
+MIN_SKIP_SECONDS = 2.0
+_BLOCK_FRAMES = 50_000
+
+
+class Timeline:
+    """
+    Maps times in the speech-only audio back to the original recording.
+    Region k of the original, [orig_start[k], orig_start[k] + length[k]),
+    sits at kept_start[k] in the trimmed audio; times that fall in the
+    joins between regions map to the end of the preceding region.
+    """
+
+    def __init__(self, orig_start, kept_start, length, duration):
+        self.orig_start = orig_start
+        self.kept_start = kept_start
+        self.length = length
+        self.duration = duration
+
+    @property
+    def speech_seconds(self) -> float:
+        return float(self.length.sum())
+
+    @property
+    def skipped_seconds(self) -> float:
+        return self.duration - self.speech_seconds
+
+    def to_original(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        k = np.clip(np.searchsorted(self.kept_start, t, side="right") - 1, 0, len(self.kept_start) - 1)
+        offset = np.clip(t - self.kept_start[k], 0.0, self.length[k])
+        return np.round(self.orig_start[k] + offset, 3)
+
+    def report(self) -> dict:
+        return {
+            "duration": round(self.duration, 3),
+            "speech_seconds": round(self.speech_seconds, 3),
+            "skipped_seconds": round(self.skipped_seconds, 3),
+            "regions": len(self.length),
+        }
+
+
+# --- Detection ---
+
+def _frame_db(audio) -> np.ndarray:
+    """Mean power per frame in dBFS, computed block by block (audio may be a memmap)."""
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n = len(audio) // frame
+    power = np.empty(n, dtype=np.float64)
+    for i in range(0, n, _BLOCK_FRAMES):
+        j = min(i + _BLOCK_FRAMES, n)
+        block = np.asarray(audio[i * frame:j * frame], dtype=np.float32).reshape(j - i, frame)
+        power[i:j] = np.einsum("ij,ij->i", block, block) / frame
+    return 10.0 * np.log10(power + 1e-10)
+
+
+def _runs(mask) -> np.ndarray:
+    """(start, end) frame indices of the True runs in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)), axis=1)
+
+
+def speech_regions(audio) -> np.ndarray:
+    """
+    (start, end) sample ranges that contain speech, as an (n, 2) array.
+
+    Frames are compared against a threshold set from the recording's own
+    noise floor (10th percentile of frame power) and loud level (95th).
+    Speech runs are padded and pauses shorter than MIN_SILENCE_SECONDS are
+    bridged, so only long stretches of silence are ever left out.
+    """
+    db = _frame_db(audio)
+    if not len(db):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    floor, loud = np.percentile(db, [10, 95])
+    threshold = max(ABSOLUTE_FLOOR_DB, min(floor + MARGIN_DB, loud - HEADROOM_DB))
+    runs = _runs(db > threshold)
+    if not len(runs):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    pad = int(PAD_SECONDS * SAMPLE_RATE)
+    starts = np.maximum(runs[:, 0] * frame - pad, 0)
+    ends = np.minimum(runs[:, 1] * frame + pad, len(audio))
+    # The last partial frame is too short to judge; keep it with the region before it
+    if runs[-1, 1] == len(db):
+        ends[-1] = len(audio)
+
+    # Merge regions whose gap is shorter than the minimum silence
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] >= MIN_SILENCE_SECONDS * SAMPLE_RATE))
+    group = np.cumsum(keep) - 1
+    merged_ends = np.zeros(group[-1] + 1, dtype=np.int64)
+    np.maximum.at(merged_ends, group, ends)
+    return np.stack((starts[keep], merged_ends), axis=1).astype(np.int64)
+
+
+# --- Trimming ---
+
+def _kept_regions(audio):
+    """Speech regions trim() keeps, or None when the audio is passed through whole."""
+    regions = speech_regions(audio)
+    skipped = len(audio) - (regions[:, 1] - regions[:, 0]).sum()
+    # Nothing detected at all is more likely a quiet recording than an empty one
+    if skipped < MIN_SKIP_SECONDS * SAMPLE_RATE or not len(regions):
+        return None
+    return regions
+
+
+def kept_seconds(audio, enabled: bool = None) -> float:
+    """Length of the audio trim() would hand to the model, without building it."""
+    if enabled is None:
+        enabled = VAD_ENABLED
+    regions = _kept_regions(audio) if enabled and len(audio) else None
+    if regions is None:
+        return len(audio) / SAMPLE_RATE
+    return float((regions[:, 1] - regions[:, 0]).sum() / SAMPLE_RATE + JOIN_SECONDS * (len(regions) - 1))
+
+
+def trim(audio, enabled: bool = None):
+    """
+    Speech-only version of the audio and the Timeline that maps its times
+    back. Returns (audio, None) when VAD is off or there is little to skip.
+    """
+    if enabled is None:
+        enabled = VAD_ENABLED
+    if not enabled or not len(audio):
+        return audio, None
+
+    duration = len(audio) / SAMPLE_RATE
+    with metrics.stage("vad", audio_seconds=duration) as event:
+        regions = _kept_regions(audio)
+        if regions is None:
+            event["skipped_seconds"] = 0.0
+            return audio, None
+        lengths = regions[:, 1] - regions[:, 0]
+        event["skipped_seconds"] = round(duration - lengths.sum() / SAMPLE_RATE, 3)
+
+        join = int(JOIN_SECONDS * SAMPLE_RATE)
+        kept_start = np.concatenate(([0], np.cumsum(lengths + join)[:-1]))
+        trimmed = np.zeros(int(lengths.sum() + join * (len(regions) - 1)), dtype=np.float32)
+        for (a, b), k in zip(regions, kept_start):
+            trimmed[k:k + b - a] = audio[a:b]
+        event["bytes"] = trimmed.nbytes
+
+    timeline = Timeline(regions[:, 0] / SAMPLE_RATE, kept_start / SAMPLE_RATE,
+                        lengths / SAMPLE_RATE, duration)
+    return trimmed, timeline
+
+
+def restore_segments(segments, timeline):
+    """Shift segments (and their words) from trimmed time to the original timeline, in place."""
+    if timeline is None or not segments:
+        return segments
+    starts = timeline.to_original([seg["start"] for seg in segments])
+    ends = timeline.to_original([seg["end"] for seg in segments])
+    for seg, start, end in zip(segments, starts.tolist(), ends.tolist()):
+        seg["start"], seg["end"] = start, end
+        words = seg.get("words")
+        if words:
+            w_start = timeline.to_original([w["start"] for w in words]).tolist()
+            w_end = timeline.to_original([w["end"] for w in words]).tolist()
+            for w, ws, we in zip(words, w_start, w_end):
+                w["start"], w["end"] = ws, we
+    return segments
+
+
+def restore(result: dict, timeline) -> dict:
+    """Put a Whisper-shaped result back on the original timeline and note what was skipped."""
+    if timeline is None:
+        return result
+    restore_segments(result["segments"], timeline)
+    result["vad"] = timeline.report()
+    return result
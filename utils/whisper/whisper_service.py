@@ -1,14 +1,518 @@
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import whisper
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, SAMPLE_RATE
+
+from utils import audio_loader, metrics
+from utils.whisper import encoder_cache, inference_worker, long_form, result_cache, vad
+from utils.whisper.backends import DEFAULT_BACKEND, get_backend
+from utils.whisper.model_cache import DEFAULT_MODEL, get_model, use_model, decode_options
+
+# Run transcribe and translate side by side only when there are cores to spare
+PARALLEL_MIN_CPUS = int(os.environ.get("WHISPER_PARALLEL_MIN_CPUS", "4"))
+# Transcribe and translate over the same fixed windows so each is encoded once
+SHARED_ENCODER = os.environ.get("WHISPER_SHARED_ENCODER", "1") == "1"
+# Window decoded per step by the streaming and shared-encoder paths
+STREAM_WINDOW_SECONDS = 30.0
+# A segment ending this close to a window edge may be cut mid-word; it is
+# re-decoded as the start of the next window instead
+STREAM_EDGE_SECONDS = 1.0
+# Previous text carried into each window's prompt
+PROMPT_CHARS = 200
+
+_local = threading.local()
+_patch_lock = threading.Lock()
+
+
+def _install_mel_passthrough():
+    """
+    model.transcribe() always calls log_mel_spectrogram() on its input.
+    Wrap it once so a mel computed by this module is handed back untouched
+    instead of being treated as raw audio.
+    """
+    module = importlib.import_module("whisper.transcribe")
+    with _patch_lock:
+        if getattr(module.log_mel_spectrogram, "_mel_passthrough", False):
+            return
+        original = module.log_mel_spectrogram
+
+        def log_mel_spectrogram(audio, *args, **kwargs):
+            if audio is getattr(_local, "mel", None):
+                return audio
+            return original(audio, *args, **kwargs)
+
+        log_mel_spectrogram._mel_passthrough = True
+        module.log_mel_spectrogram = log_mel_spectrogram
+
+
+def load_audio(media_path):
+    """
+    16 kHz mono float32 PCM: WAV read natively, other media decoded by
+    ffmpeg once per content and memory-mapped from the PCM cache after.
+    """
+    return audio_loader.load_audio(media_path)
+
+
+def compute_mel(audio, n_mels):
+    """Log-mel features padded the same way model.transcribe() pads them."""
+    with metrics.stage("mel", audio_seconds=len(audio) / SAMPLE_RATE) as event:
+        mel = whisper.log_mel_spectrogram(audio, n_mels, padding=N_SAMPLES)
+        event["bytes"] = mel.element_size() * mel.nelement()
+    return mel
+
+
+def _cache_options(dtype, language, backend):
+    # Everything besides media/model/task that changes the decoded output
+    return {"word_timestamps": True, "dtype": dtype, "language": language, "backend": backend,
+            "vad": vad.VAD_ENABLED}
+
+
+def _transcribe_mel(mel, task, model_name, device, dtype, language=None, replica=0,
+                    shared=False, **options):
+    """shared: the window is also decoded for another task, so cache its encoder output."""
+    _install_mel_passthrough()
+    clip = options.get("clip_timestamps")
+    audio_seconds = (clip[1] - clip[0]) if clip else (mel.shape[-1] - N_FRAMES) * HOP_LENGTH / SAMPLE_RATE
+    with use_model(model_name, device=device, dtype=dtype, replica=replica) as model, \
+            metrics.stage("inference", task=task, model=model_name, backend="openai",
+                          audio_seconds=audio_seconds):
+        if shared:
+            encoder_cache.install(model, (model_name, str(model.device), dtype))
+        _local.mel = mel
+        try:
+            return model.transcribe(
+                mel, word_timestamps=True, task=task, language=language,
+                **decode_options(dtype), **options
+            )
+        finally:
+            _local.mel = None
+
+
+def _run(media_path, task, model_name, device, dtype, language, long_form_mode=None,
+         backend=DEFAULT_BACKEND):
+    """
+    Decode once and cut out silence, then either a single model.transcribe()
+    pass or, for long recordings (long_form_mode=None means decide by
+    duration), the chunked process-pool path. Other engines get the trimmed
+    audio as is. Timestamps are mapped back to the original recording.
+    """
+    audio, timeline = vad.trim(load_audio(media_path))
+    labels = {"task": task, "model": model_name, "backend": backend,
+              "audio_seconds": len(audio) / SAMPLE_RATE}
+    if backend != "openai":
+        engine = get_backend(backend, model_name, device, dtype)
+        with metrics.stage("inference", **labels):
+            return vad.restore(engine.transcribe(audio, task=task, language=language), timeline)
+
+    if long_form_mode is None:
+        long_form_mode = long_form.should_use(len(audio))
+
+    if long_form_mode:
+        with metrics.stage("inference", long_form=True, **labels):
+            return vad.restore(long_form.transcribe_long(
+                audio, task=task, model_name=model_name, device=device,
+                dtype=dtype, language=language
+            ), timeline)
+
+    with use_model(model_name, device=device, dtype=dtype) as model, \
+            metrics.stage("inference", **labels):
+        return vad.restore(model.transcribe(
+            audio, word_timestamps=True, task=task, language=language,
+            **decode_options(dtype)
+        ), timeline)
+
+
+def transcribe(audio_path, model_name=DEFAULT_MODEL, device=None, dtype="float32",
+               language=None, use_cache=True, long_form_mode=None, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    run = lambda: _run(
+        audio_path, "transcribe", model_name, device, dtype, language, long_form_mode, backend
+    )
+    if not use_cache:
+        return run()
+
+    result = result_cache.cached(
+        audio_path, model_name, "transcribe", _cache_options(dtype, language, backend), run
+    )
+
+    return result
+
+def translate(media_path, model_name=DEFAULT_MODEL, device=None, dtype="float32",
+              language=None, use_cache=True, long_form_mode=None, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    run = lambda: _run(
+        media_path, "translate", model_name, device, dtype, language, long_form_mode, backend
+    )
+    if not use_cache:
+        return run()
+
+    result = result_cache.cached(
+        media_path, model_name, "translate", _cache_options(dtype, language, backend), run
+    )
 
-def transcribe(audio_path):
-    model = whisper.load_model("small")
-    result = model.transcribe(audio_path, word_timestamps=True)
-    
     return result
 
-def translate(media_path):
-    model = whisper.load_model("small")
-    
-    result = model.transcribe(media_path, word_timestamps=True, task="translate")
-    
-    return result
\ No newline at end of file
+def transcribe_and_translate(media_path, model_name=DEFAULT_MODEL, device=None,
+                             dtype="float32", language=None, parallel=None,
+                             use_cache=True, backend=None, shared_encoder=None, progress=None):
+    """
+    Transcribe and translate one file from a single decode and mel pass.
+    With parallel=True (default when enough CPUs are available) the two
+    tasks run at the same time on separate model replicas.
+    With shared_encoder (default WHISPER_SHARED_ENCODER) both tasks walk
+    the same fixed 30 s windows in lockstep, so the encoder runs once per
+    window and its cached output serves both decoders.
+    progress(processed_seconds, duration), on the original timeline, is
+    called after every window (after each task on the other paths); an
+    exception it raises stops the run.
+    Returns (transcript, translation).
+    """
+    backend = backend or DEFAULT_BACKEND
+    if use_cache:
+        options = _cache_options(dtype, language, backend)
+        content_hash = result_cache.media_hash(media_path)
+        keys = {
+            task: result_cache.cache_key(content_hash, model_name, task, options)
+            for task in ("transcribe", "translate")
+        }
+        transcript = result_cache.get(keys["transcribe"])
+        translation = result_cache.get(keys["translate"])
+
+        # Only one side missing: a plain single-task run is cheaper
+        if transcript is not None and translation is not None:
+            return transcript, translation
+        if transcript is not None:
+            return transcript, translate(
+                media_path, model_name, device, dtype, language, backend=backend
+            )
+        if translation is not None:
+            return transcribe(
+                media_path, model_name, device, dtype, language, backend=backend
+            ), translation
+
+    audio = load_audio(media_path)
+    original_duration = len(audio) / SAMPLE_RATE
+    audio, timeline = vad.trim(audio)
+    duration = len(audio) / SAMPLE_RATE
+
+    def report(seconds):
+        if progress is not None:
+            progress(float(timeline.to_original(seconds)) if timeline else seconds, original_duration)
+
+    if backend != "openai":
+        # Other engines compute their own features; still decode only once
+        engine = get_backend(backend, model_name, device, dtype)
+        labels = {"model": model_name, "backend": backend, "audio_seconds": duration}
+        with metrics.stage("inference", task="transcribe", **labels):
+            transcript = vad.restore(engine.transcribe(audio, task="transcribe", language=language), timeline)
+        report(duration / 2)
+        with metrics.stage("inference", task="translate", **labels):
+            translation = vad.restore(engine.transcribe(audio, task="translate", language=language), timeline)
+        report(duration)
+        if use_cache:
+            result_cache.put(keys["transcribe"], transcript)
+            result_cache.put(keys["translate"], translation)
+        return transcript, translation
+
+    if parallel is None:
+        parallel = (os.cpu_count() or 1) >= PARALLEL_MIN_CPUS
+
+    if shared_encoder is None:
+        shared_encoder = SHARED_ENCODER
+
+    n_mels = get_model(model_name, device=device, dtype=dtype).dims.n_mels
+    mel = compute_mel(audio, n_mels)
+    del audio
+
+    if shared_encoder:
+        transcript, translation = _transcribe_windows(
+            mel, duration, ("transcribe", "translate"), model_name, device, dtype, language, parallel,
+            progress=report
+        )
+    elif not parallel:
+        transcript = _transcribe_mel(mel, "transcribe", model_name, device, dtype, language)
+        report(duration / 2)
+        translation = _transcribe_mel(mel, "translate", model_name, device, dtype, language)
+    else:
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="whisper-task") as pool:
+            transcript = pool.submit(
+                _transcribe_mel, mel, "transcribe", model_name, device, dtype, language, 0
+            )
+            translation = pool.submit(
+                _transcribe_mel, mel, "translate", model_name, device, dtype, language, 1
+            )
+            transcript, translation = transcript.result(), translation.result()
+    report(duration)
+
+    transcript, translation = vad.restore(transcript, timeline), vad.restore(translation, timeline)
+    if use_cache:
+        result_cache.put(keys["transcribe"], transcript)
+        result_cache.put(keys["translate"], translation)
+
+    return transcript, translation
+
+
+def _edge_cut(windows, seek, clip_end, duration):
+    """
+    Start of the next window and the segments to keep from each task's
+    decode of [seek, clip_end]. A segment ending within STREAM_EDGE_SECONDS
+    of the clip end may be cut mid-word, so it is dropped and re-decoded as
+    the start of the next window. Tasks decoding the same window share the
+    earliest such cut and keep only the words before it, so the next window
+    repeats none of them.
+    """
+    cut = clip_end
+    if clip_end < duration:
+        for segments in windows:
+            if len(segments) > 1 and clip_end - segments[-1]["end"] < STREAM_EDGE_SECONDS:
+                cut = min(cut, segments[-1]["start"])
+
+    # Snap to a mel frame so clip boundaries line up with whisper's seek
+    next_seek = round(cut * SAMPLE_RATE / HOP_LENGTH) * HOP_LENGTH / SAMPLE_RATE
+    # Never stall on a window that produced nothing usable
+    if cut >= clip_end or next_seek <= seek:
+        return clip_end, windows
+    kept = []
+    for segments in windows:
+        clipped = (long_form.clip_segment(seg, float("-inf"), next_seek) for seg in segments)
+        kept.append([seg for seg in clipped if seg is not None])
+    return next_seek, kept
+
+
+def _transcribe_windows(mel, duration, tasks, model_name, device, dtype, language, parallel,
+                        progress=None):
+    """
+    Decode several tasks over identical fixed windows, one window at a time.
+    Whisper's own seek depends on the decoded timestamps, so the tasks would
+    drift onto different windows; fixed clips keep their encoder inputs
+    identical, and lockstep keeps the encoder cache to a window or two.
+    Each task is still prompted with its own previous text, and window
+    edges are handled as in transcribe_stream(), with one cut shared by all
+    tasks. progress(seconds) is called after every window.
+    """
+    segments = {task: [] for task in tasks}
+    pool = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="whisper-task") if parallel else None
+    # This call's tasks must not share a batch with each other, only with other sessions
+    owner = object()
+
+    def decode(task, replica, clip):
+        prompt = "".join(seg["text"] for seg in segments[task])[-PROMPT_CHARS:] or None
+        # Only here do several decoders encode the same window, so only here is caching worth it
+        with encoder_cache.sharing():
+            return inference_worker.transcribe_window(
+                mel, clip, task, model_name, device, dtype, language,
+                single=lambda: _transcribe_mel(
+                    mel, task, model_name, device, dtype, language, replica, shared=True,
+                    clip_timestamps=clip, initial_prompt=prompt
+                ),
+                owner=owner,
+            )
+
+    try:
+        seek = 0.0
+        while seek < duration:
+            clip = [seek, min(seek + STREAM_WINDOW_SECONDS, duration)]
+            if pool is not None:
+                futures = [pool.submit(decode, task, i, clip) for i, task in enumerate(tasks)]
+                windows = [f.result() for f in futures]
+            else:
+                windows = [decode(task, 0, clip) for task in tasks]
+
+            # Detect on the first window only, then hold every task to it
+            language = language or windows[0].get("language")
+            seek, kept = _edge_cut([window["segments"] for window in windows], seek, clip[1], duration)
+            for task, window_segments in zip(tasks, kept):
+                for seg in window_segments:
+                    seg["id"] = len(segments[task])
+                    segments[task].append(seg)
+            if progress is not None:
+                progress(seek)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return tuple(
+        {"text": "".join(seg["text"] for seg in segments[task]),
+         "segments": segments[task],
+         "language": language}
+        for task in tasks
+    )
+
+
+def transcribe_stream(media_path, task="transcribe", model_name=DEFAULT_MODEL, device=None,
+                      dtype="float32", language=None, use_cache=True, backend=None,
+                      long_form_mode=None):
+    """
+    Yield segments as each ~30 s window finishes decoding. Long recordings
+    (long_form_mode=None means decide by duration) are decoded in parallel
+    by the long-form process pool instead, and yielded per chunk.
+
+    Every event is a dict with the new "segments", "processed_seconds",
+    "duration" and "progress" (0..1). The last event also carries the
+    assembled Whisper-shaped "result", which is stored in the result cache.
+    The model is released between windows so other sessions can interleave.
+    Silence is cut before decoding; times in the events are always on the
+    original recording's timeline.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if use_cache:
+        key = result_cache.cache_key(
+            result_cache.media_hash(media_path), model_name, task,
+            _cache_options(dtype, language, backend)
+        )
+        cached = result_cache.get(key)
+        if cached is not None:
+            duration = cached["segments"][-1]["end"] if cached["segments"] else 0.0
+            yield {"segments": cached["segments"], "processed_seconds": duration,
+                   "duration": duration, "progress": 1.0, "result": cached}
+            return
+
+    audio = load_audio(media_path)
+    original_duration = len(audio) / SAMPLE_RATE
+    audio, timeline = vad.trim(audio)
+    duration = len(audio) / SAMPLE_RATE
+    if backend != "openai":
+        yield from _stream_backend(
+            audio, original_duration, task, get_backend(backend, model_name, device, dtype),
+            language, key if use_cache else None, timeline
+        )
+        return
+
+    if long_form_mode is None:
+        long_form_mode = long_form.should_use(len(audio))
+    if long_form_mode:
+        yield from _stream_long_form(
+            audio, original_duration, task, model_name, device, dtype, language,
+            key if use_cache else None, timeline
+        )
+        return
+
+    n_mels = get_model(model_name, device=device, dtype=dtype).dims.n_mels
+    mel = compute_mel(audio, n_mels)
+    del audio
+
+    segments = []
+    new_segments = []
+    seek = 0.0
+    while seek < duration:
+        clip_end = min(seek + STREAM_WINDOW_SECONDS, duration)
+        prompt = "".join(seg["text"] for seg in segments)[-PROMPT_CHARS:] or None
+
+        # Windows from concurrent sessions are batched by the shared worker
+        window = inference_worker.transcribe_window(
+            mel, [seek, clip_end], task, model_name, device, dtype, language,
+            single=lambda: _transcribe_mel(
+                mel, task, model_name, device, dtype, language,
+                clip_timestamps=[seek, clip_end], initial_prompt=prompt
+            )
+        )
+        language = language or window.get("language")
+        seek, (new_segments,) = _edge_cut([window["segments"]], seek, clip_end, duration)
+
+        vad.restore_segments(new_segments, timeline)
+        for seg in new_segments:
+            seg["id"] = len(segments)
+            segments.append(seg)
+
+        if seek >= duration:
+            break
+        processed = float(timeline.to_original(seek)) if timeline else seek
+        yield {"segments": new_segments, "processed_seconds": processed,
+               "duration": original_duration, "progress": seek / duration}
+
+    result = {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": language,
+    }
+    if timeline is not None:
+        result["vad"] = timeline.report()
+    if use_cache:
+        result_cache.put(key, result)
+    yield {"segments": new_segments, "processed_seconds": original_duration,
+           "duration": original_duration, "progress": 1.0, "result": result}
+
+
+def _stream_long_form(audio, duration, task, model_name, device, dtype, language, cache_key,
+                      timeline=None):
+    """
+    transcribe_stream() over the long-form process pool: chunks decode in
+    parallel and are yielded in order as each finishes.
+    duration is the original recording's; audio may have had silence cut.
+    """
+    segments = []
+    trimmed = len(audio) / SAMPLE_RATE
+    busy = 0.0   # time spent waiting on the pool, not in the consumer between events
+    iterator = long_form.iter_long(audio, task=task, model_name=model_name, device=device,
+                                   dtype=dtype, language=language)
+    while True:
+        t0 = time.perf_counter()
+        item = next(iterator, None)
+        busy += time.perf_counter() - t0
+        if item is None:
+            break
+        new_segments, end, language = item
+        vad.restore_segments(new_segments, timeline)
+        for seg in new_segments:
+            seg["id"] = len(segments)
+            segments.append(seg)
+        processed = float(timeline.to_original(end)) if timeline else end
+        yield {"segments": new_segments, "processed_seconds": processed, "duration": duration,
+               "progress": min(end / trimmed, 1.0) if trimmed else 1.0}
+
+    metrics.record({"stage": "inference", "seconds": busy, "task": task, "backend": "openai",
+                    "model": model_name, "long_form": True, "audio_seconds": trimmed})
+
+    result = {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": language,
+    }
+    if timeline is not None:
+        result["vad"] = timeline.report()
+    if cache_key is not None:
+        result_cache.put(cache_key, result)
+    yield {"segments": [], "processed_seconds": duration, "duration": duration,
+           "progress": 1.0, "result": result}
+
+
+def _stream_backend(audio, duration, task, engine, language, cache_key, timeline=None):
+    """
+    transcribe_stream() for engines that produce segments incrementally.
+    duration is the original recording's; audio may have had silence cut.
+    """
+    segments = []
+    busy = 0.0   # time spent inside the engine, not in the consumer between events
+    iterator = engine.iter_segments(audio, task=task, language=language)
+    while True:
+        t0 = time.perf_counter()
+        item = next(iterator, None)
+        busy += time.perf_counter() - t0
+        if item is None:
+            break
+        seg, detected = item
+        language = language or detected
+        vad.restore_segments([seg], timeline)
+        seg["id"] = len(segments)
+        segments.append(seg)
+        yield {"segments": [seg], "processed_seconds": seg["end"], "duration": duration,
+               "progress": min(seg["end"] / duration, 1.0) if duration else 1.0}
+
+    metrics.record({"stage": "inference", "seconds": busy, "task": task, "backend": engine.name,
+                    "model": engine.model_name, "audio_seconds": len(audio) / SAMPLE_RATE})
+
+    result = {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": language,
+    }
+    if timeline is not None:
+        result["vad"] = timeline.report()
+    if cache_key is not None:
+        result_cache.put(cache_key, result)
+    yield {"segments": [], "processed_seconds": duration, "duration": duration,
+           "progress": 1.0, "result": result}